@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter
 
-from app.api import auth, call_stats, calls, config, friends, health, signaling, telegram_webhook
+from app.api import auth, call_stats, calls, config, friends, health, metrics, signaling, telegram_webhook
 
 
 def get_api_router() -> APIRouter:
@@ -15,6 +15,7 @@ def get_api_router() -> APIRouter:
     router.include_router(config.router)
     router.include_router(friends.router)
     router.include_router(health.router)
+    router.include_router(metrics.router)
     router.include_router(signaling.router)
     router.include_router(telegram_webhook.router)
     return router
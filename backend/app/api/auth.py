@@ -1,4 +1,5 @@
 import logging
+from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -9,13 +10,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.database import get_session
 from app.config.settings import get_settings
+from app.models import User
 from app.services.auth import (
     authenticate_user_from_init_data,
-    build_init_data_fingerprint,
     create_access_token,
     get_or_create_user,
+    get_user_by_id,
     get_user_from_token,
 )
+from app.services.refresh_tokens import (
+    RefreshGrant,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 logger = logging.getLogger(__name__)
@@ -27,6 +35,10 @@ class TelegramAuthRequest(BaseModel):
     init_data: str = Field(..., alias="initData", description="Raw Telegram initData string")
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str | None = Field(None, description="Refresh token, when the refresh_token cookie is unavailable")
+
+
 class UserResponse(BaseModel):
     id: int
     telegram_user_id: int
@@ -41,6 +53,8 @@ class AuthResponse(BaseModel):
     user: UserResponse
     expires_in: int
     access_token: str  # For Telegram Mini Apps where cookies may not work
+    refresh_token: str
+    refresh_expires_in: int
     token_type: str = "bearer"
 
 
@@ -109,16 +123,72 @@ async def authorize_telegram(
     """Validate Telegram initData, persist user, and issue httpOnly cookie with JWT."""
 
     logger.info("Received Telegram auth request")
-    telegram_user = authenticate_user_from_init_data(payload.init_data)
-    user = await get_or_create_user(session, telegram_user)
-    fingerprint = build_init_data_fingerprint(payload.init_data)
-    token = create_access_token(str(user.id), fingerprint=fingerprint)
+    verified = authenticate_user_from_init_data(payload.init_data)
+    user = await get_or_create_user(session, verified.user)
+    fingerprint = verified.fingerprint
+    token = create_access_token(
+        str(user.id), fingerprint=fingerprint, username=user.username, first_name=user.first_name
+    )
     logger.info(
         "[authorize_telegram] issued token for user_id=%s, fp=%s",
         user.id,
         fingerprint,
     )
+    grant = await issue_refresh_token(session, user.id)
+    logger.info("Authorized Telegram user id=%s username=%s", user.id, user.username)
+    return _auth_response(response, user, token, grant)
+
+
+@router.post("/refresh", response_model=AuthResponse, status_code=status.HTTP_200_OK)
+@limiter.limit("30/minute")
+async def refresh_session(
+    request: Request,
+    response: Response,
+    payload: RefreshRequest | None = None,
+    session: AsyncSession = Depends(get_session),
+) -> AuthResponse:
+    """Exchange a refresh token for a new access token and the next refresh token.
+
+    Unlike ``/auth/telegram`` this checks no initData and writes nothing but the
+    rotated generation of the token family.
+    """
+
+    refresh_token = (payload.refresh_token if payload else None) or request.cookies.get("refresh_token")
+    if not refresh_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    grant = await rotate_refresh_token(session, refresh_token)
+    user = await get_user_by_id(session, grant.user_id)
+    token = create_access_token(str(user.id), username=user.username, first_name=user.first_name)
+    logger.info("[refresh_session] refreshed token for user_id=%s", user.id)
+    return _auth_response(response, user, token, grant)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+@limiter.limit("30/minute")
+async def logout(
+    request: Request,
+    response: Response,
+    payload: RefreshRequest | None = None,
+    session: AsyncSession = Depends(get_session),
+) -> None:
+    """Revoke the refresh token family of this session and clear the auth cookies.
+
+    The access token stays valid until it expires; without the refresh token it
+    cannot be renewed.
+    """
+
+    refresh_token = (payload.refresh_token if payload else None) or request.cookies.get("refresh_token")
+    if refresh_token:
+        await revoke_refresh_token(session, refresh_token)
+    response.delete_cookie("access_token", path="/", secure=True, httponly=True, samesite="none")
+    response.delete_cookie("refresh_token", path="/auth", secure=True, httponly=True, samesite="none")
+    logger.info("[logout] revoked refresh token family (token_present=%s)", bool(refresh_token))
+
+
+def _auth_response(response: Response, user: User, token: str, grant: RefreshGrant) -> AuthResponse:
     settings = get_settings()
+    refresh_expires_in = max(0, int((grant.expires_at - datetime.now(tz=timezone.utc)).total_seconds()))
 
     # Set httpOnly cookie with JWT token (for browsers that support it)
     # Also return token in body for Telegram Mini Apps where cookies may be blocked
@@ -131,11 +201,21 @@ async def authorize_telegram(
         max_age=settings.access_token_expire_minutes * 60,
         path="/",
     )
-
-    logger.info("Authorized Telegram user id=%s username=%s", user.id, user.username)
+    # Refresh-токен нужен только /auth/refresh: остальным запросам его не отправляем
+    response.set_cookie(
+        key="refresh_token",
+        value=grant.token,
+        httponly=True,
+        secure=True,
+        samesite="none",
+        max_age=refresh_expires_in,
+        path="/auth",
+    )
 
     return AuthResponse(
         expires_in=settings.access_token_expire_minutes * 60,
         user=user,
         access_token=token,
+        refresh_token=grant.token,
+        refresh_expires_in=refresh_expires_in,
     )
@@ -7,10 +7,9 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.database import get_session
-from app.models import User
 from app.models.call_stats import CallStats
 from app.models.call import Call
-from app.services.auth import get_current_user
+from app.services.auth import Principal, get_current_principal
 
 router = APIRouter(prefix="/api/call-stats", tags=["Call Stats"])
 logger = logging.getLogger(__name__)
@@ -69,7 +68,7 @@ class CallStatsAggregated(BaseModel):
 @router.post("/", response_model=CallStatsResponse, status_code=status.HTTP_201_CREATED)
 async def create_call_stats(
     stats: CallStatsCreate,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallStatsResponse:
     """Submit call quality statistics."""
@@ -114,7 +113,7 @@ async def create_call_stats(
 @router.get("/{call_id}", response_model=CallStatsAggregated)
 async def get_call_stats(
     call_id: str,
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallStatsAggregated:
     """Get aggregated statistics for a call."""
@@ -171,7 +170,7 @@ async def get_call_stats(
 
 @router.get("/", response_model=list[CallStatsResponse])
 async def list_user_call_stats(
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
     limit: int = 50,
 ) -> list[CallStatsResponse]:
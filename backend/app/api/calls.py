@@ -13,7 +13,7 @@ from app.config.database import get_session
 from app.config.settings import get_settings
 from app.models import Call, CallStatus, User
 from app.models.participant import Participant
-from app.services.auth import get_current_user
+from app.services.auth import Principal, get_current_principal
 from app.services.signaling import notify_call_ended
 from app.services.telegram_bot import send_call_notification
 
@@ -76,7 +76,7 @@ def _build_join_url(call_id: str) -> str:
 async def create_call(
     request: Request,
     payload: CallCreateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallResponse:
     """Create a new call and return its join details.
@@ -151,7 +151,7 @@ async def create_call(
 @router.get("/{call_id}", response_model=CallResponse)
 async def get_call(
     call_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallResponse:
     """Retrieve call details ensuring the call is still available."""
@@ -200,7 +200,7 @@ async def get_call(
 @router.post("/{call_id}/end", response_model=CallResponse)
 async def end_call(
     call_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallResponse:
     """End an active call and notify all participants."""
@@ -252,7 +252,7 @@ async def end_call(
 @router.post("/join_by_code", response_model=CallResponse)
 async def join_call_by_code(
     payload: JoinCallRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallResponse:
     """Validate that the call exists and is available for joining."""
@@ -308,7 +308,7 @@ async def join_call_by_code(
 async def call_friend(
     request: Request,
     payload: CallFriendRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> CallResponse:
     """Create a new call with a friend and send them a notification."""
@@ -375,8 +375,12 @@ async def call_friend(
             detail="Failed to add participants",
         ) from exc
 
-    # Формируем имя звонящего для уведомления
-    caller_name = current_user.username or current_user.first_name or "Кто-то"
+    # Формируем имя звонящего для уведомления: из claims токена, у токенов без профиля — из БД
+    caller_name = current_user.username or current_user.first_name
+    if caller_name is None:
+        caller = await session.get(User, current_user.id)
+        caller_name = caller.username or caller.first_name if caller is not None else None
+    caller_name = caller_name or "Кто-то"
 
     # Отправляем пуш-уведомление другу
     # Используем call_id (не внутренний id), так как это то, что будет использоваться для подключения
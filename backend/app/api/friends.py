@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import get_session
 from app.models import User
 from app.models.friend_link import FriendLink
-from app.services.auth import get_current_user
+from app.services.auth import Principal, get_current_principal
 
 router = APIRouter(prefix="/api/friends", tags=["Friends"])
 
@@ -38,7 +38,7 @@ async def get_friends(
     query: str | None = Query(None, description="Search by name or username"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> list[FriendResponse]:
     """Get list of friends based on friend_links with optional search."""
@@ -127,7 +127,7 @@ async def get_friends(
 @router.post("/delete", response_model=DeleteFriendsResponse)
 async def delete_friends(
     request: DeleteFriendsRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     session: AsyncSession = Depends(get_session),
 ) -> DeleteFriendsResponse:
     """Delete friend links between current user and specified friends."""
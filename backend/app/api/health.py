@@ -1,6 +1,37 @@
-from fastapi import APIRouter, status
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.config.settings import get_settings
+from app.services.identity_cache import user_cache
+from app.services.init_data import init_data_verifier
+from app.services.signaling import call_room_manager
 
 router = APIRouter(tags=["Health"])
+_bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def require_monitoring_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer_scheme),
+) -> None:
+    """Admit only requests carrying ``MONITORING_TOKEN``; without the setting the endpoint does not exist.
+
+    Raises:
+        HTTPException: 404 if ``MONITORING_TOKEN`` is not configured, 401 if the
+            bearer token is missing or wrong.
+    """
+
+    expected = get_settings().monitoring_token
+    if not expected:
+        # Внутренние счётчики воркера не должны быть видны снаружи, пока токен не задан
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid monitoring token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
 
 @router.get("/health", status_code=status.HTTP_200_OK)
@@ -10,6 +41,31 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@router.get("/health/signaling", status_code=status.HTTP_200_OK, dependencies=[Depends(require_monitoring_token)])
+async def signaling_health() -> dict[str, int]:
+    """Room, connection, outbound queue and heartbeat gauges of this worker's signaling relay."""
+
+    return call_room_manager.stats()
+
+
+@router.get(
+    "/health/identity-cache", status_code=status.HTTP_200_OK, dependencies=[Depends(require_monitoring_token)]
+)
+async def identity_cache_health() -> dict[str, int]:
+    """Size and hit/miss/invalidation counters of this worker's user cache."""
+
+    return user_cache.stats()
+
+
+@router.get(
+    "/health/init-data-cache", status_code=status.HTTP_200_OK, dependencies=[Depends(require_monitoring_token)]
+)
+async def init_data_cache_health() -> dict[str, int]:
+    """Size and hit/miss counters of this worker's verified-initData cache."""
+
+    return init_data_verifier.stats()
+
+
 @router.get("/", status_code=status.HTTP_200_OK)
 async def root() -> dict[str, str]:
     """Root endpoint used for uptime checks (returns 200 instead of 404)."""
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from app.api.health import require_monitoring_token
+from app.services import metrics
+from app.services.identity_cache import user_cache
+from app.services.init_data import init_data_verifier
+from app.services.signaling import call_room_manager
+
+router = APIRouter(tags=["Metrics"])
+
+# Комнаты, соединения, очереди и RTT этого воркера — те же значения, что в /health/signaling
+metrics.register_gauges("signaling", call_room_manager.stats)
+metrics.register_gauges("user_cache", user_cache.stats)
+metrics.register_gauges("init_data_cache", init_data_verifier.stats)
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_monitoring_token)])
+async def prometheus_metrics() -> Response:
+    """Prometheus scrape endpoint for this worker."""
+
+    if not metrics.ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Metrics are disabled: set METRICS_ENABLED=true",
+        )
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
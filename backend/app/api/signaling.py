@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-import asyncio
-import json
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any
+from functools import partial
+from typing import Any, Awaitable, Callable
 
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
-from sqlalchemy import select, tuple_
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, true, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.database import session_scope
@@ -16,12 +15,25 @@ from app.config.settings import get_settings
 from app.models import Call, CallStatus, User
 from app.models.friend_link import FriendLink
 from app.models.participant import Participant
-from app.services.auth import get_user_from_token
-from app.services.signaling import call_room_manager
+from app.services import signaling_protocol
+from app.services.auth import user_id_from_token
+from app.services.signaling import (
+    RATE_LIMIT_CLOSE_CODE,
+    CallRoom,
+    ParticipantConnection,
+    SignalingFrame,
+    call_room_manager,
+)
+from app.services.traffic_recorder import traffic_recorder
+from app.services.write_behind import write_behind
+from app.utils import json_codec
 
 router = APIRouter()
 logger = logging.getLogger("app.webrtc")
 
+# Коды закрытия, с которыми клиент уходит из звонка сам: такие сессии не ждут возобновления
+_NORMAL_CLOSE_CODES = frozenset({1000, 1005})
+
 
 def _validate_websocket_origin(websocket: WebSocket) -> tuple[bool, str | None]:
     """Validate Origin header for WebSocket connections to prevent CSRF attacks.
@@ -84,6 +96,10 @@ def _validate_websocket_origin(websocket: WebSocket) -> tuple[bool, str | None]:
 def _extract_token(websocket: WebSocket) -> tuple[str | None, str | None]:
     """Extract authentication token from WebSocket headers.
 
+    The selected subprotocol is the first offered signaling subprotocol the server
+    supports (see ``app.services.signaling_protocol``); otherwise the first offered
+    value that is not a signaling subprotocol is echoed back.
+
     Security: Token is ONLY accepted from Sec-WebSocket-Protocol or Authorization headers,
     NOT from query parameters to prevent token leakage in logs.
     """
@@ -92,7 +108,15 @@ def _extract_token(websocket: WebSocket) -> tuple[str | None, str | None]:
     if protocol_header:
         protocol_values = [value.strip() for value in protocol_header.split(",") if value.strip()]
         if protocol_values:
-            selected_protocol = protocol_values[0]
+            selected_protocol = signaling_protocol.negotiate_subprotocol(protocol_values) or next(
+                (
+                    value
+                    for value in protocol_values
+                    if value not in signaling_protocol.KNOWN_SUBPROTOCOLS
+                    and not value.startswith(signaling_protocol.RESUME_TOKEN_PREFIX)
+                ),
+                protocol_values[0],
+            )
             token_candidate = protocol_values[-1]
             if token_candidate.lower().startswith("bearer "):
                 token_candidate = token_candidate.split(" ", 1)[1]
@@ -112,40 +136,75 @@ def _extract_token(websocket: WebSocket) -> tuple[str | None, str | None]:
     return None, selected_protocol
 
 
-async def _receive_json_safe(websocket: WebSocket, max_size: int | None = None) -> dict[str, Any]:
-    """Safely receive JSON from WebSocket with size validation.
+def _extract_resume_token(websocket: WebSocket) -> str | None:
+    """Return the session resume token offered as a ``resume.<token>`` subprotocol value."""
+
+    protocol_header = websocket.headers.get("sec-websocket-protocol") or ""
+    for value in protocol_header.split(","):
+        value = value.strip()
+        if value.startswith(signaling_protocol.RESUME_TOKEN_PREFIX):
+            return value[len(signaling_protocol.RESUME_TOKEN_PREFIX) :] or None
+    return None
+
+
+async def _receive_message(
+    websocket: WebSocket,
+    max_size: int | None = None,
+    *,
+    binary: bool = False,
+    record: Callable[[int, signaling_protocol.ClientMessage | None], None] | None = None,
+) -> signaling_protocol.ClientMessage:
+    """Receive one client message, checking its size and validating it against its type's schema.
 
     Args:
         websocket: WebSocket connection
         max_size: Maximum message size in bytes (defaults to settings.max_websocket_message_size)
+        binary: Also accept ``msgpack.v1`` binary frames (text frames are still parsed as JSON)
+        record: Called with the frame size and the message (None when rejected), for the traffic recorder
 
     Raises:
-        ValueError: If message exceeds max_size
+        ValueError: If the message exceeds max_size or is not a valid signaling message
+            (``signaling_protocol.InvalidMessage`` carries the type when it was recognisable)
         WebSocketDisconnect: If connection is closed
     """
     if max_size is None:
         settings = get_settings()
         max_size = settings.max_websocket_message_size
 
-    # Receive as text first to check size
-    data = await websocket.receive_text()
-
-    # Check size
-    data_size = len(data.encode('utf-8'))
-    if data_size > max_size:
-        logger.warning(
-            "WebSocket message too large: %s bytes (max %s bytes)",
-            data_size,
-            max_size,
-        )
-        raise ValueError(f"Message too large: {data_size} bytes (max {max_size} bytes)")
+    data: str | bytes
+    if binary:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000), frame.get("reason"))
+        packed = frame.get("bytes")
+        data = packed if packed is not None else frame.get("text") or ""
+    else:
+        data = await websocket.receive_text()
 
-    # Parse JSON
     try:
-        return json.loads(data)
-    except json.JSONDecodeError as exc:
-        logger.warning("Invalid JSON in WebSocket message: %s", exc)
-        raise ValueError("Invalid JSON") from exc
+        if isinstance(data, bytes):
+            if len(data) > max_size:
+                logger.warning(
+                    "WebSocket message too large: %s bytes (max %s bytes)",
+                    len(data),
+                    max_size,
+                )
+                raise ValueError(f"Message too large: {len(data)} bytes (max {max_size} bytes)")
+            message = signaling_protocol.parse_binary_message(data)
+        else:
+            # Размер в UTF-8 без копии кадра: для ASCII он равен длине строки
+            if signaling_protocol.utf8_length_exceeds(data, max_size):
+                logger.warning("WebSocket message too large: %s characters (max %s bytes)", len(data), max_size)
+                raise ValueError(f"Message too large (max {max_size} bytes)")
+            message = signaling_protocol.parse_json_message(data)
+    except ValueError:
+        if record is not None:
+            record(len(data), None)
+        raise
+
+    if record is not None:
+        record(len(data), message)
+    return message
 
 
 def _make_aware(dt: datetime | None) -> datetime | None:
@@ -202,56 +261,6 @@ async def _create_or_update_friend_link(
     logger.info("Created/updated bidirectional friend_link between user_id=%s and friend_id=%s", user_id, friend_id)
 
 
-async def _batch_create_or_update_friend_links(
-    session: AsyncSession, user_id: int, friend_ids: list[int]
-) -> None:
-    """Batch create or update friend links between user and multiple friends.
-
-    Uses bidirectional model: creates TWO records for each friendship.
-    Uses a single INSERT ... ON CONFLICT DO UPDATE query for efficiency.
-    """
-    if not friend_ids:
-        return
-
-    # Фильтруем user_id из списка друзей (не создаём связь с самим собой)
-    friend_ids = [fid for fid in friend_ids if fid != user_id]
-    if not friend_ids:
-        return
-
-    # Формируем двусторонние записи для всех друзей
-    now = datetime.now(tz=timezone.utc)
-    values = []
-
-    for friend_id in friend_ids:
-        # Запись: user_id -> friend_id
-        values.append({
-            "user_id": user_id,
-            "friend_id": friend_id,
-            "created_at": now,
-            "updated_at": now,
-        })
-        # Запись: friend_id -> user_id
-        values.append({
-            "user_id": friend_id,
-            "friend_id": user_id,
-            "created_at": now,
-            "updated_at": now,
-        })
-
-    # Используем INSERT ... ON CONFLICT DO UPDATE для PostgreSQL (upsert)
-    # Это создаст новые записи или обновит updated_at для существующих
-    stmt = insert(FriendLink).values(values)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["user_id", "friend_id"],
-        set_={"updated_at": now},
-    )
-
-    await session.execute(stmt)
-    logger.info(
-        "Batch created/updated %s bidirectional friend_link(s) for user_id=%s", len(friend_ids), user_id
-    )
-
-
 def _serialize_user(user: User) -> dict[str, Any]:
     return {
         "id": user.id,
@@ -262,25 +271,91 @@ def _serialize_user(user: User) -> dict[str, Any]:
     }
 
 
-async def _ensure_active_call(call_id: str) -> tuple[Call | None, str | None]:
-    async with session_scope() as session:
-        result = await session.execute(select(Call).where(Call.call_id == call_id))
-        call = result.scalar_one_or_none()
-
-    if not call:
-        return None, "Call not found. Please create a new call."
-
+def _call_unavailable_reason(call: Call) -> str | None:
     # Handle both naive and aware datetimes for backwards compatibility
     expires_at = _make_aware(call.expires_at)
     if expires_at and expires_at < datetime.now(tz=timezone.utc):
-        return None, "Call has expired. Please create a new call."
+        return "Call has expired. Please create a new call."
 
     if call.status != CallStatus.ACTIVE:
         if call.status == CallStatus.ENDED:
-            return None, "Call has ended. Please create a new call."
-        return None, "Call is not available. Please create a new call."
+            return "Call has ended. Please create a new call."
+        return "Call is not available. Please create a new call."
+
+    return None
+
+
+class AdmissionRejected(Exception):
+    """The WebSocket must be closed with ``close_code`` before it is accepted."""
 
-    return call, None
+    def __init__(self, close_code: int, reason: str) -> None:
+        super().__init__(reason)
+        self.close_code = close_code
+        self.reason = reason
+
+
+@dataclass
+class Admission:
+    user: User
+    call: Call
+    reused_participant: bool
+    other_user_ids: list[int]
+
+
+async def _admit_participant(session: AsyncSession, token: str, call_id: str) -> Admission:
+    """Authenticate the user, validate the call and register participation.
+
+    The happy path costs one connection checkout and two reads (user+call and
+    participant history); the participant record and friend links are handed to
+    the write-behind queue.
+
+    Raises:
+        AdmissionRejected: If the token, user or call is not valid for joining.
+    """
+
+    try:
+        user_id = user_id_from_token(token)
+    except HTTPException as exc:
+        close_code = 4401 if exc.status_code == status.HTTP_401_UNAUTHORIZED else 1011
+        raise AdmissionRejected(close_code, str(exc.detail)) from exc
+
+    # Пользователь и звонок не связаны: явный CROSS JOIN по двум уникальным ключам даёт одну строку
+    row = (
+        await session.execute(
+            select(User, Call).join(Call, true()).where(User.id == user_id, Call.call_id == call_id)
+        )
+    ).first()
+    if row is None:
+        # Медленный путь только для отказа: выясняем, чего именно не хватает
+        if await session.get(User, user_id) is None:
+            raise AdmissionRejected(4401, "User not found")
+        raise AdmissionRejected(4404, "Call not found. Please create a new call.")
+
+    user, call = row
+    reason = _call_unavailable_reason(call)
+    if reason:
+        raise AdmissionRejected(4404, reason)
+
+    # Одним запросом получаем и открытую запись участия, и остальных участников звонка
+    history = (
+        await session.execute(
+            select(Participant.id, Participant.user_id, Participant.left_at).where(Participant.call_id == call.id)
+        )
+    ).all()
+    open_in_db = any(row.user_id == user.id and row.left_at is None for row in history)
+    # Очередь write-behind своя у каждого воркера: тех, кто сейчас в комнате, добавит call_signaling
+    other_user_ids = sorted({row.user_id for row in history} - {user.id})
+
+    now = datetime.now(tz=timezone.utc)
+    created = write_behind.register_join(call.id, user.id, now, open_in_db=open_in_db)
+    write_behind.link_friends(user.id, other_user_ids, now)
+
+    return Admission(
+        user=user,
+        call=call,
+        reused_participant=not created,
+        other_user_ids=other_user_ids,
+    )
 
 
 @router.websocket("/ws/calls/{call_id}")
@@ -303,6 +378,30 @@ async def call_signaling(websocket: WebSocket, call_id: str) -> None:
         return
 
     token, subprotocol = _extract_token(websocket)
+
+    # Быстрый путь: клиент вернулся после обрыва в пределах окна возобновления,
+    # без JWT, запросов к БД, snapshot и user_left/user_joined у собеседников
+    resume_token = _extract_resume_token(websocket)
+    if resume_token:
+        ticket = await call_room_manager.resume(call_id, resume_token)
+        if ticket is not None:
+            await websocket.accept(subprotocol=subprotocol)
+            if ticket.room.reattach(ticket.connection, websocket, subprotocol=subprotocol):
+                await ticket.room.send(
+                    ticket.connection,
+                    {
+                        "type": "call_metadata",
+                        "room_start_time": ticket.room.start_time.isoformat(),
+                        "resume_token": call_room_manager.issue_resume_token(ticket.connection),
+                        "resumed": True,
+                    },
+                )
+                await _relay_session(websocket, call_id, ticket.room, ticket.connection, ticket.finish)
+                return
+            # Соединение выселили между claim и reattach: обычный вход ниже
+            await ticket.finish()
+        logger.info("Resume token for call %s is unknown or expired, joining from scratch", call_id)
+
     if not token:
         await websocket.close(code=4401, reason="Missing authentication token")
         logger.warning(
@@ -311,106 +410,74 @@ async def call_signaling(websocket: WebSocket, call_id: str) -> None:
         )
         return
 
-    async with session_scope() as session:
-        try:
-            user = await get_user_from_token(token, session)
-        except HTTPException as exc:  # Authentication or token validation errors
-            close_code = 4401 if exc.status_code == status.HTTP_401_UNAUTHORIZED else 1011
-            await websocket.close(code=close_code, reason=str(exc.detail))
-            logger.warning(
-                "Authentication failed for call %s (close_code=%s): %s",
-                call_id,
-                close_code,
-                exc.detail,
-            )
-            return
-        except Exception:
-            await websocket.close(code=1011, reason="Authentication failed")
-            logger.exception("Unexpected error authenticating WebSocket for call %s", call_id)
-            return
-
-    call, reason = await _ensure_active_call(call_id)
-    if call is None:
-        await websocket.close(code=4404, reason=reason or "Call is not available")
+    # Аутентификация, проверка звонка и запись участия — одна транзакция
+    try:
+        async with session_scope() as session:
+            admission = await _admit_participant(session, token, call_id)
+    except AdmissionRejected as exc:
+        await websocket.close(code=exc.close_code, reason=exc.reason)
         logger.warning(
-            "Rejected WebSocket connection for call %s: %s", call_id, reason or "unknown reason"
+            "Rejected WebSocket connection for call %s (close_code=%s): %s",
+            call_id,
+            exc.close_code,
+            exc.reason,
         )
         return
+    except Exception:
+        await websocket.close(code=1011, reason="Authentication failed")
+        logger.exception("Unexpected error admitting WebSocket for call %s", call_id)
+        return
+
+    user, call = admission.user, admission.call
+    logger.info(
+        "%s participant record for user_id=%s in call_id=%s (friend_links=%s)",
+        "Reusing existing" if admission.reused_participant else "Queued",
+        user.id,
+        call_id,
+        len(admission.other_user_ids),
+    )
 
     await websocket.accept(subprotocol=subprotocol)
     room = await call_room_manager.get_room(call_id)
+    expires_at = _make_aware(call.expires_at)
+    if expires_at is not None:
+        call_room_manager.schedule_call_expiry(call_id, expires_at)
     serialized_user = _serialize_user(user)
-    await room.add_participant(user.id, websocket, serialized_user)
-
-    # Сохраняем участника в БД для истории звонков
-    participant_db_id: int | None = None
-    async with session_scope() as session:
-        # Проверяем, есть ли уже запись об участии (без left_at)
-        result = await session.execute(
-            select(Participant).where(
-                Participant.call_id == call.id,
-                Participant.user_id == user.id,
-                Participant.left_at.is_(None),
-            )
-        )
-        existing_participant = result.scalar_one_or_none()
-
-        if not existing_participant:
-            # Создаём новую запись
-            participant = Participant(call_id=call.id, user_id=user.id)
-            session.add(participant)
-            await session.commit()
-            await session.refresh(participant)
-            participant_db_id = participant.id
-            logger.info(
-                "Created participant record id=%s for user_id=%s in call_id=%s",
-                participant.id,
-                user.id,
-                call_id,
-            )
-        else:
-            participant_db_id = existing_participant.id
-            logger.info(
-                "Reusing existing participant record id=%s for user_id=%s in call_id=%s",
-                existing_participant.id,
-                user.id,
-                call_id,
-            )
-
-    # Создаём/обновляем friend_links между текущим пользователем и другими участниками звонка
-    async with session_scope() as session:
-        # Получаем всех других участников этого звонка
-        result = await session.execute(
-            select(Participant.user_id)
-            .where(Participant.call_id == call.id, Participant.user_id != user.id)
-            .distinct()
+    try:
+        connection = await room.add_participant(
+            user.id,
+            websocket,
+            serialized_user,
+            subprotocol=subprotocol,
         )
-        other_user_ids = [row[0] for row in result.fetchall()]
-
-        # Создаём/обновляем связи с каждым участником одним batch запросом
-        if other_user_ids:
-            await _batch_create_or_update_friend_links(session, user.id, other_user_ids)
-            await session.commit()
-            logger.info(
-                "Created/updated %s friend_link(s) for user_id=%s in call_id=%s",
-                len(other_user_ids),
-                user.id,
-                call_id,
-            )
+    except HTTPException as exc:
+        # Комната заполнена: запись участия уже поставлена в очередь, закрываем её сразу
+        write_behind.register_leave(call.id, user.id, datetime.now(tz=timezone.utc))
+        await websocket.close(code=4429, reason=str(exc.detail))
+        logger.warning("Rejected user %s from full call %s", user.id, call_id)
+        return
 
     logger.info(
         "WebSocket accepted for call %s; user_id=%s username=%s", call_id, user.id, user.username
     )
+    traffic_recorder.record_join(call_id, user.id)
 
     # Send call metadata including room start time (when first participant joined)
-    await websocket.send_json({
+    # resume_token позволяет вернуться в эту же сессию после обрыва (см. _extract_resume_token)
+    await room.send(connection, {
         "type": "call_metadata",
         "room_start_time": room.start_time.isoformat(),
+        "resume_token": call_room_manager.issue_resume_token(connection),
     })
 
     existing_participants = await room.list_participants(exclude_user_id=user.id)
+    # Состав комнаты общий для всех узлов: так дружба не теряется, если собеседник вошёл
+    # через другой воркер и его запись участия ещё не сброшена в БД
+    write_behind.link_friends(
+        user.id, [participant["id"] for participant in existing_participants], datetime.now(tz=timezone.utc)
+    )
     if existing_participants:
-        await websocket.send_json({"type": "participants_snapshot", "participants": existing_participants})
+        await room.send(connection, {"type": "participants_snapshot", "participants": existing_participants})
         logger.debug(
             "Sent participants_snapshot to user_id=%s for call %s (participants=%s)",
             user.id,
@@ -420,132 +487,183 @@ async def call_signaling(websocket: WebSocket, call_id: str) -> None:
 
     await room.broadcast({"type": "user_joined", "user": serialized_user}, sender_id=user.id)
 
-    # Таймер максимальной длительности звонка
-    settings = get_settings()
-    max_call_duration_seconds = settings.max_call_duration_hours * 3600
-    call_timeout_task = asyncio.create_task(asyncio.sleep(max_call_duration_seconds))
+    await _relay_session(
+        websocket,
+        call_id,
+        room,
+        connection,
+        partial(_finish_session, call_id, call.id, room, connection),
+    )
+
+
+async def _finish_session(call_id: str, call_pk: int, room: CallRoom, connection: ParticipantConnection) -> None:
+    """Remove the participant, announce ``user_left`` and record the leave time."""
+
+    user_id = connection.user_id
+    # Время выхода участника записывается в БД в фоне
+    write_behind.register_leave(call_pk, user_id, datetime.now(tz=timezone.utc))
+    traffic_recorder.record_leave(call_id, user_id)
+
+    await room.remove_participant(user_id, connection)
+    # Участник мог уже переподключиться новым входом (здесь или на другом узле)
+    if not connection.left_announced and not await room.has_participant(user_id):
+        await room.broadcast({"type": "user_left", "user": connection.user}, sender_id=user_id)
+    await call_room_manager.cleanup_room(call_id)
+    logger.info("Cleaned up WebSocket session for user %s in call %s", user_id, call_id)
+
+
+async def _admit_message(
+    websocket: WebSocket,
+    call_id: str,
+    room: CallRoom,
+    connection: ParticipantConnection,
+    message_type: Any,
+) -> bool:
+    """Take rate limit tokens for a client message; False when it must be dropped.
+
+    A dropped message is answered with an ``error`` frame. Once the client has gone
+    over its connection limits ``SIGNALING_RATE_LIMIT_MAX_VIOLATIONS`` times within
+    the window the socket is closed instead (``connection.rate_limiter.exhausted``).
+    Room limits only reject: a busy room must not get its participants disconnected.
+    """
+
+    limiter = connection.rate_limiter
+    if limiter.allow(message_type):
+        if room.rate_limiter.allow(message_type):
+            return True
+        call_room_manager.rate_limited_messages += 1
+        await room.send(connection, {"type": "error", "detail": "Room rate limit exceeded"})
+        return False
+
+    call_room_manager.rate_limited_messages += 1
+    limiter.record_violation()
+    if limiter.exhausted:
+        call_room_manager.rate_limit_disconnects += 1
+        logger.warning(
+            "Closing socket of user %s in call %s: %s rate-limited messages",
+            connection.user_id,
+            call_id,
+            limiter.violations,
+        )
+        await websocket.close(code=RATE_LIMIT_CLOSE_CODE, reason="Rate limit exceeded")
+        return False
+
+    # Предупреждаем в лог один раз за окно, чтобы флуд не превращался в флуд логов
+    if limiter.violations == 1:
+        logger.warning(
+            "User %s in call %s exceeded the rate limit for %.40s messages",
+            connection.user_id,
+            call_id,
+            message_type,
+        )
+    await room.send(connection, {"type": "error", "detail": "Rate limit exceeded"})
+    return False
+
+
+async def _relay_session(
+    websocket: WebSocket,
+    call_id: str,
+    room: CallRoom,
+    connection: ParticipantConnection,
+    finish: Callable[[], Awaitable[None]],
+) -> None:
+    """Relay the participant's messages until the socket closes.
+
+    A socket that drops without a normal close is suspended for resume; ``finish``
+    runs right away otherwise, or when the resume window expires.
+    """
+
+    user_id = connection.user_id
+    binary_frames = connection.binary
+    # Кодируем профиль один раз: он встраивается в каждое пересылаемое offer/answer/ICE
+    serialized_user_json = json_codec.dumps(connection.user)
+    record = partial(traffic_recorder.record_frame, call_id, user_id) if traffic_recorder.enabled else None
+    resumable = False
 
     try:
         while True:
-            # Ожидаем либо сообщение, либо таймаут
-            receive_task = asyncio.create_task(_receive_json_safe(websocket))
-            done, pending = await asyncio.wait(
-                [receive_task, call_timeout_task],
-                return_when=asyncio.FIRST_COMPLETED,
-            )
-
-            # Проверяем, не истекло ли время звонка
-            if call_timeout_task in done:
-                logger.info(
-                    "Maximum call duration (%s hours) exceeded for call %s, user %s",
-                    settings.max_call_duration_hours,
-                    call_id,
-                    user.id,
-                )
-                await websocket.send_json({
-                    "type": "call_ended",
-                    "reason": f"Maximum call duration ({settings.max_call_duration_hours} hours) exceeded"
-                })
-                # Отменяем задачу получения сообщения
-                for task in pending:
-                    task.cancel()
-                break
-
-            # Получили сообщение
             try:
-                message = await receive_task
+                message = await _receive_message(websocket, binary=binary_frames, record=record)
             except ValueError as exc:
-                # Сообщение слишком большое или невалидный JSON
-                await websocket.send_json({"type": "error", "detail": str(exc)})
+                # Слишком большое или невалидное сообщение расходует лимит своего типа, если он известен, иначе "*"
+                message_type = getattr(exc, "message_type", None)
+                if not await _admit_message(websocket, call_id, room, connection, message_type):
+                    if connection.rate_limiter.exhausted:
+                        break
+                    continue
+                await room.send(connection, {"type": "error", "detail": str(exc)})
                 logger.warning(
                     "Invalid message from user %s in call %s: %s",
-                    user.id,
+                    user_id,
                     call_id,
                     exc,
                 )
                 continue
 
-            message_type = message.get("type")
+            connection.touch()
+            message_type = message.type
+
+            # Лимиты проверяются до логирования и пересылки: флуд стоит не больше разбора кадра.
+            # pong расходует bucket ping, иначе поток pong не упирается ни в один лимит
+            limit_type = "ping" if message_type == "pong" else message_type
+            if not await _admit_message(websocket, call_id, room, connection, limit_type):
+                if connection.rate_limiter.exhausted:
+                    break
+                continue
+
+            # Heartbeat: ответ на наш ping или ping клиента, который сам меряет RTT
+            if message_type == "pong":
+                connection.record_pong(message.id)
+                continue
+            if message_type == "ping":
+                await room.send(connection, {"type": "pong", "id": message.id})
+                continue
 
             logger.debug(
                 "Received signaling message from user_id=%s call_id=%s: %s",
-                user.id,
+                user_id,
                 call_id,
                 message,
             )
 
-            if message_type in {"offer", "answer", "ice_candidate"}:
-                try:
-                    target_user_id = int(message.get("to_user_id"))
-                except (TypeError, ValueError):
-                    await websocket.send_json(
-                        {"type": "error", "detail": "Invalid or missing to_user_id"}
-                    )
-                    continue
-
-                if not await room.has_participant(target_user_id):
-                    await websocket.send_json({"type": "error", "detail": "Target user is offline"})
-                    logger.warning(
-                        "Target user %s is offline for message %s from user %s in call %s",
-                        target_user_id,
-                        message_type,
-                        user.id,
-                        call_id,
-                    )
-                    continue
-
-                await room.broadcast(
-                    {
-                        "type": message_type,
-                        "payload": message.get("payload"),
-                        "from_user": _serialize_user(user),
-                    },
-                    sender_id=user.id,
-                    target_id=target_user_id,
-                )
-                logger.info(
-                    "Relayed %s from user %s to user %s in call %s",
-                    message_type,
-                    user.id,
-                    target_user_id,
-                    call_id,
-                )
-            else:
-                await websocket.send_json({"type": "error", "detail": "Unsupported message type"})
+            # Всё, что не heartbeat, прошло схему offer/answer/ice_candidate
+            target_user_id = message.to_user_id
+            if not await room.has_participant(target_user_id):
+                await room.send(connection, {"type": "error", "detail": "Target user is offline"})
                 logger.warning(
-                    "Unsupported signaling message from user %s in call %s: %s",
-                    user.id,
+                    "Target user %s is offline for message %s from user %s in call %s",
+                    target_user_id,
+                    message_type,
+                    user_id,
                     call_id,
-                    message,
                 )
-    except WebSocketDisconnect:
-        logger.info("WebSocket disconnected for user %s in call %s", user.id, call_id)
+                continue
+
+            # Координатор согласований может придержать offer (и его ICE) до свободного слота
+            await room.relay(
+                message_type,
+                SignalingFrame.relay(
+                    message_type, message.payload, serialized_user_json, sender_id=user_id
+                ),
+                sender_id=user_id,
+                target_id=target_user_id,
+            )
+            # ICE-кандидатов при trickle ICE десятки на соединение: логируем их только в debug
+            logger.log(
+                logging.DEBUG if message_type == "ice_candidate" else logging.INFO,
+                "Relayed %s from user %s to user %s in call %s",
+                message_type,
+                user_id,
+                target_user_id,
+                call_id,
+            )
+    except WebSocketDisconnect as exc:
+        logger.info("WebSocket disconnected for user %s in call %s (code=%s)", user_id, call_id, exc.code)
+        # Штатное закрытие клиентом (1000, или 1005 у close() без кода) означает выход из звонка
+        resumable = exc.code not in _NORMAL_CLOSE_CODES
     except Exception:
-        logger.exception("Unhandled error in signaling loop for user %s in call %s", user.id, call_id)
+        logger.exception("Unhandled error in signaling loop for user %s in call %s", user_id, call_id)
         await websocket.close(code=1011, reason="Internal server error")
     finally:
-        # Отменяем таймер при выходе
-        if not call_timeout_task.done():
-            call_timeout_task.cancel()
-
-        # Обновляем время выхода участника из звонка
-        if participant_db_id is not None:
-            async with session_scope() as session:
-                result = await session.execute(
-                    select(Participant).where(Participant.id == participant_db_id)
-                )
-                participant = result.scalar_one_or_none()
-                if participant and participant.left_at is None:
-                    participant.left_at = datetime.now(tz=timezone.utc)
-                    await session.commit()
-                    logger.info(
-                        "Updated participant record id=%s left_at for user_id=%s in call_id=%s",
-                        participant_db_id,
-                        user.id,
-                        call_id,
-                    )
-
-        await room.remove_participant(user.id)
-        await room.broadcast({"type": "user_left", "user": _serialize_user(user)}, sender_id=user.id)
-        await call_room_manager.cleanup_room(call_id)
-        logger.info("Cleaned up WebSocket session for user %s in call %s", user.id, call_id)
+        if not (resumable and call_room_manager.suspend(call_id, room, connection, finish)):
+            await finish()
@@ -1,3 +1,4 @@
+import time
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 
@@ -5,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config.settings import get_settings
+from app.services import metrics
 
 
 class Base(DeclarativeBase):
@@ -15,6 +17,7 @@ settings = get_settings()
 
 engine: AsyncEngine = create_async_engine(str(settings.database_url), echo=settings.debug, future=True)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+metrics.instrument_engine(engine)
 
 
 @asynccontextmanager
@@ -22,10 +25,12 @@ async def session_scope() -> AsyncIterator[AsyncSession]:
     """Context manager for an async database session."""
 
     session: AsyncSession = SessionLocal()
+    started = time.perf_counter()
     try:
         yield session
     finally:
         await session.close()
+        metrics.DB_SESSION_DURATION.observe(time.perf_counter() - started)
 
 
 async def get_session() -> AsyncIterator[AsyncSession]:
@@ -6,6 +6,8 @@ from urllib.parse import urlsplit, urlunsplit
 from pydantic import AnyUrl, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.utils.rate_limits import parse_rate_limits
+
 
 class Settings(BaseSettings):
     """Application configuration loaded from environment variables."""
@@ -40,6 +42,16 @@ class Settings(BaseSettings):
         validation_alias="REFRESH_TOKEN_EXPIRE_DAYS",
         description="JWT refresh token lifetime in days (defaults to 30 days)",
     )
+    refresh_token_reuse_grace_seconds: int = Field(
+        10,
+        validation_alias="REFRESH_TOKEN_REUSE_GRACE_SECONDS",
+        description="Seconds the previous refresh token still yields the current one instead of counting as reuse",
+    )
+    refresh_token_prune_interval_hours: float = Field(
+        24.0,
+        validation_alias="REFRESH_TOKEN_PRUNE_INTERVAL_HOURS",
+        description="How often each worker deletes expired and revoked refresh token families; 0 disables it",
+    )
     # Store as strings to avoid pydantic-settings automatic JSON parsing for list[str] types
     stun_servers_str: str = Field("", validation_alias="STUN_SERVERS")
     turn_servers_str: str = Field("", validation_alias="TURN_SERVERS")
@@ -73,6 +85,144 @@ class Settings(BaseSettings):
         validation_alias="EMPTY_ROOM_CLEANUP_MINUTES",
         description="Minutes after which empty rooms are automatically cleaned up",
     )
+    signaling_send_timeout_seconds: float = Field(
+        5.0,
+        validation_alias="SIGNALING_SEND_TIMEOUT_SECONDS",
+        description="Deadline for delivering one signaling message to one participant",
+    )
+    signaling_outbound_queue_high_water: int = Field(
+        64,
+        validation_alias="SIGNALING_OUTBOUND_QUEUE_HIGH_WATER",
+        description="Outbound queue depth at which queued ICE candidates start being dropped",
+    )
+    signaling_outbound_queue_limit: int = Field(
+        256,
+        validation_alias="SIGNALING_OUTBOUND_QUEUE_LIMIT",
+        description="Outbound queue depth at which a slow participant is disconnected (close code 4008)",
+    )
+    signaling_ice_coalesce_window_ms: int = Field(
+        20,
+        validation_alias="SIGNALING_ICE_COALESCE_WINDOW_MS",
+        description="Window for batching ICE candidates into one frame for clients using ice-batch.v1 (0 disables)",
+    )
+    signaling_heartbeat_interval_seconds: float = Field(
+        10.0,
+        validation_alias="SIGNALING_HEARTBEAT_INTERVAL_SECONDS",
+        description="Interval between application-level pings to signaling clients (0 disables)",
+    )
+    signaling_heartbeat_timeout_seconds: float = Field(
+        30.0,
+        validation_alias="SIGNALING_HEARTBEAT_TIMEOUT_SECONDS",
+        description="Silence after which a client that answers pings is disconnected (close code 4009)",
+    )
+    signaling_resume_grace_seconds: float = Field(
+        15.0,
+        validation_alias="SIGNALING_RESUME_GRACE_SECONDS",
+        description="How long a dropped signaling connection can be resumed with its resume token (0 disables)",
+    )
+    signaling_max_concurrent_negotiations: int = Field(
+        4,
+        validation_alias="SIGNALING_MAX_CONCURRENT_NEGOTIATIONS",
+        description="Offer/answer exchanges a participant takes part in at once; further offers are queued (0 disables)",
+    )
+    signaling_negotiation_timeout_seconds: float = Field(
+        10.0,
+        validation_alias="SIGNALING_NEGOTIATION_TIMEOUT_SECONDS",
+        description="Time after which an unanswered offer releases its negotiation slot",
+    )
+    signaling_rate_limits: str = Field(
+        "offer=10/60,answer=10/60,ice_candidate=100/400,ping=2/10,*=5/20",
+        validation_alias="SIGNALING_RATE_LIMITS",
+        description="Per-connection token buckets as type=rate/burst; '*' covers types without their own limit",
+    )
+    signaling_room_rate_limits: str = Field(
+        "*=1000/5000",
+        validation_alias="SIGNALING_ROOM_RATE_LIMITS",
+        description="Per-room token buckets shared by all participants, same format as SIGNALING_RATE_LIMITS",
+    )
+    signaling_rate_limit_max_violations: int = Field(
+        20,
+        validation_alias="SIGNALING_RATE_LIMIT_MAX_VIOLATIONS",
+        description="Rate-limited messages within the violation window after which the socket is closed (0 never closes)",
+    )
+    signaling_rate_limit_violation_window_seconds: float = Field(
+        10.0,
+        validation_alias="SIGNALING_RATE_LIMIT_VIOLATION_WINDOW_SECONDS",
+        description="Window over which rate limit violations of one connection are counted",
+    )
+    signaling_room_engine: str = Field(
+        "lock",
+        validation_alias="SIGNALING_ROOM_ENGINE",
+        description="Signaling room execution model: 'lock' (shared room lock) or 'actor' (one task per room)",
+    )
+    signaling_record_path: Optional[str] = Field(
+        None,
+        validation_alias="SIGNALING_RECORD_PATH",
+        description="Append anonymized signaling frame timings to this binary log ('{pid}' becomes the worker PID)",
+    )
+
+    # Cache of users resolved from access tokens
+    user_cache_max_size: int = Field(
+        10000,
+        validation_alias="USER_CACHE_MAX_SIZE",
+        description="Users kept in each worker's identity cache (0 disables the cache)",
+    )
+    user_cache_ttl_seconds: float = Field(
+        60.0,
+        validation_alias="USER_CACHE_TTL_SECONDS",
+        description="Lifetime of an identity cache entry; bounds staleness when invalidations are missed",
+    )
+    init_data_cache_max_size: int = Field(
+        10000,
+        validation_alias="INIT_DATA_CACHE_MAX_SIZE",
+        description="Verified initData payloads remembered per worker for repeat submissions; 0 disables the cache",
+    )
+    init_data_cache_seconds: float = Field(
+        300.0,
+        validation_alias="INIT_DATA_CACHE_SECONDS",
+        description="How long a repeat submission of the same initData skips verification",
+    )
+
+    # Write-behind queue for participant history and friend links
+    write_behind_flush_interval_seconds: float = Field(
+        1.0,
+        validation_alias="WRITE_BEHIND_FLUSH_INTERVAL_SECONDS",
+        description="Maximum delay before buffered participant/friend-link writes are flushed",
+    )
+    write_behind_max_batch: int = Field(
+        500,
+        validation_alias="WRITE_BEHIND_MAX_BATCH",
+        description="Number of buffered rows that triggers an immediate write-behind flush",
+    )
+    write_behind_max_retries: int = Field(
+        5,
+        validation_alias="WRITE_BEHIND_MAX_RETRIES",
+        description="Failed flushes in a row after which the batch is written in parts and failing rows are dropped",
+    )
+
+    # Signaling backplane (cross-worker rooms)
+    signaling_backplane: str = Field(
+        "memory",
+        validation_alias="SIGNALING_BACKPLANE",
+        description="Signaling pub/sub backplane: 'memory' (single process) or 'redis'",
+    )
+    signaling_backplane_url: Optional[str] = Field(
+        None,
+        validation_alias="SIGNALING_BACKPLANE_URL",
+        description="redis:// URL of the Redis-protocol server used by the 'redis' backplane",
+    )
+
+    # Prometheus metrics
+    metrics_enabled: bool = Field(
+        True,
+        validation_alias="METRICS_ENABLED",
+        description="Collect Prometheus metrics and serve /metrics (needs the prometheus-client package)",
+    )
+    monitoring_token: Optional[str] = Field(
+        None,
+        validation_alias="MONITORING_TOKEN",
+        description="Bearer token for /metrics and the /health/* stats endpoints; unset hides them (404)",
+    )
 
     @staticmethod
     def _parse_csv(value: str) -> list[str]:
@@ -157,6 +307,14 @@ class Settings(BaseSettings):
         if self.bot_webhook_url:
             logger.info("BOT_WEBHOOK_URL configured: %s", self.bot_webhook_url)
 
+    @field_validator("signaling_rate_limits", "signaling_room_rate_limits")
+    @classmethod
+    def _validate_rate_limits(cls, value: str) -> str:
+        """Fail at startup on a malformed rate limit list."""
+
+        parse_rate_limits(value)
+        return value
+
     @field_validator("database_url", mode="before")
     @classmethod
     def _ensure_asyncpg_scheme(cls, value: str | AnyUrl | None) -> str | AnyUrl:
@@ -16,6 +16,7 @@ from app.api import get_api_router
 from app.config.database import Base, engine
 from app.config.logging import configure_logging
 from app.config.settings import get_settings
+from app.services import metrics
 import app.models  # noqa: F401  # Ensure models are registered with metadata
 import app.services.bot_handlers  # noqa: F401  # Register bot handlers on startup
 from app.services.telegram_bot import log_webhook_status
@@ -48,9 +49,23 @@ async def lifespan(app: FastAPI):
         await engine.dispose()
         raise
 
-    # Start background cleanup task for stale rooms
+    # Connect the signaling backplane and start background cleanup of stale rooms
     from app.services.signaling import call_room_manager
-    call_room_manager.start_cleanup_task()
+    from app.services.write_behind import write_behind
+    from app.services.traffic_recorder import traffic_recorder
+    from app.services.identity_cache import user_cache
+    from app.tasks.prune_refresh_tokens import prune_refresh_tokens_periodically
+    await call_room_manager.start()
+    # Инвалидации кэша пользователей расходятся по воркерам через тот же backplane
+    await user_cache.attach(call_room_manager.backplane)
+    write_behind.start()
+    traffic_recorder.start()
+    # Истёкшие и отозванные refresh-токены удаляются в фоне; cron-задача остаётся для REFRESH_TOKEN_PRUNE_INTERVAL_HOURS=0
+    prune_task = None
+    if settings.refresh_token_prune_interval_hours > 0:
+        prune_task = asyncio.create_task(
+            prune_refresh_tokens_periodically(settings.refresh_token_prune_interval_hours * 3600)
+        )
 
     # Log Telegram webhook status to help diagnose missing bot replies
     await log_webhook_status()
@@ -61,6 +76,12 @@ async def lifespan(app: FastAPI):
         logger.info("Application lifespan cancelled during shutdown; exiting gracefully")
         return
     finally:
+        if prune_task is not None:
+            prune_task.cancel()
+        await call_room_manager.shutdown()
+        # Дописываем историю участников до закрытия пула соединений
+        await write_behind.close()
+        await traffic_recorder.close()
         await engine.dispose()
         logger.info("Database engine disposed")
 
@@ -161,5 +182,10 @@ app.add_middleware(
 app.add_middleware(SecurityHeadersMiddleware)
 logger.info("Security headers middleware enabled (Telegram Mini App compatible)")
 
+# Prometheus: внешний слой, чтобы в задержку попадали и остальные middleware
+if metrics.ENABLED:
+    app.add_middleware(metrics.HTTPMetricsMiddleware)
+    logger.info("Prometheus metrics enabled at /metrics")
+
 # Routers
 app.include_router(get_api_router())
@@ -4,6 +4,7 @@ from app.models.call import Call, CallStatus
 from app.models.call_stats import CallStats
 from app.models.friend_link import FriendLink
 from app.models.participant import Participant
+from app.models.refresh_token import RefreshTokenFamily
 from app.models.user import User
 
-__all__ = ["User", "Call", "CallStatus", "Participant", "CallStats", "FriendLink"]
+__all__ = ["User", "Call", "CallStatus", "Participant", "CallStats", "FriendLink", "RefreshTokenFamily"]
@@ -0,0 +1,31 @@
+"""Refresh token family model."""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config.database import Base
+from app.models.call import utc_now
+
+
+class RefreshTokenFamily(Base):
+    """One login session: the chain of refresh tokens issued from a single initData authorization.
+
+    Tokens themselves are not stored. A token names its family and generation and
+    is signed with ``SECRET_KEY``; only the current generation of a family can be
+    exchanged, and each exchange bumps it.
+    """
+
+    __tablename__ = "refresh_token_families"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # Поколение текущего (единственного действительного) токена семьи
+    generation: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+    rotated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+    # Абсолютный срок: ротация его не продлевает
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,13 +1,10 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
-import json
 import logging
 import re
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any
-from urllib.parse import parse_qsl
 
 import jwt
 from fastapi import Depends, HTTPException, Request, status
@@ -18,6 +15,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.settings import get_settings
 from app.config.database import get_session
 from app.models import User
+from app.services.identity_cache import attach_cached_user, user_cache
+from app.services.init_data import VerifiedInitData, init_data_verifier
+from app.services.user_upsert import upsert_user
 
 
 logger = logging.getLogger(__name__)
@@ -25,36 +25,17 @@ _bearer_scheme = HTTPBearer(auto_error=False)
 _username_regex = re.compile(r"^[A-Za-z0-9_]{5,32}$")
 
 
-def _build_data_check_string(payload: dict[str, str]) -> str:
-    pairs = [f"{key}={value}" for key, value in sorted(payload.items()) if key != "hash"]
-    return "\n".join(pairs)
-
-
-def _validate_signature(init_data: str, bot_token: str) -> dict[str, str]:
-    data = dict(parse_qsl(init_data, keep_blank_values=True))
-    hash_from_client = data.get("hash")
-    if not hash_from_client:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing hash in initData")
-
-    # https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app
-    # secret_key = HMAC_SHA256("WebAppData", <bot_token>)
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
-    data_check_string = _build_data_check_string(data)
-    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
-
-    if not hmac.compare_digest(calculated_hash, hash_from_client):
-        logger.warning("Telegram initData signature validation failed")
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid initData hash")
-
-    return data
-
-
-def _normalize_for_compare(value: str | None) -> str | None:
-    return value.casefold() if isinstance(value, str) else value
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated user as proven by the access token, without loading the ``users`` row.
 
+    ``username`` and ``first_name`` come from token claims: they are what the user
+    had when the token was issued, and None in tokens issued before they were added.
+    """
 
-def _should_update(current: str | None, incoming: str | None) -> bool:
-    return incoming is not None and _normalize_for_compare(current) != _normalize_for_compare(incoming)
+    id: int
+    username: str | None = None
+    first_name: str | None = None
 
 
 def _is_username_valid(username: str | None) -> bool:
@@ -70,33 +51,7 @@ def validate_init_data(init_data: str, *, bot_token: str, max_age_seconds: int =
         max_age_seconds: Allowed age for auth_date to mitigate replay attacks.
     """
 
-    logger.info("Validating Telegram initData payload")
-    data = _validate_signature(init_data, bot_token)
-
-    auth_date = data.get("auth_date")
-    if auth_date:
-        timestamp = datetime.fromtimestamp(int(auth_date), tz=timezone.utc)
-        if datetime.now(tz=timezone.utc) - timestamp > timedelta(seconds=max_age_seconds):
-            logger.warning("Received expired initData payload: auth_date=%s", auth_date)
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="initData is too old")
-
-    user_payload = data.get("user")
-    if not user_payload:
-        logger.warning("Received initData payload without user info")
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing user payload in initData")
-
-    try:
-        user_data: dict[str, Any] = json.loads(user_payload)
-    except json.JSONDecodeError as exc:  # pragma: no cover - defensive
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user payload") from exc
-
-    logger.info(
-        "Telegram initData validated for user_id=%s username=%s",
-        user_data.get("id"),
-        user_data.get("username"),
-    )
-
-    return user_data
+    return init_data_verifier.verify(init_data, bot_token=bot_token, max_age_seconds=max_age_seconds).user
 
 
 async def get_or_create_user(session: AsyncSession, telegram_user: dict[str, Any]) -> User:
@@ -115,64 +70,33 @@ async def get_or_create_user(session: AsyncSession, telegram_user: dict[str, Any
             incoming_username,
         )
 
-    result = await session.execute(select(User).where(User.telegram_user_id == telegram_user_id))
-    user = result.scalar_one_or_none()
-    is_new = user is None
-
-    if user:
-        has_changes = False
-
-        if _should_update(user.first_name, telegram_user.get("first_name")):
-            user.first_name = telegram_user.get("first_name")
-            has_changes = True
-
-        if _should_update(user.last_name, telegram_user.get("last_name")):
-            user.last_name = telegram_user.get("last_name")
-            has_changes = True
-
-        if _should_update(user.photo_url, telegram_user.get("photo_url")):
-            user.photo_url = telegram_user.get("photo_url")
-            has_changes = True
-
-        if username_valid and _should_update(user.username, incoming_username):
-            user.username = incoming_username
-            has_changes = True
-
-        if not has_changes:
-            logger.info(
-                "User unchanged for telegram_user_id=%s (id=%s)",
-                telegram_user_id,
-                user.id,
-            )
-    else:
-        user = User(
-            telegram_user_id=telegram_user_id,
-            username=incoming_username if username_valid else None,
-            first_name=telegram_user.get("first_name"),
-            last_name=telegram_user.get("last_name"),
-            photo_url=telegram_user.get("photo_url"),
-        )
-        session.add(user)
+    # None не затирает сохранённое значение, невалидный username тоже
+    profile = {
+        column: telegram_user[column]
+        for column in ("first_name", "last_name", "photo_url")
+        if telegram_user.get(column) is not None
+    }
+    if username_valid:
+        profile["username"] = incoming_username
 
-    await session.commit()
-    await session.refresh(user)
+    user, outcome = await upsert_user(session, telegram_user_id, profile, ignore_case=True)
     logger.info(
-        "User %s persisted (id=%s, username=%s)",
-        "created" if is_new else "updated",
+        "User %s (id=%s, username=%s, telegram_user_id=%s)",
+        outcome,
         user.id,
         user.username,
+        telegram_user_id,
     )
     return user
 
 
-def build_init_data_fingerprint(init_data: str) -> str:
-    """Return a short fingerprint of the validated initData payload."""
-
-    digest = hashlib.sha256(init_data.encode()).hexdigest()
-    return digest[:16]
-
-
-def create_access_token(subject: str, *, fingerprint: str | None = None) -> str:
+def create_access_token(
+    subject: str,
+    *,
+    fingerprint: str | None = None,
+    username: str | None = None,
+    first_name: str | None = None,
+) -> str:
     settings = get_settings()
     if not settings.secret_key:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="SECRET_KEY is not configured")
@@ -182,6 +106,11 @@ def create_access_token(subject: str, *, fingerprint: str | None = None) -> str:
     to_encode = {"sub": subject, "exp": expire}
     if fingerprint:
         to_encode["fp"] = fingerprint
+    # Профиль в claims: get_current_principal обходится без запроса к users
+    if username:
+        to_encode["username"] = username
+    if first_name:
+        to_encode["first_name"] = first_name
     token = jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
     logger.info(
         "Issued access token for user_id=%s with ttl_minutes=%s fingerprint=%s",
@@ -192,71 +121,87 @@ def create_access_token(subject: str, *, fingerprint: str | None = None) -> str:
     return token
 
 
-def authenticate_user_from_init_data(init_data: str) -> dict[str, Any]:
+def authenticate_user_from_init_data(init_data: str) -> VerifiedInitData:
     """Validate initData using the configured bot token."""
 
     settings = get_settings()
     if not settings.bot_token:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="BOT_TOKEN is not configured")
 
-    user_data = validate_init_data(init_data, bot_token=settings.bot_token)
+    verified = init_data_verifier.verify(init_data, bot_token=settings.bot_token)
     logger.info(
         "Authenticated Telegram user payload for user_id=%s username=%s",
-        user_data.get("id"),
-        user_data.get("username"),
+        verified.user.get("id"),
+        verified.user.get("username"),
     )
-    return user_data
+    return verified
 
 
-def _decode_user_id_from_token(token: str, secret_key: str) -> int:
+def _decode_token_claims(token: str, secret_key: str) -> dict[str, Any]:
     try:
         payload = jwt.decode(token, secret_key, algorithms=["HS256"])
-        user_id = payload.get("sub")
     except jwt.ExpiredSignatureError as exc:  # pragma: no cover - expiry path
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired") from exc
     except jwt.InvalidTokenError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
 
-    if not user_id:
+    if not payload.get("sub"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    return int(user_id)
+    return payload
+
+
+def _decode_user_id_from_token(token: str, secret_key: str) -> int:
+    return int(_decode_token_claims(token, secret_key)["sub"])
+
 
+async def get_user_by_id(session: AsyncSession, user_id: int) -> User:
+    """Return the user, from the identity cache when possible; 401 if it no longer exists."""
 
-async def _get_user_by_id(session: AsyncSession, user_id: int) -> User:
+    if user_cache.enabled:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return await attach_cached_user(session, cached)
+
+    epoch = user_cache.epoch
     result = await session.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user_cache.put(user, epoch=epoch)
     return user
 
 
 async def _resolve_user_from_token(token: str, session: AsyncSession, secret_key: str) -> User:
     user_id = _decode_user_id_from_token(token, secret_key)
-    return await _get_user_by_id(session, user_id)
-
+    return await get_user_by_id(session, user_id)
 
-async def get_current_user(
-    request: Request,
-    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer_scheme),
-    session: AsyncSession = Depends(get_session),
-) -> User:
-    """Extract and validate the current user from httpOnly cookie or bearer token (fallback)."""
 
+def _request_token(request: Request, credentials: HTTPAuthorizationCredentials | None, caller: str) -> str:
     # Try to get token from httpOnly cookie first (preferred method)
     token = request.cookies.get("access_token")
 
     # Fallback to Authorization header for backwards compatibility
     if not token and credentials:
         token = credentials.credentials
-        logger.info("[get_current_user] using Authorization header (fallback)")
+        logger.info("[%s] using Authorization header (fallback)", caller)
 
     if not token:
-        logger.warning("[get_current_user] no token found in cookie or Authorization header")
+        logger.warning("[%s] no token found in cookie or Authorization header", caller)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    logger.info("[get_current_user] received token from %s", "cookie" if request.cookies.get("access_token") else "Authorization header")
+    logger.info("[%s] received token from %s", caller, "cookie" if request.cookies.get("access_token") else "Authorization header")
+    return token
+
+
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer_scheme),
+    session: AsyncSession = Depends(get_session),
+) -> User:
+    """Extract and validate the current user from httpOnly cookie or bearer token (fallback)."""
 
+    token = _request_token(request, credentials, "get_current_user")
     settings = get_settings()
     if not settings.secret_key:
         raise HTTPException(
@@ -274,17 +219,49 @@ async def get_current_user(
     return user
 
 
-async def get_current_user_id(current_user: User = Depends(get_current_user)) -> int:
+async def get_current_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer_scheme),
+) -> Principal:
+    """Authenticate the request from the token alone, for endpoints that do not need the ``users`` row.
+
+    Unlike ``get_current_user`` this does not check that the user still exists.
+    """
+
+    token = _request_token(request, credentials, "get_current_principal")
+    settings = get_settings()
+    if not settings.secret_key:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="SECRET_KEY is not configured",
+        )
+
+    try:
+        claims = _decode_token_claims(token, settings.secret_key)
+    except HTTPException as exc:
+        logger.warning("[get_current_principal] token rejected: %s", exc.detail)
+        raise
+
+    return Principal(int(claims["sub"]), claims.get("username"), claims.get("first_name"))
+
+
+async def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> int:
     """FastAPI dependency that returns the authenticated user's id."""
 
-    return current_user.id
+    return principal.id
 
 
-async def get_user_from_token(token: str, session: AsyncSession) -> User:
-    """Validate a raw bearer token and return the associated user."""
+def user_id_from_token(token: str) -> int:
+    """Validate a raw bearer token and return its user id without touching the database."""
 
     settings = get_settings()
     if not settings.secret_key:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="SECRET_KEY is not configured")
 
-    return await _resolve_user_from_token(token, session, settings.secret_key)
+    return _decode_user_id_from_token(token, settings.secret_key)
+
+
+async def get_user_from_token(token: str, session: AsyncSession) -> User:
+    """Validate a raw bearer token and return the associated user."""
+
+    return await get_user_by_id(session, user_id_from_token(token))
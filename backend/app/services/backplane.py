@@ -0,0 +1,411 @@
+"""Pub/sub backplane that lets signaling rooms span worker processes.
+
+Every node (uvicorn worker or container) keeps its own WebSocket connections,
+while room membership and cross-node messages travel through a backplane:
+
+- ``InMemoryBackplane`` — default, for a single process. Several instances may
+  share one ``InMemoryHub`` to emulate multiple nodes (used in tests).
+- ``RedisBackplane`` — speaks the Redis protocol (RESP) directly over asyncio
+  streams, so any Redis-compatible server (Redis, Valkey, KeyDB or a local
+  stand-in) can be used without extra dependencies.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+from urllib.parse import unquote, urlsplit
+
+from app.config.settings import Settings, get_settings
+from app.utils import json_codec
+
+logger = logging.getLogger("app.webrtc")
+
+MessageHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+# Пауза перед переподключением подписки удваивается от минимума до максимума
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 30.0
+
+_CHANNEL_PREFIX = "signaling:room:"
+_MEMBERS_PREFIX = "signaling:members:"
+
+
+def room_channel(call_id: str) -> str:
+    """Return the pub/sub channel name for a call room."""
+
+    return f"{_CHANNEL_PREFIX}{call_id}"
+
+
+class Backplane(ABC):
+    """Cross-node messaging and membership registry for signaling rooms.
+
+    Messages published by a node are never delivered back to the same node.
+    """
+
+    def __init__(self) -> None:
+        self.node_id = uuid.uuid4().hex
+
+    async def start(self) -> None:
+        """Open connections required by the backplane."""
+
+    async def close(self) -> None:
+        """Release connections held by the backplane."""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str) -> None:
+        ...
+
+    @abstractmethod
+    async def add_member(self, call_id: str, user_id: int, user: dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def remove_member(self, call_id: str, user_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def get_members(self, call_id: str) -> dict[int, dict[str, Any]]:
+        ...
+
+
+class InMemoryHub:
+    """Shared state for in-process backplane nodes."""
+
+    def __init__(self) -> None:
+        self.subscribers: dict[str, dict[str, MessageHandler]] = defaultdict(dict)
+        self.members: dict[str, dict[int, dict[str, Any]]] = defaultdict(dict)
+
+
+class InMemoryBackplane(Backplane):
+    """Backplane for a single process; nodes sharing a hub see each other."""
+
+    def __init__(self, hub: InMemoryHub | None = None) -> None:
+        super().__init__()
+        self._hub = hub or InMemoryHub()
+
+    async def publish(self, channel: str, message: dict[str, Any]) -> None:
+        handlers = [
+            handler
+            for node_id, handler in self._hub.subscribers.get(channel, {}).items()
+            if node_id != self.node_id
+        ]
+        for handler in handlers:
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception("Backplane handler failed for channel %s", channel)
+
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        self._hub.subscribers[channel][self.node_id] = handler
+
+    async def unsubscribe(self, channel: str) -> None:
+        handlers = self._hub.subscribers.get(channel)
+        if handlers is not None:
+            handlers.pop(self.node_id, None)
+            if not handlers:
+                self._hub.subscribers.pop(channel, None)
+
+    async def add_member(self, call_id: str, user_id: int, user: dict[str, Any]) -> None:
+        self._hub.members[call_id][user_id] = user
+
+    async def remove_member(self, call_id: str, user_id: int) -> None:
+        members = self._hub.members.get(call_id)
+        if members is not None:
+            members.pop(user_id, None)
+            if not members:
+                self._hub.members.pop(call_id, None)
+
+    async def get_members(self, call_id: str) -> dict[int, dict[str, Any]]:
+        return dict(self._hub.members.get(call_id, {}))
+
+
+class RespError(Exception):
+    """Error reply returned by a Redis-protocol server."""
+
+
+def encode_command(*args: str | bytes | int) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            value = arg
+        else:
+            value = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """Read one RESP reply from the stream."""
+
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Backplane connection closed")
+
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode()
+    if prefix == b"-":
+        raise RespError(payload.decode())
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+
+    raise RespError(f"Unexpected RESP prefix: {prefix!r}")
+
+
+class _RespConnection:
+    """Minimal request/response connection to a Redis-protocol server."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, url: str) -> _RespConnection:
+        parsed = urlsplit(url)
+        reader, writer = await asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 6379)
+        connection = cls(reader, writer)
+
+        if parsed.password:
+            auth_args = [unquote(parsed.password)]
+            if parsed.username:
+                auth_args.insert(0, unquote(parsed.username))
+            await connection.execute("AUTH", *auth_args)
+
+        database = parsed.path.lstrip("/")
+        if database:
+            await connection.execute("SELECT", database)
+
+        return connection
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing()
+
+    async def execute(self, *args: str | bytes | int) -> Any:
+        """Send a command and read its reply.
+
+        If the exchange is interrupted (cancellation, network error) the reply
+        may still be in flight, and the next command would read it as its own:
+        the connection is closed and must be replaced. Error replies leave the
+        stream in sync and only raise ``RespError``.
+        """
+
+        async with self._lock:
+            try:
+                self.writer.write(encode_command(*args))
+                await self.writer.drain()
+                return await read_reply(self.reader)
+            except RespError:
+                raise
+            except BaseException:
+                self.writer.close()
+                raise
+
+    async def send(self, *args: str | bytes | int) -> None:
+        """Write a command without waiting for its reply (pub/sub mode)."""
+
+        self.writer.write(encode_command(*args))
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:  # pragma: no cover - best effort shutdown
+            pass
+
+
+class RedisBackplane(Backplane):
+    """Backplane backed by a Redis-protocol server (PUBLISH/SUBSCRIBE + hashes)."""
+
+    def __init__(self, url: str, *, members_ttl_seconds: int = 12 * 3600) -> None:
+        super().__init__()
+        self._url = url
+        self._members_ttl_seconds = members_ttl_seconds
+        self._commands: _RespConnection | None = None
+        self._subscriber: _RespConnection | None = None
+        self._listener_task: asyncio.Task | None = None
+        self._handlers: dict[str, MessageHandler] = {}
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._commands is not None:
+                return
+
+            self._commands = await _RespConnection.open(self._url)
+            self._subscriber = await _RespConnection.open(self._url)
+            self._listener_task = asyncio.create_task(self._listen())
+            logger.info("Redis signaling backplane connected (node_id=%s)", self.node_id)
+
+    async def close(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        for connection in (self._subscriber, self._commands):
+            if connection is not None:
+                await connection.close()
+        self._subscriber = None
+        self._commands = None
+
+    async def _execute(self, *args: str | bytes | int) -> Any:
+        if self._commands is None:
+            await self.start()
+        connection = await self._command_connection()
+        try:
+            return await connection.execute(*args)
+        except (ConnectionError, OSError):
+            # Сервер закрыл простаивавшее соединение (перезапуск Redis): одна попытка на новом
+            logger.warning("Redis backplane command connection lost; reconnecting")
+            return await (await self._command_connection()).execute(*args)
+
+    async def _command_connection(self) -> _RespConnection:
+        assert self._commands is not None
+        if self._commands.closed:
+            # Прерванный обмен закрывает соединение: ответы в нём могли сбиться, берём новое
+            async with self._start_lock:
+                if self._commands is not None and self._commands.closed:
+                    self._commands = await _RespConnection.open(self._url)
+        assert self._commands is not None
+        return self._commands
+
+    async def _listen(self) -> None:
+        """Dispatch subscription messages, reconnecting with backoff when the stream fails.
+
+        After a reconnect every channel in ``_handlers`` is subscribed again;
+        messages published while the connection was down are lost.
+        """
+
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            try:
+                if self._subscriber is None or self._subscriber.closed:
+                    self._subscriber = await _RespConnection.open(self._url)
+                    for channel in list(self._handlers):
+                        await self._subscriber.send("SUBSCRIBE", channel)
+                    logger.info("Redis signaling backplane subscription reconnected (node_id=%s)", self.node_id)
+                    delay = RECONNECT_MIN_SECONDS
+                await self._dispatch(self._subscriber.reader)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis backplane subscription stream failed; reconnecting in %.1fs", delay)
+
+            if self._subscriber is not None:
+                await self._subscriber.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            reply = await read_reply(reader)
+            if not isinstance(reply, list) or len(reply) != 3 or reply[0] != b"message":
+                continue
+
+            channel = reply[1].decode()
+            handler = self._handlers.get(channel)
+            if handler is None:
+                continue
+
+            try:
+                envelope = json_codec.loads(reply[2])
+            except Exception:
+                logger.warning("Dropping malformed backplane message on %s", channel)
+                continue
+
+            if envelope.get("node") == self.node_id:
+                continue
+
+            try:
+                await handler(envelope.get("message") or {})
+            except Exception:
+                logger.exception("Backplane handler failed for channel %s", channel)
+
+    async def publish(self, channel: str, message: dict[str, Any]) -> None:
+        envelope = json_codec.dumps({"node": self.node_id, "message": message})
+        await self._execute("PUBLISH", channel, envelope)
+
+    async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        if self._listener_task is None:
+            await self.start()
+        self._handlers[channel] = handler
+        await self._send_subscription("SUBSCRIBE", channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        if self._handlers.pop(channel, None) is not None:
+            await self._send_subscription("UNSUBSCRIBE", channel)
+
+    async def _send_subscription(self, command: str, channel: str) -> None:
+        subscriber = self._subscriber
+        if subscriber is None or subscriber.closed:
+            # Подписка восстанавливается: _listen подпишет все каналы из _handlers сам
+            return
+        try:
+            await subscriber.send(command, channel)
+        except Exception:
+            logger.warning("Failed to send %s %s; the subscription reconnects", command, channel)
+
+    async def add_member(self, call_id: str, user_id: int, user: dict[str, Any]) -> None:
+        key = f"{_MEMBERS_PREFIX}{call_id}"
+        await self._execute("HSET", key, user_id, json_codec.dumps(user))
+        # TTL защищает от "призраков", если узел упал, не успев удалить участника
+        await self._execute("EXPIRE", key, self._members_ttl_seconds)
+
+    async def remove_member(self, call_id: str, user_id: int) -> None:
+        await self._execute("HDEL", f"{_MEMBERS_PREFIX}{call_id}", user_id)
+
+    async def get_members(self, call_id: str) -> dict[int, dict[str, Any]]:
+        reply = await self._execute("HGETALL", f"{_MEMBERS_PREFIX}{call_id}") or []
+        return {int(reply[index]): json_codec.loads(reply[index + 1]) for index in range(0, len(reply), 2)}
+
+
+def create_backplane(settings: Settings | None = None) -> Backplane:
+    """Build the backplane selected by ``SIGNALING_BACKPLANE``."""
+
+    settings = settings or get_settings()
+    kind = settings.signaling_backplane.strip().lower()
+
+    if kind == "memory":
+        return InMemoryBackplane()
+
+    if kind == "redis":
+        if not settings.signaling_backplane_url:
+            raise RuntimeError("SIGNALING_BACKPLANE_URL is required for the redis signaling backplane")
+        return RedisBackplane(
+            settings.signaling_backplane_url,
+            members_ttl_seconds=settings.max_call_duration_hours * 3600,
+        )
+
+    raise RuntimeError(f"Unknown signaling backplane: {settings.signaling_backplane}")
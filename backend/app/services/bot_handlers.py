@@ -6,12 +6,12 @@ from typing import Any
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.database import session_scope
 from app.config.settings import get_settings
-from app.models import User
+from app.services.metrics import TelegramRequestMetrics
+from app.services.user_upsert import upsert_user
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +26,7 @@ def get_bot() -> Bot:
     if _bot is None:
         settings = get_settings()
         _bot = Bot(token=settings.bot_token)
+        _bot.session.middleware(TelegramRequestMetrics())
     return _bot
 
 
@@ -50,30 +51,13 @@ async def register_or_update_user(telegram_user: types.User) -> None:
     last_name = telegram_user.last_name
 
     async with session_scope() as db_session:
-        # Проверяем, существует ли пользователь
-        result = await db_session.execute(
-            select(User).where(User.telegram_user_id == telegram_user_id)
+        # Бот присылает профиль целиком: пустые поля тоже переносим
+        _, outcome = await upsert_user(
+            db_session,
+            telegram_user_id,
+            {"username": username, "first_name": first_name, "last_name": last_name},
         )
-        user = result.scalar_one_or_none()
-
-        if user:
-            # Обновляем данные существующего пользователя
-            user.username = username
-            user.first_name = first_name
-            user.last_name = last_name
-            logger.info("Updated user data for telegram_user_id=%s", telegram_user_id)
-        else:
-            # Создаём нового пользователя
-            user = User(
-                telegram_user_id=telegram_user_id,
-                username=username,
-                first_name=first_name,
-                last_name=last_name,
-            )
-            db_session.add(user)
-            logger.info("Registered new user telegram_user_id=%s", telegram_user_id)
-
-        await db_session.commit()
+    logger.info("User %s for telegram_user_id=%s", outcome, telegram_user_id)
 
 
 async def cmd_start(message: types.Message) -> None:
@@ -0,0 +1,140 @@
+"""Cache of ``users`` rows behind access-token authentication.
+
+``get_current_user`` and ``get_user_from_token`` used to ``SELECT`` the user on
+every REST call and WebSocket token check, although the JWT already proves the
+user id. ``UserCache`` keeps column snapshots of recently seen users (LRU,
+bounded by ``USER_CACHE_MAX_SIZE``, entries expire after
+``USER_CACHE_TTL_SECONDS``); a hit is attached to the request session with
+``merge(load=False)``, so the endpoint gets a regular persistent ``User``
+without a query.
+
+Writers (``get_or_create_user``, ``bot_handlers.register_or_update_user``) call
+``invalidate``. Once ``attach`` has connected the cache to the signaling
+backplane, invalidations are also published there, so with a shared backplane
+(``SIGNALING_BACKPLANE=redis``) every worker drops its copy; the TTL bounds
+staleness otherwise.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config.settings import get_settings
+from app.models import User
+from app.services.backplane import Backplane
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "identity:invalidate"
+
+_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+class UserCache:
+    """TTL + LRU cache of user column values keyed by ``users.id``."""
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # users.id -> (момент истечения, значения колонок)
+        self._entries: OrderedDict[int, tuple[float, dict[str, Any]]] = OrderedDict()
+        # Растёт при каждой инвалидации: промах, начатый до неё, не кладёт в кэш устаревшую строку
+        self._epoch = 0
+        self._backplane: Backplane | None = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get(self, user_id: int) -> dict[str, Any] | None:
+        """Return cached column values of the user, or None on a miss."""
+
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user: User, *, epoch: int | None = None) -> None:
+        """Store the user's column values.
+
+        ``epoch`` is the value of ``self.epoch`` read before the user was loaded;
+        the store is skipped when an invalidation happened since.
+        """
+
+        if not self.enabled or (epoch is not None and epoch != self._epoch):
+            return
+        values = {key: getattr(user, key) for key in _COLUMNS}
+        self._entries[user.id] = (time.monotonic() + self.ttl_seconds, values)
+        self._entries.move_to_end(user.id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        """Drop the user from this worker's cache only."""
+
+        self._epoch += 1
+        self.invalidations += 1
+        self._entries.pop(user_id, None)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop the user from the cache of this worker and, through the backplane, of the others."""
+
+        self.discard(user_id)
+        if self._backplane is not None:
+            try:
+                await self._backplane.publish(INVALIDATION_CHANNEL, {"user_id": user_id})
+            except Exception:
+                logger.exception("Failed to publish user cache invalidation for user_id=%s", user_id)
+
+    async def attach(self, backplane: Backplane) -> None:
+        """Receive invalidations published by other workers."""
+
+        self._backplane = backplane
+        await backplane.subscribe(INVALIDATION_CHANNEL, self._on_invalidation)
+
+    async def _on_invalidation(self, message: dict[str, Any]) -> None:
+        user_id = message.get("user_id")
+        if isinstance(user_id, int):
+            self.discard(user_id)
+
+    def clear(self) -> None:
+        self._epoch += 1
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+async def attach_cached_user(session: AsyncSession, values: dict[str, Any]) -> User:
+    """Turn cached column values into a ``User`` bound to ``session`` without a query."""
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await session.merge(user, load=False)
+
+
+user_cache = UserCache(get_settings().user_cache_max_size, get_settings().user_cache_ttl_seconds)
@@ -0,0 +1,172 @@
+"""Verification of Telegram Mini App initData.
+
+The secret key ``HMAC_SHA256("WebAppData", bot_token)`` depends only on the
+bot token, so it is derived once per token. Clients often submit the same
+initData again, after a reload or a retry or when several tabs log in at once.
+``InitDataVerifier`` remembers successfully verified payloads by
+``build_init_data_fingerprint`` for ``INIT_DATA_CACHE_SECONDS``, at most
+``INIT_DATA_CACHE_MAX_SIZE`` of them. A repeat submission is answered without
+parsing the query string or the user JSON again. The age of ``auth_date`` is
+checked against the caller's ``max_age_seconds`` on every hit, so a cached
+payload goes stale exactly when a re-verified one would.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException, status
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class VerifiedInitData:
+    """initData whose signature and age were checked.
+
+    ``user`` is shared between repeat submissions served from the cache and must
+    not be modified.
+    """
+
+    user: dict[str, Any]
+    auth_date: datetime | None
+    fingerprint: str
+
+
+# Бот обычно один; запас на смену токена без перезапуска
+@lru_cache(maxsize=4)
+def webapp_secret_key(bot_token: str) -> bytes:
+    """Return ``HMAC_SHA256("WebAppData", bot_token)``, the key initData is signed with."""
+
+    # https://core.telegram.org/bots/webapps#validating-data-received-via-the-mini-app
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def _digest(init_data: str) -> str:
+    return hashlib.sha256(init_data.encode()).hexdigest()
+
+
+def build_init_data_fingerprint(init_data: str) -> str:
+    """Return a short fingerprint of the validated initData payload."""
+
+    return _digest(init_data)[:16]
+
+
+def _build_data_check_string(payload: dict[str, str]) -> str:
+    pairs = [f"{key}={value}" for key, value in sorted(payload.items()) if key != "hash"]
+    return "\n".join(pairs)
+
+
+def _validate_signature(init_data: str, bot_token: str) -> dict[str, str]:
+    data = dict(parse_qsl(init_data, keep_blank_values=True))
+    hash_from_client = data.get("hash")
+    if not hash_from_client:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing hash in initData")
+
+    data_check_string = _build_data_check_string(data)
+    calculated_hash = hmac.new(webapp_secret_key(bot_token), data_check_string.encode(), hashlib.sha256).hexdigest()
+
+    if not hmac.compare_digest(calculated_hash, hash_from_client):
+        logger.warning("Telegram initData signature validation failed")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid initData hash")
+
+    return data
+
+
+def _check_age(auth_date: datetime | None, max_age_seconds: int, now: float) -> None:
+    if auth_date is not None and now - auth_date.timestamp() > max_age_seconds:
+        logger.warning("Received expired initData payload: auth_date=%s", int(auth_date.timestamp()))
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="initData is too old")
+
+
+def _verify(init_data: str, bot_token: str, max_age_seconds: int, digest: str, now: float) -> VerifiedInitData:
+    data = _validate_signature(init_data, bot_token)
+
+    auth_date = None
+    if data.get("auth_date"):
+        auth_date = datetime.fromtimestamp(int(data["auth_date"]), tz=timezone.utc)
+        _check_age(auth_date, max_age_seconds, now)
+
+    user_payload = data.get("user")
+    if not user_payload:
+        logger.warning("Received initData payload without user info")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing user payload in initData")
+
+    try:
+        user_data: dict[str, Any] = json.loads(user_payload)
+    except json.JSONDecodeError as exc:  # pragma: no cover - defensive
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user payload") from exc
+
+    return VerifiedInitData(user_data, auth_date, digest[:16])
+
+
+class InitDataVerifier:
+    """Verify initData, answering repeat submissions of a verified payload from a bounded cache."""
+
+    def __init__(self, max_size: int, window_seconds: float, clock: Callable[[], float] = time.time) -> None:
+        self.max_size = max_size
+        self.window_seconds = window_seconds
+        self._clock = clock
+        # отпечаток -> (момент истечения по time.time(), полный sha256, ключ бота, результат)
+        self._entries: OrderedDict[str, tuple[float, str, bytes, VerifiedInitData]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.window_seconds > 0
+
+    def verify(self, init_data: str, *, bot_token: str, max_age_seconds: int = 86400) -> VerifiedInitData:
+        """Check the signature and ``auth_date`` of initData and return its user.
+
+        Raises:
+            HTTPException: 400 if the hash or the user payload is missing, 401 if the
+                signature does not match or the payload is older than ``max_age_seconds``.
+        """
+
+        digest = _digest(init_data)
+        now = self._clock()
+        if not self.enabled:
+            return _verify(init_data, bot_token, max_age_seconds, digest, now)
+
+        fingerprint = digest[:16]
+        entry = self._entries.get(fingerprint)
+        if entry is not None:
+            expires_at, cached_digest, secret_key, result = entry
+            # Полный хэш и ключ сверяются: совпадение 16-символьного отпечатка ещё не та же строка
+            if expires_at > now and cached_digest == digest and secret_key == webapp_secret_key(bot_token):
+                # Допустимый возраст у вызывающих может быть разным: проверяем его при каждом попадании
+                _check_age(result.auth_date, max_age_seconds, now)
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return result
+            del self._entries[fingerprint]
+
+        self.misses += 1
+        result = _verify(init_data, bot_token, max_age_seconds, digest, now)
+        self._entries[fingerprint] = (now + self.window_seconds, digest, webapp_secret_key(bot_token), result)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+init_data_verifier = InitDataVerifier(get_settings().init_data_cache_max_size, get_settings().init_data_cache_seconds)
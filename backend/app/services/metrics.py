@@ -0,0 +1,220 @@
+"""Prometheus metrics of the HTTP API, the signaling relay, the database and background work.
+
+Metrics are collected and served by ``GET /metrics`` when ``METRICS_ENABLED``
+is on. Otherwise every metric here is a no-op, so the instrumented code paths
+do not need to check.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import prometheus_client
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.settings import get_settings
+
+ENABLED = get_settings().metrics_enabled
+
+CONTENT_TYPE = prometheus_client.CONTENT_TYPE_LATEST
+
+# Шкалы гистограмм: HTTP и Telegram — миллисекунды..секунды, relay и БД — мельче, fan-out — микросекунды
+_REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_RELAY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+_FANOUT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+RELAYED_MESSAGE_TYPES = ("offer", "answer", "ice_candidate", "ice_candidates")
+_SQL_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+
+
+class _NoopMetric:
+    """Stand-in for a metric when Prometheus export is off."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> _NoopMetric:
+        return self
+
+    def observe(self, amount: float) -> None:
+        return None
+
+    def inc(self, amount: float = 1) -> None:
+        return None
+
+
+_NOOP = _NoopMetric()
+
+
+def _histogram(name: str, documentation: str, labelnames: tuple[str, ...] = (), *, buckets: tuple[float, ...]) -> Any:
+    if not ENABLED:
+        return _NOOP
+    return prometheus_client.Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+HTTP_REQUEST_DURATION = _histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status code",
+    ("method", "route", "status"),
+    buckets=_REQUEST_BUCKETS,
+)
+SIGNALING_RELAY_LATENCY = _histogram(
+    "signaling_relay_latency_seconds",
+    "Time from receiving an offer/answer/ICE frame to writing it to the target socket",
+    ("type",),
+    buckets=_RELAY_BUCKETS,
+)
+SIGNALING_BROADCAST_FANOUT = _histogram(
+    "signaling_broadcast_fanout_seconds",
+    "Time to queue a room-wide broadcast for every local recipient",
+    buckets=_FANOUT_BUCKETS,
+)
+DB_QUERY_DURATION = _histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time by SQL operation",
+    ("operation",),
+    buckets=_QUERY_BUCKETS,
+)
+DB_SESSION_DURATION = _histogram(
+    "db_session_duration_seconds",
+    "Lifetime of request-scoped database sessions",
+    buckets=_REQUEST_BUCKETS,
+)
+TELEGRAM_API_DURATION = _histogram(
+    "telegram_api_request_duration_seconds",
+    "Telegram Bot API call latency by method and outcome (ok or the exception class)",
+    ("method", "outcome"),
+    buckets=_REQUEST_BUCKETS,
+)
+BACKGROUND_TASK_DURATION = _histogram(
+    "background_task_duration_seconds",
+    "Duration of one iteration of a background loop (deadline callbacks, write-behind flushes)",
+    ("task",),
+    buckets=_REQUEST_BUCKETS,
+)
+
+# Дочерние серии по типу заранее: labels() на горячем пути стоит заметно дороже observe()
+RELAY_LATENCY_BY_TYPE = {message_type: SIGNALING_RELAY_LATENCY.labels(message_type) for message_type in RELAYED_MESSAGE_TYPES}
+
+
+@contextmanager
+def track(histogram: Any, *labels: str) -> Iterator[None]:
+    """Observe the duration of the block in ``histogram`` with the given label values."""
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        (histogram.labels(*labels) if labels else histogram).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def track_telegram_call(method: str) -> Iterator[None]:
+    """Observe a Telegram Bot API call; the outcome is ``ok`` or the exception class name."""
+
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as exc:
+        outcome = type(exc).__name__
+        raise
+    finally:
+        TELEGRAM_API_DURATION.labels(method, outcome).observe(time.perf_counter() - started)
+
+
+class TelegramRequestMetrics:
+    """aiogram request middleware recording Bot API calls made through ``Bot``."""
+
+    async def __call__(self, make_request: Callable[..., Any], bot: Any, method: Any) -> Any:
+        with track_telegram_call(getattr(method, "__api_method__", type(method).__name__)):
+            return await make_request(bot, method)
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording HTTP request latency per route template.
+
+    Requests that match no route are labelled ``unmatched`` so scanners cannot
+    blow up the number of series. WebSocket traffic is not timed here.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Роутер дописывает найденный маршрут в тот же scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Time every statement executed through ``engine``."""
+
+    if not ENABLED:
+        return
+
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info["query_started_at"].pop()
+        DB_QUERY_DURATION.labels(_sql_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context) -> None:
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started_at"):
+            connection.info["query_started_at"].pop()
+
+
+def _sql_operation(statement: str) -> str:
+    operation = statement.lstrip()[:6].upper()
+    return operation if operation in _SQL_OPERATIONS else "OTHER"
+
+
+class _StatsCollector:
+    def __init__(self, prefix: str, stats: Callable[[], dict[str, Any]]) -> None:
+        self._prefix = prefix
+        self._stats = stats
+
+    def collect(self) -> Iterator[Any]:
+        for name, value in self._stats().items():
+            if isinstance(value, (int, float)):
+                yield GaugeMetricFamily(f"{self._prefix}_{name}", f"{name} reported by {self._prefix} stats", value=value)
+
+
+def register_gauges(prefix: str, stats: Callable[[], dict[str, Any]]) -> None:
+    """Export every numeric value of ``stats()`` as a ``<prefix>_<key>`` gauge, read at scrape time."""
+
+    if ENABLED:
+        prometheus_client.REGISTRY.register(_StatsCollector(prefix, stats))
+
+
+def render() -> bytes:
+    """Serialize all metrics in the Prometheus text exposition format."""
+
+    return prometheus_client.generate_latest(prometheus_client.REGISTRY)
@@ -0,0 +1,181 @@
+"""Room-level coordination of WebRTC offer/answer exchanges.
+
+In a full mesh a late joiner starts an exchange with every participant at once.
+``NegotiationCoordinator`` caps the number of exchanges each participant takes
+part in (``SIGNALING_MAX_CONCURRENT_NEGOTIATIONS``) and holds further offers,
+together with the ICE candidates that follow them, until a slot frees up: when
+the answer is relayed, a participant leaves or the exchange times out.
+
+Roles follow the rule the web client uses to pick the offerer: in every pair
+the participant with the lower user id is impolite (it offers and wins offer
+collisions), the other one is polite. When both peers offer at once the polite
+peer's offer is dropped and, if the owner passed ``rejection``, the polite peer
+is told so, so it can roll back its local offer and answer the impolite one.
+
+The coordinator does no I/O: it returns the frames to relay and leaves delivery
+and timers to the room.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Callable
+
+Pair = tuple[int, int]  # (меньший user_id, больший user_id)
+Relay = tuple[Any, int, int]  # (кадр, sender_id, target_id)
+
+NEGOTIATION_MESSAGE_TYPES = frozenset({"offer", "answer", "ice_candidate"})
+
+
+def pair_of(user_id: int, peer_id: int) -> Pair:
+    return (user_id, peer_id) if user_id < peer_id else (peer_id, user_id)
+
+
+def is_polite(user_id: int, peer_id: int) -> bool:
+    """Return True when ``user_id`` is the polite side of its pair with ``peer_id``."""
+
+    return user_id > peer_id
+
+
+class NegotiationCoordinator:
+    """Cap concurrent offer/answer exchanges per participant and queue the rest.
+
+    ``on_start`` and ``on_finish`` are called with the pair when an exchange
+    takes a slot and when it releases it, so the owner can run a timeout.
+    ``rejection(sender_id, peer_id)`` builds the frame relayed back to the polite
+    ``sender_id`` when its offer to ``peer_id`` loses a collision.
+    A ``max_concurrent`` of 0 disables coordination: every frame is relayed as is.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        *,
+        on_start: Callable[[Pair], None] | None = None,
+        on_finish: Callable[[Pair], None] | None = None,
+        rejection: Callable[[int, int], Any] | None = None,
+    ) -> None:
+        self._max = max_concurrent
+        self._on_start = on_start
+        self._on_finish = on_finish
+        self._rejection = rejection
+        # Идущие обмены: пара -> кто отправил offer
+        self._active: dict[Pair, int] = {}
+        # Отложенные обмены в порядке поступления: offer и следующие за ним ICE-кандидаты
+        self._queued: dict[Pair, list[Relay]] = {}
+        self._load: Counter[int] = Counter()
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queued)
+
+    def submit(self, message_type: str, frame: Any, sender_id: int, target_id: int) -> list[Relay]:
+        """Accept a frame from ``sender_id`` to ``target_id``; return the frames to relay now."""
+
+        relay: Relay = (frame, sender_id, target_id)
+        if self._max <= 0 or message_type not in NEGOTIATION_MESSAGE_TYPES:
+            return [relay]
+
+        pair = pair_of(sender_id, target_id)
+        if message_type == "offer":
+            return self._offer(pair, relay)
+
+        if message_type == "ice_candidate":
+            held = self._queued.get(pair)
+            if held is not None:
+                held.append(relay)
+                return []
+            return [relay]
+
+        # answer
+        if self._active.get(pair) == target_id:
+            self._release(pair)
+            return [relay, *self._drain()]
+        return [relay]
+
+    def _offer(self, pair: Pair, relay: Relay) -> list[Relay]:
+        _, sender_id, target_id = relay
+
+        held = self._queued.get(pair)
+        if held is not None:
+            queued_offerer = held[0][1]
+            # Новый offer заменяет отложенный; при встречных offer остаётся offer невежливой стороны
+            if queued_offerer == sender_id:
+                self._queued[pair] = [relay]
+                return []
+            if is_polite(sender_id, target_id):
+                return self._reject(sender_id, target_id)
+            self._queued[pair] = [relay]
+            return self._reject(queued_offerer, sender_id)
+
+        offerer = self._active.get(pair)
+        if offerer is not None:
+            if offerer != sender_id:
+                if is_polite(sender_id, target_id):
+                    return self._reject(sender_id, target_id)
+                self._active[pair] = sender_id
+            # Повторное согласование уже идущей пары слот не занимает, но продлевает таймаут
+            if self._on_start is not None:
+                self._on_start(pair)
+            return [relay]
+
+        if self._load[sender_id] < self._max and self._load[target_id] < self._max:
+            self._start(pair, sender_id)
+            return [relay]
+
+        self._queued[pair] = [relay]
+        return []
+
+    def _reject(self, sender_id: int, peer_id: int) -> list[Relay]:
+        if self._rejection is None:
+            return []
+        # Отказ идёт вежливой стороне от имени собеседника
+        return [(self._rejection(sender_id, peer_id), peer_id, sender_id)]
+
+    def _start(self, pair: Pair, offerer: int) -> None:
+        self._active[pair] = offerer
+        for user_id in pair:
+            self._load[user_id] += 1
+        if self._on_start is not None:
+            self._on_start(pair)
+
+    def _release(self, pair: Pair) -> None:
+        if self._active.pop(pair, None) is None:
+            return
+        for user_id in pair:
+            self._load[user_id] -= 1
+            if self._load[user_id] <= 0:
+                del self._load[user_id]
+        if self._on_finish is not None:
+            self._on_finish(pair)
+
+    def _drain(self) -> list[Relay]:
+        released: list[Relay] = []
+        for pair, held in list(self._queued.items()):
+            offerer, answerer = held[0][1], held[0][2]
+            if self._load[offerer] < self._max and self._load[answerer] < self._max:
+                del self._queued[pair]
+                self._start(pair, offerer)
+                released.extend(held)
+        return released
+
+    def expire(self, pair: Pair) -> list[Relay]:
+        """Free the slot of an exchange that got no answer in time."""
+
+        if pair not in self._active:
+            return []
+        self._release(pair)
+        return self._drain()
+
+    def remove_participant(self, user_id: int) -> list[Relay]:
+        """Forget every exchange involving ``user_id``; return frames released by the freed slots."""
+
+        for pair in [pair for pair in self._queued if user_id in pair]:
+            del self._queued[pair]
+        for pair in [pair for pair in self._active if user_id in pair]:
+            self._release(pair)
+        return self._drain()
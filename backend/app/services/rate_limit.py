@@ -0,0 +1,80 @@
+"""Token-bucket limits for messages clients send over signaling WebSockets.
+
+slowapi only covers REST routes. Inside ``call_signaling`` every connection and
+every room has a ``MessageRateLimiter``: one token bucket per message type that
+has its own limit, plus a shared ``*`` bucket for all other types (so arbitrary
+type strings from a client cannot create buckets). Limits are configured as
+``type=rate/burst`` lists in ``SIGNALING_RATE_LIMITS`` (per connection) and
+``SIGNALING_ROOM_RATE_LIMITS`` (per room); ``rate`` is tokens per second and
+``burst`` the bucket size; the lists are parsed by
+``app.utils.rate_limits.parse_rate_limits``.
+"""
+
+from __future__ import annotations
+
+import time
+
+from app.utils.rate_limits import RateLimits
+
+DEFAULT_LIMIT_KEY = "*"
+
+
+class TokenBucket:
+    """Classic token bucket refilled lazily on each ``consume``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def consume(self, now: float) -> bool:
+        tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if tokens < 1:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1
+        return True
+
+
+class MessageRateLimiter:
+    """Per-message-type token buckets, with a count of recent violations.
+
+    ``record_violation`` counts rejected messages in fixed windows of
+    ``violation_window`` seconds; ``exhausted`` turns true once a window holds
+    ``max_violations`` of them, so the caller can disconnect a client that keeps
+    sending after being told to slow down. A ``max_violations`` of 0 never does.
+    """
+
+    def __init__(self, limits: RateLimits, *, max_violations: int = 0, violation_window: float = 10.0) -> None:
+        now = time.monotonic()
+        self._buckets = {message_type: TokenBucket(rate, burst, now) for message_type, (rate, burst) in limits.items()}
+        self._default = self._buckets.get(DEFAULT_LIMIT_KEY)
+        self._max_violations = max_violations
+        self._violation_window = violation_window
+        self._window_started = now
+        self.violations = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return 0 < self._max_violations <= self.violations
+
+    def allow(self, message_type: str | None) -> bool:
+        """Take a token for ``message_type``; False when its bucket is empty."""
+
+        bucket = self._buckets.get(message_type, self._default) if isinstance(message_type, str) else self._default
+        if bucket is None:
+            return True
+        return bucket.consume(time.monotonic())
+
+    def record_violation(self) -> None:
+        """Count a message rejected by this limiter."""
+
+        now = time.monotonic()
+        if now - self._window_started >= self._violation_window:
+            self._window_started = now
+            self.violations = 0
+        self.violations += 1
@@ -0,0 +1,177 @@
+"""Rotating refresh tokens for renewing access tokens without Telegram initData.
+
+``/auth/telegram`` starts a token family (one ``refresh_token_families`` row)
+and hands out its generation-0 token; ``/auth/refresh`` exchanges the current
+token of a family for a new access token and the next generation. A token is
+``<family>.<generation>.<signature>`` with an HMAC of the first two parts under
+``SECRET_KEY``, so nothing but the family row is stored and a rotation is one
+conditional ``UPDATE``.
+
+Reuse detection: presenting an older generation means the token was copied, so
+the whole family is revoked and its holder has to authorize with initData
+again. The one exception is the generation right before the current one within
+``REFRESH_TOKEN_REUSE_GRACE_SECONDS`` of the rotation: two tabs refreshing at
+the same moment get the same current token instead of logging each other out.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import get_settings
+from app.models import RefreshTokenFamily
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class RefreshGrant:
+    """A refresh token together with the user it belongs to."""
+
+    user_id: int
+    token: str
+    expires_at: datetime
+
+
+def _utc(dt: datetime) -> datetime:
+    # SQLite возвращает наивные datetime
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _secret_key() -> bytes:
+    settings = get_settings()
+    if not settings.secret_key:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="SECRET_KEY is not configured")
+    return settings.secret_key.encode()
+
+
+def _sign(family_id: str, generation: int) -> str:
+    digest = hmac.new(_secret_key(), f"refresh:{family_id}.{generation}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _encode(family_id: str, generation: int) -> str:
+    return f"{family_id}.{generation}.{_sign(family_id, generation)}"
+
+
+def _decode(token: str) -> tuple[str, int]:
+    try:
+        family_id, generation, signature = token.split(".")
+        number = int(generation)
+    except ValueError as exc:
+        raise _invalid() from exc
+    if number < 0 or not hmac.compare_digest(signature, _sign(family_id, number)):
+        raise _invalid()
+    return family_id, number
+
+
+def _invalid() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+
+async def issue_refresh_token(session: AsyncSession, user_id: int) -> RefreshGrant:
+    """Start a new token family for the user and return its first token."""
+
+    now = datetime.now(tz=timezone.utc)
+    family = RefreshTokenFamily(
+        id=secrets.token_urlsafe(16),
+        user_id=user_id,
+        generation=0,
+        created_at=now,
+        rotated_at=now,
+        expires_at=now + timedelta(days=get_settings().refresh_token_expire_days),
+    )
+    session.add(family)
+    await session.commit()
+    return RefreshGrant(user_id, _encode(family.id, 0), family.expires_at)
+
+
+async def rotate_refresh_token(session: AsyncSession, token: str) -> RefreshGrant:
+    """Exchange the current token of a family for the next one.
+
+    Raises:
+        HTTPException: 401 if the token is malformed, expired, revoked or reused;
+            reuse also revokes the family.
+    """
+
+    family_id, generation = _decode(token)
+    now = datetime.now(tz=timezone.utc)
+    family_table = RefreshTokenFamily.__table__
+    result = await session.execute(
+        update(family_table)
+        .where(
+            family_table.c.id == family_id,
+            family_table.c.generation == generation,
+            family_table.c.revoked_at.is_(None),
+            family_table.c.expires_at > now,
+        )
+        .values(generation=generation + 1, rotated_at=now)
+        .returning(family_table.c.user_id, family_table.c.expires_at)
+    )
+    rotated = result.first()
+    if rotated is not None:
+        await session.commit()
+        return RefreshGrant(rotated.user_id, _encode(family_id, generation + 1), _utc(rotated.expires_at))
+
+    # Не текущее поколение: разбираемся, почему, отдельным запросом (редкий путь)
+    result = await session.execute(
+        select(
+            family_table.c.user_id,
+            family_table.c.generation,
+            family_table.c.rotated_at,
+            family_table.c.expires_at,
+            family_table.c.revoked_at,
+        ).where(family_table.c.id == family_id)
+    )
+    family = result.first()
+    await session.rollback()
+    if family is None or family.revoked_at is not None or _utc(family.expires_at) <= now:
+        raise _invalid()
+
+    grace = timedelta(seconds=get_settings().refresh_token_reuse_grace_seconds)
+    if generation == family.generation - 1 and now - _utc(family.rotated_at) <= grace:
+        # Параллельное обновление из второй вкладки: отдаём тот же текущий токен
+        return RefreshGrant(family.user_id, _encode(family_id, family.generation), _utc(family.expires_at))
+
+    await revoke_refresh_family(session, family_id)
+    logger.warning(
+        "Refresh token reuse detected for user_id=%s (generation %s, current %s); session revoked",
+        family.user_id,
+        generation,
+        family.generation,
+    )
+    raise _invalid()
+
+
+async def revoke_refresh_family(session: AsyncSession, family_id: str) -> None:
+    """Invalidate every token of the family."""
+
+    family_table = RefreshTokenFamily.__table__
+    await session.execute(
+        update(family_table)
+        .where(family_table.c.id == family_id, family_table.c.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(tz=timezone.utc))
+    )
+    await session.commit()
+
+
+async def revoke_refresh_token(session: AsyncSession, token: str) -> None:
+    """Invalidate the family of a token presented at logout; invalid tokens are ignored."""
+
+    try:
+        family_id, _ = _decode(token)
+    except HTTPException:
+        return
+    await revoke_refresh_family(session, family_id)
@@ -1,34 +1,543 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import heapq
+import itertools
 import logging
+import secrets
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable
 
 from fastapi import HTTPException, WebSocket, status
 
 from app.config.settings import get_settings
+from app.services import metrics, signaling_protocol
+from app.services.backplane import Backplane, create_backplane, room_channel
+from app.services.negotiation import NEGOTIATION_MESSAGE_TYPES, NegotiationCoordinator, Pair, Relay
+from app.services.rate_limit import MessageRateLimiter
+from app.utils import json_codec
+from app.utils.rate_limits import parse_rate_limits
 
 logger = logging.getLogger("app.webrtc")
 
+# Код закрытия для клиентов, которые не успевают вычитывать исходящие сообщения
+SLOW_CONSUMER_CLOSE_CODE = 4008
+# Код закрытия при штатном завершении звонка сервером
+CALL_ENDED_CLOSE_CODE = 1000
+# Код закрытия для клиентов, переставших отвечать на ping
+HEARTBEAT_TIMEOUT_CLOSE_CODE = 4009
+# Код закрытия для клиентов, продолжающих слать сообщения сверх лимита; 1008 клиент понимает
+# как «звонок не найден», а 4429 уже занят переполненным звонком
+RATE_LIMIT_CLOSE_CODE = 4010
 
-@dataclass
+DeadlineCallback = Callable[[], Awaitable[None]]
+# Число шардов реестра комнат: создание и удаление разных звонков не ждут друг друга
+ROOM_REGISTRY_SHARDS = 64
+
+
+class DeadlineScheduler:
+    """Single-task timer heap for room deadlines.
+
+    Each key owns at most one pending deadline: scheduling an existing key replaces
+    it, so memory stays proportional to the number of rooms. Replaced or cancelled
+    entries are skipped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._entries: dict[Hashable, tuple[float, int, DeadlineCallback]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, delay_seconds: float, callback: DeadlineCallback) -> None:
+        """Run ``callback`` after ``delay_seconds``, replacing any deadline for ``key``."""
+
+        when = time.monotonic() + max(delay_seconds, 0.0)
+        seq = next(self._counter)
+        self._entries[key] = (when, seq, callback)
+        heapq.heappush(self._heap, (when, seq, key))
+
+        # Сжимаем кучу, если в ней накопилось много отменённых записей
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(when, seq, key) for key, (when, seq, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+        if self._heap[0][1] == seq:
+            self._wakeup.set()
+        self.start()
+
+    def cancel(self, key: Hashable) -> None:
+        """Drop the pending deadline for ``key`` if there is one."""
+
+        self._entries.pop(key, None)
+
+    def start(self) -> None:
+        """Start the scheduler task if it is not running."""
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler task; pending deadlines are kept."""
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _pop_due(self, now: float) -> list[tuple[Hashable, DeadlineCallback]]:
+        due: list[tuple[Hashable, DeadlineCallback]] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != seq:
+                continue
+            del self._entries[key]
+            due.append((key, entry[2]))
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            for key, callback in self._pop_due(time.monotonic()):
+                try:
+                    with metrics.track(metrics.BACKGROUND_TASK_DURATION, _deadline_kind(key)):
+                        await callback()
+                except Exception:
+                    logger.exception("Deadline callback failed")
+
+            if self._heap:
+                delay = self._heap[0][0] - time.monotonic()
+                if delay <= 0:
+                    continue
+            else:
+                delay = None
+
+            try:
+                async with asyncio.timeout(delay):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+
+
+def _deadline_kind(key: Hashable) -> str:
+    # Ключи вида (call_id, "heartbeat" | "resume" | ..., ...): в метрику идёт только вид дедлайна
+    if isinstance(key, tuple) and len(key) > 1 and isinstance(key[1], str):
+        return f"deadline_{key[1]}"
+    return "deadline"
+
+
+class SignalingFrame:
+    """A signaling message serialized once and shared by every recipient.
+
+    The JSON text and the ``msgpack.v1`` binary form are each built lazily, at most
+    once, the first time a recipient speaking that format needs them. Relayed
+    frames remember when they were received (``received_at``) for the relay
+    latency metric.
+    """
+
+    __slots__ = ("type", "received_at", "_message", "_text", "_relay_parts", "_compact", "_binary")
+
+    def __init__(
+        self,
+        message: dict[str, Any] | None = None,
+        *,
+        text: str | None = None,
+        message_type: str | None = None,
+    ) -> None:
+        self._message = message
+        self._text = text
+        self._relay_parts: tuple[str, str] | None = None
+        self._compact: dict[str, Any] | None = None
+        self._binary: bytes | None = None
+        self.type = message_type if message_type is not None else (message or {}).get("type")
+        self.received_at: float | None = None
+
+    @classmethod
+    def relay(
+        cls,
+        message_type: str,
+        payload: Any,
+        from_user_json: str,
+        *,
+        sender_id: int | None = None,
+    ) -> SignalingFrame:
+        """Build an offer/answer/ICE frame around a pre-encoded ``from_user`` object."""
+
+        payload_json = json_codec.dumps(payload)
+        text = f'{{"type":{json_codec.dumps(message_type)},"payload":{payload_json},"from_user":{from_user_json}}}'
+        frame = cls(text=text, message_type=message_type)
+        frame.received_at = time.perf_counter()
+        frame._relay_parts = (payload_json, from_user_json)
+        if sender_id is not None:
+            frame._compact = {
+                "t": signaling_protocol.MESSAGE_TYPE_CODES[message_type],
+                "p": payload,
+                "f": sender_id,
+            }
+        return frame
+
+    @classmethod
+    def ice_batch(cls, frames: list[SignalingFrame]) -> SignalingFrame:
+        """Merge relayed ``ice_candidate`` frames from one sender into an ``ice_candidates`` frame."""
+
+        parts = [frame.relay_parts for frame in frames]
+        payloads = ",".join(payload_json for payload_json, _ in parts)
+        text = f'{{"type":"ice_candidates","payload":[{payloads}],"from_user":{parts[0][1]}}}'
+        batch = cls(text=text, message_type="ice_candidates")
+        batch.received_at = frames[0].received_at
+        if all(frame._compact is not None for frame in frames):
+            batch._compact = {
+                "t": signaling_protocol.MESSAGE_TYPE_CODES["ice_candidates"],
+                "p": [frame._compact["p"] for frame in frames],
+                "f": frames[0]._compact["f"],
+            }
+        return batch
+
+    @property
+    def relay_parts(self) -> tuple[str, str]:
+        """Encoded ``payload`` and ``from_user`` of a relayed frame."""
+
+        if self._relay_parts is None:
+            message = self.message
+            self._relay_parts = (json_codec.dumps(message.get("payload")), json_codec.dumps(message.get("from_user")))
+        return self._relay_parts
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json_codec.dumps(self._message)
+        return self._text
+
+    @property
+    def message(self) -> dict[str, Any]:
+        if self._message is None:
+            self._message = json_codec.loads(self.text)
+        return self._message
+
+    @property
+    def binary(self) -> bytes:
+        """The frame in ``msgpack.v1`` form."""
+
+        if self._binary is None:
+            if self._compact is None:
+                self._compact = signaling_protocol.to_compact(self.message)
+            self._binary = signaling_protocol.encode(self._compact)
+        return self._binary
+
+
+@dataclass(eq=False)
 class ParticipantConnection:
-    """Represents a participant connection and metadata."""
+    """Represents a participant connection and metadata.
+
+    Outbound frames go through a bounded queue drained by a dedicated writer task,
+    so a slow recipient never blocks whoever is sending to it. With ``coalesce_ice``
+    ICE candidates from one sender are held for a short window and queued as a
+    single ``ice_candidates`` frame; with ``binary`` frames are written in the
+    ``msgpack.v1`` form.
+
+    ``last_seen`` and ``rtt_ms`` feed the room heartbeat: any inbound frame counts
+    as a sign of life, and answered pings give a smoothed round-trip time.
+
+    A connection holding a ``resume_token`` can be suspended when its socket drops:
+    it stays in the room, keeps queueing frames and is reattached to a new socket
+    by ``CallRoom.reattach``.
 
+    ``rate_limiter`` holds the ``SIGNALING_RATE_LIMITS`` buckets for frames the
+    client sends; it survives a resume.
+    """
+
+    user_id: int
     websocket: WebSocket
     user: dict[str, Any]
+    coalesce_ice: bool = False
+    binary: bool = False
+    outbox: deque[SignalingFrame] = field(default_factory=deque, init=False, repr=False)
+    peak_queue_depth: int = field(default=0, init=False)
+    dropped_frames: int = field(default=0, init=False)
+    closed: bool = field(default=False, init=False)
+    # user_left уже разослан (например, при выселении по heartbeat)
+    left_announced: bool = field(default=False, init=False)
+    last_seen: float = field(default_factory=time.monotonic, init=False)
+    rtt_ms: float | None = field(default=None, init=False)
+    # Клиент хотя бы раз ответил на ping: только таких можно выселять по тишине
+    answers_pings: bool = field(default=False, init=False)
+    resume_token: str | None = field(default=None, init=False, repr=False)
+    suspended: bool = field(default=False, init=False)
+    _in_flight: SignalingFrame | None = field(default=None, init=False, repr=False)
+    _ping_id: int | None = field(default=None, init=False, repr=False)
+    _ping_sent_at: float = field(default=0.0, init=False, repr=False)
+    _close_code: int | None = field(default=None, init=False, repr=False)
+    _ready: asyncio.Event = field(default_factory=asyncio.Event, init=False, repr=False)
+    _writer_task: asyncio.Task | None = field(default=None, init=False, repr=False)
+    _pending_ice: dict[int, list[SignalingFrame]] = field(default_factory=dict, init=False, repr=False)
+    _ice_timers: dict[int, asyncio.TimerHandle] = field(default_factory=dict, init=False, repr=False)
+    rate_limiter: MessageRateLimiter = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        settings = get_settings()
+        self.rate_limiter = MessageRateLimiter(
+            parse_rate_limits(settings.signaling_rate_limits),
+            max_violations=settings.signaling_rate_limit_max_violations,
+            violation_window=settings.signaling_rate_limit_violation_window_seconds,
+        )
+        self._high_water = settings.signaling_outbound_queue_high_water
+        self._limit = settings.signaling_outbound_queue_limit
+        self._send_timeout = settings.signaling_send_timeout_seconds
+        self._ice_window = settings.signaling_ice_coalesce_window_ms / 1000
+        self._set_format(self.coalesce_ice, self.binary)
+
+    def _set_format(self, coalesce_ice: bool, binary: bool) -> None:
+        self.coalesce_ice = coalesce_ice and self._ice_window > 0
+        self.binary = binary
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.outbox)
+
+    def touch(self) -> None:
+        """Record that a frame was received from the client."""
+
+        self.last_seen = time.monotonic()
+
+    def send_ping(self, frame: SignalingFrame, ping_id: int) -> bool:
+        """Queue a heartbeat ping; return False when the queue overflowed."""
+
+        self._ping_id = ping_id
+        self._ping_sent_at = time.monotonic()
+        return self.enqueue(frame)
+
+    def record_pong(self, ping_id: Any) -> None:
+        """Update the round-trip time from a pong answering the latest ping."""
+
+        if self._ping_id is None or ping_id != self._ping_id:
+            return
+
+        sample = (time.monotonic() - self._ping_sent_at) * 1000
+        self._ping_id = None
+        self.answers_pings = True
+        # Сглаживание как у SRTT в TCP (RFC 6298): alpha = 1/8
+        self.rtt_ms = sample if self.rtt_ms is None else self.rtt_ms + (sample - self.rtt_ms) / 8
+
+    def enqueue(self, frame: SignalingFrame, *, sender_id: int | None = None) -> bool:
+        """Queue a frame for delivery; return False when the queue overflowed.
+
+        Above the high-water mark queued ICE candidates are dropped first (newer
+        candidates supersede them); if the queue is still at its limit the
+        connection must be disconnected.
+        """
+
+        if self.closed:
+            return False
+
+        if self.coalesce_ice and sender_id is not None and frame.type == "ice_candidate":
+            self._hold_ice_candidate(sender_id, frame)
+            return True
+
+        if len(self.outbox) >= self._high_water:
+            self._shed_ice_candidates()
+        if len(self.outbox) >= self._limit:
+            return False
+
+        self.outbox.append(frame)
+        if len(self.outbox) > self.peak_queue_depth:
+            self.peak_queue_depth = len(self.outbox)
+        self._ready.set()
+        return True
+
+    def _hold_ice_candidate(self, sender_id: int, frame: SignalingFrame) -> None:
+        pending = self._pending_ice.get(sender_id)
+        if pending is None:
+            self._pending_ice[sender_id] = [frame]
+            loop = asyncio.get_running_loop()
+            self._ice_timers[sender_id] = loop.call_later(self._ice_window, self._flush_ice_candidates, sender_id)
+            return
+
+        pending.append(frame)
+        # Пачка не должна расти бесконечно, если клиент шлёт кандидаты без пауз
+        if len(pending) >= self._high_water:
+            self._ice_timers.pop(sender_id).cancel()
+            self._flush_ice_candidates(sender_id)
+
+    def _flush_ice_candidates(self, sender_id: int) -> None:
+        self._ice_timers.pop(sender_id, None)
+        frames = self._pending_ice.pop(sender_id, None)
+        if not frames or self.closed:
+            return
+
+        # Перегруженной очереди ICE не нужен: правило то же, что и выше high-water
+        if len(self.outbox) >= self._high_water:
+            self.dropped_frames += len(frames)
+            return
+
+        self.outbox.append(frames[0] if len(frames) == 1 else SignalingFrame.ice_batch(frames))
+        if len(self.outbox) > self.peak_queue_depth:
+            self.peak_queue_depth = len(self.outbox)
+        self._ready.set()
+
+    def _cancel_pending_ice(self) -> None:
+        for timer in self._ice_timers.values():
+            timer.cancel()
+        self._ice_timers.clear()
+        self._pending_ice.clear()
+
+    def _shed_ice_candidates(self) -> None:
+        depth = len(self.outbox)
+        self.outbox = deque(frame for frame in self.outbox if frame.type != "ice_candidate")
+        dropped = depth - len(self.outbox)
+        if dropped:
+            self.dropped_frames += dropped
+            logger.warning(
+                "Outbound queue of user_id=%s above high-water mark (%s): dropped %s stale ICE candidate(s)",
+                self.user_id,
+                self._high_water,
+                dropped,
+            )
+
+    def start_writer(self, on_failure: Callable[[ParticipantConnection, int | None], Awaitable[None]]) -> None:
+        """Start the task that drains the outbound queue into the socket."""
+
+        self._writer_task = asyncio.create_task(self._write_loop(on_failure))
+
+    def suspend(self) -> None:
+        """Stop writing to the dropped socket but keep queueing frames for a resume.
+
+        A frame whose send was interrupted goes back to the head of the queue, so
+        it may be delivered twice.
+        """
+
+        self.suspended = True
+        task = self._writer_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        self._writer_task = None
+        if self._in_flight is not None:
+            self.outbox.appendleft(self._in_flight)
+            self._in_flight = None
+
+    def stop_writer(self) -> None:
+        """Stop accepting frames and cancel the writer task."""
+
+        self.closed = True
+        self._cancel_pending_ice()
+        task = self._writer_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+
+    def close_when_drained(self, close_code: int) -> None:
+        """Stop accepting frames and close the socket once queued frames are sent."""
+
+        self.closed = True
+        self._cancel_pending_ice()
+        self._close_code = close_code
+        self._ready.set()
+
+    async def _write_loop(self, on_failure: Callable[[ParticipantConnection, int | None], Awaitable[None]]) -> None:
+        while True:
+            if not self.outbox:
+                if self._close_code is not None:
+                    try:
+                        await self.websocket.close(code=self._close_code, reason="Call ended")
+                    except Exception:
+                        pass
+                    return
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            frame = self._in_flight = self.outbox.popleft()
+            try:
+                async with asyncio.timeout(self._send_timeout):
+                    if self.binary:
+                        await self.websocket.send_bytes(frame.binary)
+                    else:
+                        await self.websocket.send_text(frame.text)
+            except TimeoutError:
+                logger.warning(
+                    "Timed out after %ss delivering message type=%s to user_id=%s",
+                    self._send_timeout,
+                    frame.type,
+                    self.user_id,
+                )
+                self.closed = True
+                await on_failure(self, SLOW_CONSUMER_CLOSE_CODE)
+                return
+            except Exception:
+                if self.resume_token is not None:
+                    # Сокет оборвался, но сессию можно возобновить: кадр уйдёт в новый сокет,
+                    # а приостановку выполнит обработчик соединения, получив disconnect
+                    logger.info(
+                        "Failed to deliver message type=%s to user_id=%s, keeping it for resume",
+                        frame.type,
+                        self.user_id,
+                    )
+                    self.outbox.appendleft(frame)
+                    self._in_flight = None
+                    return
+                logger.exception(
+                    "Failed to deliver message type=%s to user_id=%s", frame.type, self.user_id
+                )
+                self.closed = True
+                await on_failure(self, None)
+                return
+            self._in_flight = None
+            if frame.received_at is not None and frame.type in metrics.RELAY_LATENCY_BY_TYPE:
+                metrics.RELAY_LATENCY_BY_TYPE[frame.type].observe(time.perf_counter() - frame.received_at)
 
 
 class CallRoom:
-    """Manage WebSocket participants for a specific call."""
+    """Manage WebSocket participants for a specific call.
 
-    def __init__(self, call_id: str) -> None:
+    Membership changes take the room lock; read paths (membership checks, snapshots
+    and recipient lists) do not, since they never await between reading and using
+    the participant dicts.
+
+    Offers, answers and ICE candidates go through a ``NegotiationCoordinator`` (see
+    ``relay``); its timeouts run on ``scheduler`` when one is given.
+
+    ``rate_limiter`` holds the ``SIGNALING_ROOM_RATE_LIMITS`` buckets shared by
+    every participant connected to this node.
+    """
+
+    def __init__(
+        self,
+        call_id: str,
+        backplane: Backplane,
+        on_empty: Callable[[CallRoom], None] | None = None,
+        scheduler: DeadlineScheduler | None = None,
+    ) -> None:
         self.call_id = call_id
+        self._backplane = backplane
+        self._on_empty = on_empty
+        self._scheduler = scheduler
+        self._negotiations = NegotiationCoordinator(
+            get_settings().signaling_max_concurrent_negotiations,
+            on_start=self._negotiation_started,
+            on_finish=self._negotiation_finished,
+            rejection=self._offer_rejected,
+        )
+        self.rate_limiter = MessageRateLimiter(parse_rate_limits(get_settings().signaling_room_rate_limits))
         self._participants: dict[int, ParticipantConnection] = {}
+        # Участники, подключённые к другим узлам (зеркало состояния из backplane)
+        self._remote_participants: dict[int, dict[str, Any]] = {}
+        self._background_tasks: set[asyncio.Task] = set()
         self._lock = asyncio.Lock()
+        self._ping_ids = itertools.count(1)
         # Время начала комнаты (когда первый участник вошел)
         self.start_time = datetime.now(tz=timezone.utc)
         # Время последней активности (для cleanup пустых комнат)
@@ -36,10 +545,30 @@ class CallRoom:
 
     @property
     def is_empty(self) -> bool:
+        """True when no participant is connected to this node."""
         return not self._participants
 
-    async def add_participant(self, user_id: int, websocket: WebSocket, user: dict[str, Any]) -> None:
-        """Register a connected user in the room.
+    async def sync_members(self) -> None:
+        """Load participants connected to other nodes from the backplane."""
+
+        members = await self._backplane.get_members(self.call_id)
+        self._remote_participants = {
+            user_id: user for user_id, user in members.items() if user_id not in self._participants
+        }
+
+    async def add_participant(
+        self,
+        user_id: int,
+        websocket: WebSocket,
+        user: dict[str, Any],
+        *,
+        subprotocol: str | None = None,
+    ) -> ParticipantConnection:
+        """Register a connected user in the room and start its outbound writer.
+
+        ``subprotocol`` selects the outbound format: ``ICE_BATCH_SUBPROTOCOL`` and
+        ``MSGPACK_SUBPROTOCOL`` enable batched ICE candidates, the latter also
+        binary MessagePack frames.
 
         Raises:
             HTTPException: If the room has reached maximum participant capacity.
@@ -47,16 +576,38 @@ class CallRoom:
         settings = get_settings()
 
         async with self._lock:
-            # Проверяем лимит участников
-            if len(self._participants) >= settings.max_participants_per_call:
+            # Проверяем лимит участников (с учётом участников на других узлах)
+            remote_count = sum(1 for remote_id in self._remote_participants if remote_id not in self._participants)
+            if len(self._participants) + remote_count >= settings.max_participants_per_call:
                 raise HTTPException(
                     status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                     detail=f"Call is full (maximum {settings.max_participants_per_call} participants allowed)",
                 )
 
-            self._participants[user_id] = ParticipantConnection(websocket, user)
+            connection = ParticipantConnection(
+                user_id,
+                websocket,
+                user,
+                coalesce_ice=signaling_protocol.coalesces_ice(subprotocol),
+                binary=signaling_protocol.is_binary(subprotocol),
+            )
+            previous = self._participants.get(user_id)
+            self._participants[user_id] = connection
+            self._remote_participants.pop(user_id, None)
             self.last_activity = time.time()
 
+        if previous is not None:
+            previous.stop_writer()
+        connection.start_writer(self._evict)
+
+        # Как и в _publish: сбой backplane не роняет вход уже зарегистрированного соединения,
+        # локально комната продолжает работать
+        try:
+            await self._backplane.add_member(self.call_id, user_id, user)
+        except Exception:
+            logger.exception("Failed to add user %s to backplane membership of call %s", user_id, self.call_id)
+        await self._publish({"kind": "join", "user_id": user_id, "user": user})
+
         logger.info(
             "User %s joined call %s (participants=%s/%s)",
             user_id,
@@ -64,13 +615,35 @@ class CallRoom:
             len(self._participants),
             settings.max_participants_per_call,
         )
+        return connection
+
+    async def remove_participant(self, user_id: int, connection: ParticipantConnection | None = None) -> None:
+        """Remove a user from the room if present.
 
-    async def remove_participant(self, user_id: int) -> None:
-        """Remove a user from the room if present."""
+        When ``connection`` is given, the user is removed only if that connection is
+        still the registered one (a reconnect may have replaced it).
+        """
 
         async with self._lock:
-            self._participants.pop(user_id, None)
+            if connection is not None and self._participants.get(user_id) is not connection:
+                connection.stop_writer()
+                return
+            removed = self._participants.pop(user_id, None)
             self.last_activity = time.time()
+            became_empty = removed is not None and not self._participants
+
+        if removed is not None:
+            removed.stop_writer()
+            try:
+                await self._backplane.remove_member(self.call_id, user_id)
+            except Exception:
+                logger.exception("Failed to remove user %s from backplane membership of call %s", user_id, self.call_id)
+            await self._publish({"kind": "leave", "user_id": user_id})
+            # Освободившиеся слоты согласования отдаём отложенным offer
+            await self._deliver_relays(self._negotiations.remove_participant(user_id))
+
+        if became_empty and self._on_empty is not None:
+            self._on_empty(self)
 
         logger.info(
             "User %s left call %s (participants=%s)",
@@ -82,22 +655,29 @@ class CallRoom:
     async def has_participant(self, user_id: int) -> bool:
         """Return True when the user is connected to the room."""
 
-        async with self._lock:
-            return user_id in self._participants
+        return user_id in self._participants or user_id in self._remote_participants
 
     async def list_participants(self, *, exclude_user_id: int | None = None) -> list[dict[str, Any]]:
-        """Return serialized user payloads for all connected participants."""
+        """Return serialized user payloads for all connected participants.
 
-        async with self._lock:
-            return [
-                connection.user
-                for user_id, connection in self._participants.items()
-                if exclude_user_id is None or user_id != exclude_user_id
-            ]
+        Participants connected to this node whose round-trip time has been measured
+        carry it as ``rtt_ms``.
+        """
+
+        users = {
+            user_id: connection.user
+            if connection.rtt_ms is None
+            else {**connection.user, "rtt_ms": round(connection.rtt_ms)}
+            for user_id, connection in self._participants.items()
+        }
+        for user_id, user in self._remote_participants.items():
+            users.setdefault(user_id, user)
+
+        return [user for user_id, user in users.items() if exclude_user_id is None or user_id != exclude_user_id]
 
     async def broadcast(
         self,
-        message: dict[str, Any],
+        message: dict[str, Any] | SignalingFrame,
         *,
         sender_id: int | None = None,
         target_id: int | None = None,
@@ -106,131 +686,725 @@ class CallRoom:
 
         By default the message is sent to all participants except the sender. When
         ``target_id`` is provided, only that participant will receive the message.
+        Participants connected to other nodes are reached through the backplane.
+        The message is serialized once and the same text is sent to every recipient.
         """
 
-        async with self._lock:
-            if target_id is not None:
-                recipient = self._participants.get(target_id)
-                recipients: list[tuple[int, ParticipantConnection]] = (
-                    [(target_id, recipient)] if recipient else []
-                )
+        frame = message if isinstance(message, SignalingFrame) else SignalingFrame(message)
+
+        if target_id is None:
+            needs_publish = bool(self._remote_participants)
+        else:
+            needs_publish = target_id not in self._participants and target_id in self._remote_participants
+
+        if needs_publish:
+            await self._publish(
+                {
+                    "kind": "message",
+                    "type": frame.type,
+                    "frame": frame.text,
+                    "sender_id": sender_id,
+                    "target_id": target_id,
+                }
+            )
+
+        await self._deliver_local(frame, sender_id=sender_id, target_id=target_id)
+
+    async def relay(
+        self,
+        message_type: str,
+        frame: SignalingFrame,
+        *,
+        sender_id: int,
+        target_id: int,
+    ) -> None:
+        """Relay an offer, answer or ICE candidate through the negotiation coordinator.
+
+        The frame may be held back until the pair gets a negotiation slot. An
+        offer from the polite side of a collision is dropped and its sender gets
+        ``offer_rejected``.
+        """
+
+        await self._deliver_relays(self._negotiations.submit(message_type, frame, sender_id, target_id))
+
+    async def _deliver_relays(self, relays: list[Relay], *, local_only: bool = False) -> None:
+        for frame, sender_id, target_id in relays:
+            # Отказ в offer адресован его отправителю, а тот может быть подключён к другому узлу
+            if local_only and frame.type != "offer_rejected":
+                await self._deliver_local(frame, sender_id=sender_id, target_id=target_id)
             else:
-                recipients = list(self._participants.items())
+                await self.broadcast(frame, sender_id=sender_id, target_id=target_id)
+
+    @staticmethod
+    def _offer_rejected(sender_id: int, peer_id: int) -> SignalingFrame:
+        # Вежливая сторона откатывает свой offer и отвечает на offer собеседника
+        return SignalingFrame({"type": "offer_rejected", "from_user": {"id": peer_id}})
+
+    def _negotiation_started(self, pair: Pair) -> None:
+        if self._scheduler is not None:
+            self._scheduler.schedule(
+                (self.call_id, "negotiation", pair),
+                get_settings().signaling_negotiation_timeout_seconds,
+                partial(self._expire_negotiation, pair),
+            )
+
+    def _negotiation_finished(self, pair: Pair) -> None:
+        if self._scheduler is not None:
+            self._scheduler.cancel((self.call_id, "negotiation", pair))
+
+    async def _expire_negotiation(self, pair: Pair) -> None:
+        logger.info("Negotiation between users %s and %s in call %s timed out", *pair, self.call_id)
+        await self._deliver_relays(self._negotiations.expire(pair))
+
+    def negotiation_stats(self) -> tuple[int, int]:
+        """Return the number of active and queued offer/answer exchanges."""
+
+        return self._negotiations.active, self._negotiations.queued
+
+    async def _deliver_local(
+        self,
+        frame: SignalingFrame,
+        *,
+        sender_id: int | None = None,
+        target_id: int | None = None,
+    ) -> None:
+        """Send a message to recipients connected to this node."""
+
+        if target_id is not None:
+            recipient = self._participants.get(target_id)
+            recipients: list[tuple[int, ParticipantConnection]] = [(target_id, recipient)] if recipient else []
+        else:
+            recipients = list(self._participants.items())
 
-        disconnected_users: list[int] = []
         logger.debug(
             "Broadcasting message in call %s (type=%s sender=%s target=%s recipients=%s)",
             self.call_id,
-            message.get("type"),
+            frame.type,
             sender_id,
             target_id,
             [user_id for user_id, _ in recipients],
         )
-        for user_id, connection in recipients:
-            if sender_id is not None and user_id == sender_id:
-                continue
+        started = time.perf_counter()
+        # Уже закрывающиеся соединения пропускаем: их обработчик сам удалит участника
+        slow_consumers = [
+            connection
+            for user_id, connection in recipients
+            if (sender_id is None or user_id != sender_id)
+            and not connection.closed
+            and not connection.enqueue(frame, sender_id=sender_id)
+        ]
+        if target_id is None:
+            metrics.SIGNALING_BROADCAST_FANOUT.observe(time.perf_counter() - started)
+        for connection in slow_consumers:
+            logger.warning(
+                "Outbound queue overflow for user_id=%s in call %s (depth=%s), disconnecting",
+                connection.user_id,
+                self.call_id,
+                connection.queue_depth,
+            )
+            await self._evict(connection, SLOW_CONSUMER_CLOSE_CODE)
 
-            try:
-                await connection.websocket.send_json(message)
-            except Exception:
-                logger.exception(
-                    "Failed to deliver message type=%s to user_id=%s in call %s",
-                    message.get("type"),
-                    user_id,
+    async def send(self, connection: ParticipantConnection, message: dict[str, Any] | SignalingFrame) -> None:
+        """Queue a message for a single local participant."""
+
+        frame = message if isinstance(message, SignalingFrame) else SignalingFrame(message)
+        if not connection.enqueue(frame):
+            await self._evict(connection, SLOW_CONSUMER_CLOSE_CODE)
+
+    async def end(self, frame: SignalingFrame) -> int:
+        """Send a final frame to every local participant and close their sockets.
+
+        Returns the number of connections that were closed.
+        """
+
+        connections = list(self._participants.values())
+        for connection in connections:
+            if not connection.closed:
+                connection.enqueue(frame)
+                connection.close_when_drained(CALL_ENDED_CLOSE_CODE)
+        return len(connections)
+
+    def reattach(
+        self,
+        connection: ParticipantConnection,
+        websocket: WebSocket,
+        *,
+        subprotocol: str | None = None,
+    ) -> bool:
+        """Move a suspended connection to a new socket and replay its queued frames.
+
+        Returns False when the connection was evicted or replaced in the meantime.
+        """
+
+        if connection.closed or self._participants.get(connection.user_id) is not connection:
+            return False
+
+        connection.websocket = websocket
+        connection._set_format(
+            signaling_protocol.coalesces_ice(subprotocol),
+            signaling_protocol.is_binary(subprotocol),
+        )
+        connection.suspended = False
+        connection.last_seen = time.monotonic()
+        connection.start_writer(self._evict)
+        connection._ready.set()
+        self.last_activity = time.time()
+        logger.info(
+            "User %s resumed call %s (replaying %s queued frame(s))",
+            connection.user_id,
+            self.call_id,
+            connection.queue_depth,
+        )
+        return True
+
+    async def heartbeat(self, timeout_seconds: float) -> int:
+        """Ping local participants and evict those that went silent.
+
+        A connection is evicted only if it has answered a ping before and nothing
+        was received from it for ``timeout_seconds``; clients that never answer
+        pings rely on the protocol-level WebSocket ping of the ASGI server.
+        Returns the number of evicted connections.
+        """
+
+        now = time.monotonic()
+        ping_id = next(self._ping_ids)
+        frame = SignalingFrame({"type": "ping", "id": ping_id})
+        evicted = 0
+        for connection in list(self._participants.values()):
+            if connection.closed or connection.suspended:
+                continue
+            if connection.answers_pings and now - connection.last_seen > timeout_seconds:
+                logger.warning(
+                    "No heartbeat from user_id=%s in call %s for %.1fs, disconnecting",
+                    connection.user_id,
                     self.call_id,
+                    now - connection.last_seen,
                 )
-                disconnected_users.append(user_id)
+                await self._evict(connection, HEARTBEAT_TIMEOUT_CLOSE_CODE, reason="Heartbeat timeout")
+                # Полуоткрытое соединение может закрываться долго: сообщаем о выходе сразу
+                connection.left_announced = True
+                await self.broadcast({"type": "user_left", "user": connection.user}, sender_id=connection.user_id)
+                evicted += 1
+            elif not connection.send_ping(frame, ping_id):
+                await self._evict(connection, SLOW_CONSUMER_CLOSE_CODE)
+        return evicted
+
+    @property
+    def pending_commands(self) -> int:
+        """Operations submitted to the room but not yet applied."""
+
+        return 0
+
+    async def close(self) -> None:
+        """Release resources held by the room once it is removed from the registry."""
+
+    def stop_writers(self) -> None:
+        """Cancel the outbound writers of every local connection."""
+
+        for connection in list(self._participants.values()):
+            connection.stop_writer()
+
+    async def _evict(
+        self,
+        connection: ParticipantConnection,
+        close_code: int | None,
+        *,
+        reason: str = "Slow consumer",
+    ) -> None:
+        """Remove a participant whose socket failed, cannot keep up or went silent."""
 
-        for user_id in disconnected_users:
-            await self.remove_participant(user_id)
+        await self.remove_participant(connection.user_id, connection)
+
+        if close_code is not None:
+            # Закрываем соединение в фоне, чтобы его обработчик завершился и разослал user_left
+            task = asyncio.create_task(self._close_quietly(connection.websocket, close_code, reason))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, close_code: int, reason: str) -> None:
+        try:
+            await websocket.close(code=close_code, reason=reason)
+        except Exception:
+            pass
+
+    def rtt_samples(self) -> list[float]:
+        """Return the smoothed round-trip times measured for local connections."""
+
+        return [connection.rtt_ms for connection in self._participants.values() if connection.rtt_ms is not None]
+
+    def queue_stats(self) -> list[tuple[int, int, int]]:
+        """Return (depth, peak depth, dropped frames) for every local connection."""
+
+        return [
+            (connection.queue_depth, connection.peak_queue_depth, connection.dropped_frames)
+            for connection in self._participants.values()
+        ]
+
+    async def _publish(self, event: dict[str, Any]) -> None:
+        try:
+            await self._backplane.publish(room_channel(self.call_id), event)
+        except Exception:
+            logger.exception("Failed to publish %s event for call %s", event.get("kind"), self.call_id)
+
+    async def handle_backplane_event(self, event: dict[str, Any]) -> None:
+        """Apply a membership change or deliver a message published by another node."""
+
+        kind = event.get("kind")
+        if kind == "join":
+            self._remote_participants[int(event["user_id"])] = event.get("user") or {}
+        elif kind == "leave":
+            user_id = int(event["user_id"])
+            self._remote_participants.pop(user_id, None)
+            await self._deliver_relays(self._negotiations.remove_participant(user_id), local_only=True)
+        elif kind == "message":
+            frame = SignalingFrame(text=event["frame"], message_type=event.get("type"))
+            sender_id, target_id = event.get("sender_id"), event.get("target_id")
+            if frame.type in NEGOTIATION_MESSAGE_TYPES and sender_id is not None and target_id is not None:
+                # Обмены с участниками других узлов тоже занимают слоты на этом узле
+                relays = self._negotiations.submit(frame.type, frame, sender_id, target_id)
+                await self._deliver_relays(relays, local_only=True)
+            else:
+                await self._deliver_local(frame, sender_id=sender_id, target_id=target_id)
+
+
+RoomCommand = Callable[[], Awaitable[Any]]
+
+
+class ActorCallRoom(CallRoom):
+    """``CallRoom`` served by one actor task reading a mailbox.
+
+    Membership changes, relays, deliveries and timer callbacks run one at a time
+    in submission order, so ``user_joined``, relayed offers and ``user_left``
+    reach recipients in the order they were submitted and the room lock is never
+    contended. The actor applies every queued command per wake-up.
+
+    Messages (``broadcast``, ``relay``, ``send``, backplane events) are
+    fire-and-forget; membership changes, ``end`` and ``heartbeat`` wait for their
+    result. Calls made from inside the actor, such as an eviction triggered by a
+    delivery, run inline.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # Состояние комнаты меняет только актор: блокировка не нужна
+        self._lock = contextlib.nullcontext()
+        self._mailbox: deque[tuple[RoomCommand, asyncio.Future | None]] = deque()
+        self._mail = asyncio.Event()
+        self._actor: asyncio.Task | None = None
+        self.mailbox_batches = 0
+        self.mailbox_commands = 0
+
+    @property
+    def pending_commands(self) -> int:
+        return len(self._mailbox)
+
+    def _in_actor(self) -> bool:
+        return self._actor is not None and asyncio.current_task() is self._actor
+
+    def _submit(self, command: RoomCommand, *, wait: bool) -> asyncio.Future | None:
+        if self._actor is None or self._actor.done():
+            self._actor = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._mailbox.append((command, future))
+        self._mail.set()
+        return future
+
+    async def _ask(self, command: RoomCommand) -> Any:
+        if self._in_actor():
+            return await command()
+        return await self._submit(command, wait=True)
+
+    async def _run(self) -> None:
+        while True:
+            await self._mail.wait()
+            self._mail.clear()
+            # Команды, пришедшие во время обработки пачки, попадут в следующую
+            batch, self._mailbox = self._mailbox, deque()
+            self.mailbox_batches += 1
+            self.mailbox_commands += len(batch)
+            for command, future in batch:
+                try:
+                    result = await command()
+                except Exception as exc:
+                    if future is None:
+                        logger.exception("Room actor command failed in call %s", self.call_id)
+                    elif not future.done():
+                        future.set_exception(exc)
+                else:
+                    if future is not None and not future.done():
+                        future.set_result(result)
+
+    async def close(self) -> None:
+        """Apply the commands already queued, then stop the actor."""
+
+        actor = self._actor
+        if actor is None or actor.done() or self._in_actor():
+            return
+        if self._mailbox:
+            await self._ask(self._noop)
+        actor.cancel()
+        try:
+            await actor
+        except asyncio.CancelledError:
+            pass
+
+    @staticmethod
+    async def _noop() -> None:
+        return None
+
+    async def add_participant(
+        self,
+        user_id: int,
+        websocket: WebSocket,
+        user: dict[str, Any],
+        *,
+        subprotocol: str | None = None,
+    ) -> ParticipantConnection:
+        return await self._ask(
+            partial(super().add_participant, user_id, websocket, user, subprotocol=subprotocol)
+        )
+
+    async def remove_participant(self, user_id: int, connection: ParticipantConnection | None = None) -> None:
+        await self._ask(partial(super().remove_participant, user_id, connection))
+
+    # Сообщения не ждут результата; внутри актора (доставка из relay и т. п.) выполняются сразу
+    async def broadcast(
+        self,
+        message: dict[str, Any] | SignalingFrame,
+        *,
+        sender_id: int | None = None,
+        target_id: int | None = None,
+    ) -> None:
+        if self._in_actor():
+            await super().broadcast(message, sender_id=sender_id, target_id=target_id)
+        else:
+            self._submit(partial(super().broadcast, message, sender_id=sender_id, target_id=target_id), wait=False)
+
+    async def relay(
+        self,
+        message_type: str,
+        frame: SignalingFrame,
+        *,
+        sender_id: int,
+        target_id: int,
+    ) -> None:
+        if self._in_actor():
+            await super().relay(message_type, frame, sender_id=sender_id, target_id=target_id)
+        else:
+            command = partial(super().relay, message_type, frame, sender_id=sender_id, target_id=target_id)
+            self._submit(command, wait=False)
+
+    async def send(self, connection: ParticipantConnection, message: dict[str, Any] | SignalingFrame) -> None:
+        if self._in_actor():
+            await super().send(connection, message)
+        else:
+            self._submit(partial(super().send, connection, message), wait=False)
+
+    async def end(self, frame: SignalingFrame) -> int:
+        return await self._ask(partial(super().end, frame))
+
+    async def heartbeat(self, timeout_seconds: float) -> int:
+        return await self._ask(partial(super().heartbeat, timeout_seconds))
+
+    async def _expire_negotiation(self, pair: Pair) -> None:
+        self._submit(partial(super()._expire_negotiation, pair), wait=False)
+
+    async def handle_backplane_event(self, event: dict[str, Any]) -> None:
+        self._submit(partial(super().handle_backplane_event, event), wait=False)
+
+
+ROOM_ENGINES: dict[str, type[CallRoom]] = {"lock": CallRoom, "actor": ActorCallRoom}
+
+
+def room_engine(name: str | None = None) -> type[CallRoom]:
+    """Return the room class selected by ``SIGNALING_ROOM_ENGINE``."""
+
+    name = (name or get_settings().signaling_room_engine).strip().lower()
+    try:
+        return ROOM_ENGINES[name]
+    except KeyError:
+        raise RuntimeError(f"Unknown signaling room engine: {name}") from None
+
+
+@dataclass(eq=False)
+class ResumeTicket:
+    """A suspended participant waiting to be reattached to a new socket."""
+
+    call_id: str
+    room: CallRoom
+    connection: ParticipantConnection
+    # Завершение сессии (user_left, история, очистка комнаты), если клиент не вернулся
+    finish: DeadlineCallback
 
 
 class CallRoomManager:
-    """Maintain in-memory rooms for active call signaling."""
+    """Maintain in-memory rooms for active call signaling.
 
-    def __init__(self) -> None:
+    Room timers (maximum call duration, call expiry, empty-room eviction and the
+    heartbeat) are deadlines in a single ``DeadlineScheduler`` instead of tasks per
+    connection.
+
+    Dropped connections with a resume token are kept for
+    ``SIGNALING_RESUME_GRACE_SECONDS`` as ``ResumeTicket`` entries, so a client can
+    reattach without peers seeing it leave and rejoin.
+
+    Rooms are ``CallRoom`` or ``ActorCallRoom`` instances depending on
+    ``SIGNALING_ROOM_ENGINE``.
+
+    Lookups of existing rooms are lock-free. Creating and removing a room takes one
+    of ``ROOM_REGISTRY_SHARDS`` locks chosen by call id, so admission into different
+    calls never waits on another call's backplane round trips.
+    """
+
+    def __init__(self, backplane: Backplane | None = None, *, engine: str | None = None) -> None:
+        self._room_class = room_engine(engine)
         self._rooms: dict[str, CallRoom] = {}
-        self._lock = asyncio.Lock()
-        self._cleanup_task: asyncio.Task | None = None
+        self._shard_locks = [asyncio.Lock() for _ in range(ROOM_REGISTRY_SHARDS)]
+        self.scheduler = DeadlineScheduler()
+        self.backplane = backplane or create_backplane()
+        self.heartbeat_evictions = 0
+        self.rate_limited_messages = 0
+        self.rate_limit_disconnects = 0
+        self._suspended: dict[str, ResumeTicket] = {}
 
-    def start_cleanup_task(self) -> None:
-        """Start background task for cleaning up stale empty rooms."""
-        if self._cleanup_task is None or self._cleanup_task.done():
-            self._cleanup_task = asyncio.create_task(self._cleanup_stale_rooms())
-            logger.info("Started background task for cleaning up stale rooms")
+    async def start(self) -> None:
+        """Connect the backplane and start the room deadline scheduler."""
+        await self.backplane.start()
+        self.scheduler.start()
 
-    async def _cleanup_stale_rooms(self) -> None:
-        """Background task that periodically cleans up empty rooms."""
+    async def shutdown(self) -> None:
+        """Finish suspended sessions, then stop the deadline scheduler, connection writers and the backplane.
+
+        Sockets closed by a graceful server shutdown (1012) are resumable, so at this
+        point most live sessions are suspended; finishing them records leave times,
+        removes backplane membership and announces ``user_left`` to other nodes.
+        Must run before ``write_behind.close()``.
+        """
+        await self.scheduler.stop()
+        while self._suspended:
+            token, ticket = self._suspended.popitem()
+            self.scheduler.cancel((ticket.call_id, "resume", token))
+            ticket.connection.stop_writer()
+            try:
+                await ticket.finish()
+            except Exception:
+                logger.exception(
+                    "Failed to finish suspended session of user %s in call %s",
+                    ticket.connection.user_id,
+                    ticket.call_id,
+                )
+        for room in list(self._rooms.values()):
+            await room.close()
+            room.stop_writers()
+        await self.backplane.close()
+
+    def _schedule_empty_room_eviction(self, room: CallRoom) -> None:
         settings = get_settings()
-        cleanup_interval_seconds = settings.empty_room_cleanup_minutes * 60
+        self.scheduler.schedule(
+            (room.call_id, "empty"),
+            settings.empty_room_cleanup_minutes * 60,
+            partial(self.cleanup_room, room.call_id),
+        )
+
+    def _arm_max_duration(self, call_id: str) -> None:
+        if (call_id, "max_duration") in self.scheduler:
+            return
+
+        max_hours = get_settings().max_call_duration_hours
+        self.scheduler.schedule(
+            (call_id, "max_duration"),
+            max_hours * 3600,
+            partial(
+                self.end_room,
+                call_id,
+                reason=f"Maximum call duration ({max_hours} hours) exceeded",
+            ),
+        )
+
+    def _schedule_heartbeat(self, call_id: str) -> None:
+        interval = get_settings().signaling_heartbeat_interval_seconds
+        if interval > 0:
+            self.scheduler.schedule((call_id, "heartbeat"), interval, partial(self._heartbeat, call_id))
+
+    async def _heartbeat(self, call_id: str) -> None:
+        room = self._rooms.get(call_id)
+        if room is None:
+            return
+
+        # Перепланируем заранее, чтобы ошибка в одном такте не остановила heartbeat комнаты
+        self._schedule_heartbeat(call_id)
+        self.heartbeat_evictions += await room.heartbeat(get_settings().signaling_heartbeat_timeout_seconds)
 
+    def issue_resume_token(self, connection: ParticipantConnection) -> str | None:
+        """Give the connection a new single-use resume token; None when resume is disabled."""
+
+        if get_settings().signaling_resume_grace_seconds <= 0:
+            connection.resume_token = None
+            return None
+
+        connection.resume_token = secrets.token_urlsafe(24)
+        return connection.resume_token
+
+    def suspend(self, call_id: str, room: CallRoom, connection: ParticipantConnection, finish: DeadlineCallback) -> bool:
+        """Keep a dropped connection for the resume grace window.
+
+        ``finish`` runs if no client resumes in time. Returns False when the
+        connection cannot be resumed and the caller must finish the session itself.
+        """
+
+        token = connection.resume_token
+        grace = get_settings().signaling_resume_grace_seconds
+        if token is None or grace <= 0 or connection.closed:
+            return False
+
+        connection.suspend()
+        self._suspended[token] = ResumeTicket(call_id, room, connection, finish)
+        self.scheduler.schedule((call_id, "resume", token), grace, partial(self._expire_ticket, token))
         logger.info(
-            "Cleanup task started: will check for stale rooms every %s minutes",
-            settings.empty_room_cleanup_minutes,
+            "Suspended user %s in call %s for %ss awaiting resume", connection.user_id, call_id, grace
         )
+        return True
 
-        while True:
-            try:
-                await asyncio.sleep(cleanup_interval_seconds)
-                now = time.time()
-
-                async with self._lock:
-                    stale_rooms = [
-                        call_id
-                        for call_id, room in self._rooms.items()
-                        if room.is_empty and (now - room.last_activity) > cleanup_interval_seconds
-                    ]
-
-                    for call_id in stale_rooms:
-                        self._rooms.pop(call_id, None)
-                        logger.info("Cleaned up stale empty room: %s", call_id)
-
-                    if stale_rooms:
-                        logger.info(
-                            "Cleanup completed: removed %s stale rooms, %s rooms remaining",
-                            len(stale_rooms),
-                            len(self._rooms),
-                        )
-            except asyncio.CancelledError:
-                logger.info("Cleanup task cancelled")
-                break
-            except Exception:
-                logger.exception("Error in cleanup task, will retry")
+    async def _expire_ticket(self, token: str) -> None:
+        ticket = self._suspended.pop(token, None)
+        if ticket is None:
+            return
+
+        logger.info("Resume window for user %s in call %s expired", ticket.connection.user_id, ticket.call_id)
+        ticket.connection.stop_writer()
+        await ticket.finish()
+
+    async def resume(self, call_id: str, token: str) -> ResumeTicket | None:
+        """Claim the suspended session for ``token``; None if it is unknown or gone."""
+
+        ticket = self._suspended.get(token)
+        if ticket is None or ticket.call_id != call_id:
+            return None
+
+        del self._suspended[token]
+        self.scheduler.cancel((call_id, "resume", token))
+        if ticket.connection.closed:
+            # Соединение успели выселить или заменить новым входом: завершаем старую сессию
+            await ticket.finish()
+            return None
+        return ticket
+
+    def schedule_call_expiry(self, call_id: str, expires_at: datetime) -> None:
+        """End the room when the call's ``expires_at`` timestamp passes."""
+
+        delay = (expires_at - datetime.now(tz=timezone.utc)).total_seconds()
+        self.scheduler.schedule(
+            (call_id, "expiry"),
+            delay,
+            partial(self.end_room, call_id, reason="Call has expired"),
+        )
+
+    async def end_room(self, call_id: str, *, reason: str) -> None:
+        """Send ``call_ended`` to local participants with one encoded frame and close them."""
+
+        room = await self.get_existing_room(call_id)
+        if room is None:
+            return
+
+        closed = await room.end(SignalingFrame({"type": "call_ended", "reason": reason}))
+        logger.info("Ended call %s for %s local participant(s): %s", call_id, closed, reason)
+
+    def _shard_lock(self, call_id: str) -> asyncio.Lock:
+        return self._shard_locks[hash(call_id) % ROOM_REGISTRY_SHARDS]
 
     async def get_room(self, call_id: str) -> CallRoom:
-        async with self._lock:
+        """Return the room for a joining participant, creating and subscribing it if needed.
+
+        The maximum duration deadline is armed when the room is created and again
+        on the first join after it fired: ``end_room`` closes the participants but
+        the room stays registered until its empty-room eviction.
+        """
+
+        room = self._rooms.get(call_id)
+        if room is not None:
+            self._arm_max_duration(call_id)
+            return room
+
+        async with self._shard_lock(call_id):
             room = self._rooms.get(call_id)
-            if room is None:
-                room = CallRoom(call_id)
-                self._rooms[call_id] = room
-                logger.info(
-                    "Created new room for call %s (total rooms: %s)",
-                    call_id,
-                    len(self._rooms),
-                )
+            if room is not None:
+                self._arm_max_duration(call_id)
+                return room
+
+            room = self._room_class(
+                call_id,
+                self.backplane,
+                on_empty=self._schedule_empty_room_eviction,
+                scheduler=self.scheduler,
+            )
+            # Подписываемся до загрузки участников, чтобы не пропустить join с других узлов;
+            # комната становится видна остальным только после синхронизации
+            await self.backplane.subscribe(room_channel(call_id), room.handle_backplane_event)
+            await room.sync_members()
+            self._rooms[call_id] = room
+            self._arm_max_duration(call_id)
+            # Комната без участников удаляется, даже если к ней так никто и не подключился
+            self._schedule_empty_room_eviction(room)
+            self._schedule_heartbeat(call_id)
+            logger.info(
+                "Created new room for call %s (total rooms: %s)",
+                call_id,
+                len(self._rooms),
+            )
             return room
 
+    def stats(self) -> dict[str, int]:
+        """Return room, connection and outbound queue gauges for monitoring."""
+
+        rooms = list(self._rooms.values())
+        queues = [entry for room in rooms for entry in room.queue_stats()]
+        rtts = sorted(rtt for room in rooms for rtt in room.rtt_samples())
+        negotiations = [room.negotiation_stats() for room in rooms]
+        return {
+            "rooms": len(self._rooms),
+            "connections": len(queues),
+            "queued_frames": sum(depth for depth, _, _ in queues),
+            "max_queue_depth": max((depth for depth, _, _ in queues), default=0),
+            "peak_queue_depth": max((peak for _, peak, _ in queues), default=0),
+            "dropped_frames": sum(dropped for _, _, dropped in queues),
+            "scheduled_deadlines": len(self.scheduler),
+            "measured_rtt_connections": len(rtts),
+            "median_rtt_ms": round(rtts[len(rtts) // 2]) if rtts else 0,
+            "max_rtt_ms": round(rtts[-1]) if rtts else 0,
+            "heartbeat_evictions": self.heartbeat_evictions,
+            "rate_limited_messages": self.rate_limited_messages,
+            "rate_limit_disconnects": self.rate_limit_disconnects,
+            "suspended_connections": len(self._suspended),
+            "active_negotiations": sum(active for active, _ in negotiations),
+            "queued_negotiations": sum(queued for _, queued in negotiations),
+            "pending_room_commands": sum(room.pending_commands for room in rooms),
+        }
+
     async def get_existing_room(self, call_id: str) -> CallRoom | None:
-        async with self._lock:
-            return self._rooms.get(call_id)
+        return self._rooms.get(call_id)
 
     async def cleanup_room(self, call_id: str) -> None:
         """Clean up a room if it's empty.
 
-        Uses double-checked locking to prevent race conditions.
+        Holds the call's shard lock so that a concurrent ``get_room`` cannot
+        subscribe a new room before this one is unsubscribed.
         """
-        async with self._lock:
+        async with self._shard_lock(call_id):
             room = self._rooms.get(call_id)
-            # Двойная проверка: убеждаемся что комната все еще пустая
-            if room and room.is_empty:
-                # Проверяем что это та же самая комната (защита от race condition)
-                if self._rooms.get(call_id) == room:
-                    self._rooms.pop(call_id, None)
-                    logger.info(
-                        "Cleaned up empty room: %s (total rooms: %s)",
-                        call_id,
-                        len(self._rooms),
-                    )
+            if room is None or not room.is_empty:
+                return
+
+            self._rooms.pop(call_id, None)
+            for timer in ("max_duration", "expiry", "empty", "heartbeat"):
+                self.scheduler.cancel((call_id, timer))
+            await self.backplane.unsubscribe(room_channel(call_id))
+            await room.close()
+            logger.info(
+                "Cleaned up empty room: %s (total rooms: %s)",
+                call_id,
+                len(self._rooms),
+            )
 
 
 call_room_manager = CallRoomManager()
@@ -239,8 +1413,14 @@ call_room_manager = CallRoomManager()
 async def notify_call_ended(call_id: str, *, reason: str) -> None:
     """Broadcast call termination to participants and cleanup rooms."""
 
+    frame = SignalingFrame({"type": "call_ended", "reason": reason})
     room = await call_room_manager.get_existing_room(call_id)
     if room:
         logger.info("Sending call_ended to call %s: %s", call_id, reason)
-        await room.broadcast({"type": "call_ended", "reason": reason})
+        await room.broadcast(frame)
         await call_room_manager.cleanup_room(call_id)
+    else:
+        # Участники могут быть подключены к другим узлам
+        await call_room_manager.backplane.publish(
+            room_channel(call_id), {"kind": "message", "type": frame.type, "frame": frame.text}
+        )
@@ -0,0 +1,244 @@
+"""Wire formats of the signaling WebSocket subprotocols.
+
+The subprotocol is the first ``Sec-WebSocket-Protocol`` value the server
+supports; the access token travels as the last value.
+
+- no subprotocol: JSON text frames.
+- ``ice-batch.v1``: JSON text frames; trickled ICE candidates arrive batched in
+  ``ice_candidates`` frames.
+- ``msgpack.v1``: MessagePack binary frames with integer type codes and short
+  keys (``t`` type, ``p`` payload, ``f`` sender id, ``to`` target id). Relayed
+  frames carry the sender's user id instead of the ``from_user`` profile, which
+  clients already have from ``participants_snapshot``/``user_joined``. ICE
+  candidates are batched as with ``ice-batch.v1``.
+
+Client messages of every format are checked in one pass against the per-type
+``PAYLOAD_SCHEMAS`` (``validate_message``) and handed to the relay as
+``RelayMessage`` or ``HeartbeatMessage``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+import msgpack
+
+from app.utils import json_codec
+
+ICE_BATCH_SUBPROTOCOL = "ice-batch.v1"
+MSGPACK_SUBPROTOCOL = "msgpack.v1"
+KNOWN_SUBPROTOCOLS = (MSGPACK_SUBPROTOCOL, ICE_BATCH_SUBPROTOCOL)
+
+MESSAGE_TYPE_CODES: dict[str, int] = {
+    "offer": 1,
+    "answer": 2,
+    "ice_candidate": 3,
+    "ice_candidates": 4,
+    "user_joined": 5,
+    "user_left": 6,
+    "participants_snapshot": 7,
+    "call_metadata": 8,
+    "call_ended": 9,
+    "error": 10,
+    "ping": 11,
+    "pong": 12,
+    "offer_rejected": 13,
+}
+
+# Префикс значения Sec-WebSocket-Protocol с токеном возобновления сессии
+RESUME_TOKEN_PREFIX = "resume."
+
+MESSAGE_TYPES: dict[int, str] = {code: name for name, code in MESSAGE_TYPE_CODES.items()}
+
+_SHORT_KEYS = {"type": "t", "payload": "p", "to_user_id": "to"}
+_LONG_KEYS = {short: key for key, short in _SHORT_KEYS.items()}
+
+
+def negotiate_subprotocol(offered: list[str]) -> str | None:
+    """Return the first offered subprotocol that is supported, if any."""
+
+    return next((value for value in offered if value in KNOWN_SUBPROTOCOLS), None)
+
+
+def is_binary(subprotocol: str | None) -> bool:
+    return subprotocol == MSGPACK_SUBPROTOCOL
+
+
+def coalesces_ice(subprotocol: str | None) -> bool:
+    return subprotocol in KNOWN_SUBPROTOCOLS
+
+
+def to_compact(message: dict[str, Any]) -> dict[str, Any]:
+    """Convert a JSON signaling message to its ``msgpack.v1`` form."""
+
+    compact: dict[str, Any] = {}
+    for key, value in message.items():
+        if key == "type":
+            compact["t"] = MESSAGE_TYPE_CODES.get(value, value)
+        elif key == "from_user":
+            compact["f"] = value.get("id") if isinstance(value, dict) else value
+        else:
+            compact[_SHORT_KEYS.get(key, key)] = value
+    return compact
+
+
+def from_compact(compact: dict[str, Any]) -> dict[str, Any]:
+    """Convert a ``msgpack.v1`` client message to the JSON message shape."""
+
+    message: dict[str, Any] = {}
+    for key, value in compact.items():
+        if key == "t":
+            message["type"] = MESSAGE_TYPES.get(value, value)
+        else:
+            message[_LONG_KEYS.get(key, key)] = value
+    return message
+
+
+def encode(compact: dict[str, Any]) -> bytes:
+    """Serialize a compact message to MessagePack."""
+
+    return msgpack.packb(compact, use_bin_type=True)
+
+
+def decode(data: bytes) -> dict[str, Any]:
+    """Parse a MessagePack client frame into the JSON message shape.
+
+    Raises:
+        ValueError: If the frame is not a MessagePack map.
+    """
+
+    try:
+        compact = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except Exception as exc:
+        raise ValueError("Invalid MessagePack") from exc
+
+    if not isinstance(compact, dict):
+        raise ValueError("Invalid MessagePack")
+    return from_compact(compact)
+
+
+@dataclass(frozen=True, slots=True)
+class RelayMessage:
+    """An offer, answer or ICE candidate addressed to another participant."""
+
+    type: str
+    to_user_id: int
+    payload: dict[str, Any]
+
+
+@dataclass(frozen=True, slots=True)
+class HeartbeatMessage:
+    """A ``ping`` from the client or a ``pong`` answering a server ping."""
+
+    type: str
+    id: Any = None
+
+
+ClientMessage = RelayMessage | HeartbeatMessage
+
+
+class InvalidMessage(ValueError):
+    """A client frame that failed to parse or validate.
+
+    ``message_type`` is set when the frame named a known type, so the caller can
+    charge it to that type's rate limit.
+    """
+
+    def __init__(self, detail: str, message_type: str | None = None) -> None:
+        super().__init__(detail)
+        self.message_type = message_type
+
+
+_MISSING = object()
+_NONE = type(None)
+
+# Поля payload по типу сообщения: (имя, допустимые типы, обязательное).
+# RTCSessionDescriptionInit и RTCIceCandidateInit; прочие поля пропускаются как есть
+_SESSION_DESCRIPTION = (("type", (str,), True), ("sdp", (str,), False))
+_ICE_CANDIDATE = (
+    ("candidate", (str,), True),
+    ("sdpMid", (str, _NONE), False),
+    ("sdpMLineIndex", (int, _NONE), False),
+    ("usernameFragment", (str, _NONE), False),
+)
+PAYLOAD_SCHEMAS: dict[str, tuple[tuple[str, tuple[type, ...], bool], ...]] = {
+    "offer": _SESSION_DESCRIPTION,
+    "answer": _SESSION_DESCRIPTION,
+    "ice_candidate": _ICE_CANDIDATE,
+}
+HEARTBEAT_MESSAGE_TYPES = frozenset({"ping", "pong"})
+
+
+def validate_message(message: Any) -> ClientMessage:
+    """Check a parsed client message against the schema of its type.
+
+    Raises:
+        InvalidMessage: If the type is unknown or a field has the wrong type.
+    """
+
+    message_type = message.get("type") if type(message) is dict else None
+    schema = PAYLOAD_SCHEMAS.get(message_type) if type(message_type) is str else None
+    if schema is None:
+        if message_type in HEARTBEAT_MESSAGE_TYPES:
+            return HeartbeatMessage(message_type, message.get("id"))
+        raise InvalidMessage("Unsupported message type")
+
+    to_user_id = message.get("to_user_id")
+    if type(to_user_id) is not int:
+        raise InvalidMessage("Invalid or missing to_user_id", message_type)
+
+    payload = message.get("payload")
+    if type(payload) is not dict:
+        raise InvalidMessage(f"Invalid {message_type} payload", message_type)
+    for key, types, required in schema:
+        value = payload.get(key, _MISSING)
+        if value is _MISSING:
+            if required:
+                raise InvalidMessage(f"Invalid {message_type} payload: missing {key}", message_type)
+        elif not isinstance(value, types):
+            raise InvalidMessage(f"Invalid {message_type} payload: bad {key}", message_type)
+    return RelayMessage(message_type, to_user_id, payload)
+
+
+def parse_json_message(data: str | bytes) -> ClientMessage:
+    """Parse and validate a JSON client frame.
+
+    Raises:
+        InvalidMessage: If the frame is not valid JSON or fails validation.
+    """
+
+    try:
+        message = json_codec.loads(data)
+    except json_codec.JSONDecodeError as exc:
+        raise InvalidMessage("Invalid JSON") from exc
+    return validate_message(message)
+
+
+def parse_binary_message(data: bytes) -> ClientMessage:
+    """Parse and validate a ``msgpack.v1`` client frame.
+
+    Raises:
+        InvalidMessage: If the frame is not a MessagePack map or fails validation.
+    """
+
+    try:
+        message = decode(data)
+    except ValueError as exc:
+        raise InvalidMessage(str(exc)) from exc
+    return validate_message(message)
+
+
+def utf8_length_exceeds(text: str, limit: int) -> bool:
+    """Return True when ``text`` is longer than ``limit`` bytes in UTF-8.
+
+    The frame is only encoded when its length in characters cannot decide it: a
+    character takes one to four bytes, and ASCII text takes exactly one.
+    """
+
+    length = len(text)
+    if length > limit:
+        return True
+    if length * 4 <= limit or text.isascii():
+        return False
+    return len(text.encode("utf-8")) > limit
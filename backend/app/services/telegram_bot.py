@@ -6,6 +6,7 @@ from typing import Any
 import httpx
 
 from app.config.settings import get_settings
+from app.services.metrics import track_telegram_call
 
 logger = logging.getLogger(__name__)
 
@@ -23,8 +24,9 @@ async def get_webhook_info() -> dict[str, Any] | None:
 
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, timeout=10.0)
-            response.raise_for_status()
+            with track_telegram_call("getWebhookInfo"):
+                response = await client.get(api_url, timeout=10.0)
+                response.raise_for_status()
             payload = response.json()
 
             if payload.get("ok"):
@@ -70,8 +72,9 @@ async def set_webhook(webhook_url: str) -> bool:
 
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(api_url, json={"url": webhook_url}, timeout=10.0)
-            response.raise_for_status()
+            with track_telegram_call("setWebhook"):
+                response = await client.post(api_url, json={"url": webhook_url}, timeout=10.0)
+                response.raise_for_status()
 
             payload = response.json()
 
@@ -168,8 +171,9 @@ async def answer_inline_query(
 
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(api_url, json=payload, timeout=10.0)
-            response.raise_for_status()
+            with track_telegram_call("answerInlineQuery"):
+                response = await client.post(api_url, json=payload, timeout=10.0)
+                response.raise_for_status()
 
             logger.info("Successfully answered inline query %s", inline_query_id)
             return True
@@ -254,8 +258,9 @@ async def send_call_notification(
 
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(api_url, json=payload, timeout=10.0)
-            response.raise_for_status()
+            with track_telegram_call("sendMessage"):
+                response = await client.post(api_url, json=payload, timeout=10.0)
+                response.raise_for_status()
 
             logger.info(
                 "Successfully sent call notification to user %s for call %s",
@@ -0,0 +1,232 @@
+"""Opt-in recorder of signaling traffic shapes for offline replay.
+
+With ``SIGNALING_RECORD_PATH`` set, ``call_signaling`` appends one fixed-size
+record per join, leave and client frame to a binary log: time since the
+recording started, room, sender, target, frame kind and frame size. Nothing
+identifying is written. Rooms are numbered in the order they are first seen,
+participants in the order they join their room; payloads are never stored. A
+call that empties and is joined again is recorded as a new room.
+``python -m benchmarks.replay`` feeds such a log back into the app.
+
+Log layout: the 8-byte ``MAGIC`` once at the start of the file, then records
+of ``RECORD.size`` bytes. Every process that opens the log starts with a
+``SEGMENT`` record; room numbers and the clock restart with each segment.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import os
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator
+
+from app.config.settings import get_settings
+from app.services.signaling_protocol import ClientMessage, RelayMessage
+
+logger = logging.getLogger("app.webrtc")
+
+MAGIC = b"SIGREC\x00\x01"
+# Микросекунды от начала сегмента, комната, отправитель, адресат (0 — нет), вид кадра, размер
+RECORD = struct.Struct("<QIHHBI")
+
+SEGMENT = 0
+JOIN = 1
+LEAVE = 2
+INVALID = 3
+FRAME_KINDS = {"offer": 4, "answer": 5, "ice_candidate": 6, "ping": 7, "pong": 8}
+KIND_NAMES = {
+    SEGMENT: "segment",
+    JOIN: "join",
+    LEAVE: "leave",
+    INVALID: "invalid",
+    **{kind: name for name, kind in FRAME_KINDS.items()},
+}
+
+# Буфер пишется в файл, когда наберётся столько байт, и не реже раза в секунду
+_FLUSH_BYTES = 64 * 1024
+_FLUSH_INTERVAL_SECONDS = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class TrafficRecord:
+    """One decoded log record; ``room`` and participant numbers are local to ``segment``."""
+
+    segment: int
+    offset: float
+    room: int
+    sender: int
+    target: int
+    kind: int
+    size: int
+
+    @property
+    def kind_name(self) -> str:
+        return KIND_NAMES.get(self.kind, "unknown")
+
+
+@dataclass(slots=True)
+class _RoomNumbering:
+    number: int
+    participants: dict[int, int] = field(default_factory=dict)
+    present: set[int] = field(default_factory=set)
+
+
+class TrafficRecorder:
+    """Append anonymized signaling events to a binary log.
+
+    Records are buffered in memory. A background task started by ``start()``
+    writes the buffer off the event loop, in one ``write`` call per flush, every
+    ``_FLUSH_INTERVAL_SECONDS`` or as soon as ``_FLUSH_BYTES`` are buffered; that
+    keeps records of concurrent writers to a shared log whole, but still give
+    every worker its own file with ``{pid}`` in the path. A room's numbering is
+    forgotten once its last recorded participant leaves.
+    """
+
+    def __init__(self, path: str | None) -> None:
+        self.path = path.replace("{pid}", str(os.getpid())) if path else None
+        self._file: BinaryIO | None = None
+        self._buffer = bytearray()
+        self._started = 0.0
+        self._rooms: dict[str, _RoomNumbering] = {}
+        self._room_numbers = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record_join(self, call_id: str, user_id: int) -> None:
+        self._append(call_id, user_id, JOIN)
+        room = self._rooms.get(call_id)
+        if room is not None:
+            room.present.add(user_id)
+
+    def record_leave(self, call_id: str, user_id: int) -> None:
+        self._append(call_id, user_id, LEAVE)
+        room = self._rooms.get(call_id)
+        if room is not None:
+            room.present.discard(user_id)
+            if not room.present:
+                # Повторный вход в этот звонок получит новый номер комнаты
+                del self._rooms[call_id]
+
+    def record_frame(self, call_id: str, user_id: int, size: int, message: ClientMessage | None) -> None:
+        """Record a client frame of ``size`` bytes; ``message`` is None when it was rejected."""
+
+        if message is None:
+            self._append(call_id, user_id, INVALID, size=size)
+            return
+        target_id = message.to_user_id if isinstance(message, RelayMessage) else None
+        self._append(call_id, user_id, FRAME_KINDS[message.type], target_id, size)
+
+    def _append(self, call_id: str, user_id: int, kind: int, target_id: int | None = None, size: int = 0) -> None:
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if self._file is None:
+            self._open(now)
+
+        room = self._rooms.get(call_id)
+        if room is None:
+            room = self._rooms[call_id] = _RoomNumbering(next(self._room_numbers))
+        target = self._participant(room, target_id) if target_id is not None else 0
+        self._buffer += RECORD.pack(
+            int((now - self._started) * 1_000_000), room.number, self._participant(room, user_id), target, kind, size
+        )
+        if len(self._buffer) >= _FLUSH_BYTES:
+            self._wakeup.set()
+
+    @staticmethod
+    def _participant(room: _RoomNumbering, user_id: int) -> int:
+        number = room.participants.get(user_id)
+        if number is None:
+            # Номера 16-битные: в комнате не бывает столько участников, но переполнение не должно ронять запись
+            number = len(room.participants) % 0xFFFF + 1
+            room.participants[user_id] = number
+        return number
+
+    def _open(self, now: float) -> None:
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._buffer += MAGIC
+        self._started = now
+        self._buffer += RECORD.pack(0, 0, 0, 0, SEGMENT, 0)
+        logger.info("Recording signaling traffic to %s", self.path)
+
+    def start(self) -> None:
+        """Start the background flush task when recording is enabled."""
+
+        if self.path is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(_FLUSH_INTERVAL_SECONDS):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write buffered records to the log from a worker thread."""
+
+        async with self._flush_lock:
+            if self._file is None or not self._buffer:
+                return
+            chunk, self._buffer = self._buffer, bytearray()
+            try:
+                await asyncio.to_thread(self._write, self._file, chunk)
+            except OSError:
+                logger.exception("Failed to write signaling traffic log %s; recording stopped", self.path)
+                self.path = None
+
+    @staticmethod
+    def _write(file: BinaryIO, chunk: bytearray) -> None:
+        file.write(chunk)
+        file.flush()
+
+    async def close(self) -> None:
+        """Stop the flush task, then flush and close the log."""
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_records(path: str) -> Iterator[TrafficRecord]:
+    """Yield the records of a traffic log.
+
+    Raises:
+        ValueError: If the file is not a traffic log.
+    """
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a signaling traffic log")
+        segment = 0
+        while chunk := file.read(RECORD.size * 4096):
+            # Хвост, не дописанный при аварийной остановке, отбрасываем
+            for offset, room, sender, target, kind, size in RECORD.iter_unpack(chunk[: len(chunk) - len(chunk) % RECORD.size]):
+                if kind == SEGMENT:
+                    segment += 1
+                    continue
+                yield TrafficRecord(segment, offset / 1_000_000, room, sender, target, kind, size)
+
+
+traffic_recorder = TrafficRecorder(get_settings().signaling_record_path)
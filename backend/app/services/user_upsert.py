@@ -0,0 +1,101 @@
+"""Idempotent insert-or-update of ``users`` rows by Telegram user id.
+
+Both ``/auth/telegram`` (``get_or_create_user``) and the bot's ``/start``
+(``register_or_update_user``) keep the profile columns of a user in sync with
+what Telegram sends. ``upsert_user`` reads the row first and returns without a
+write or commit when the profile is unchanged, the common case for a returning
+user. Otherwise it issues one ``INSERT ... ON CONFLICT (telegram_user_id) DO
+UPDATE ... WHERE <a column changed> RETURNING`` statement. Two first logins
+racing on the unique index then both end up with the same row, and a writer
+that lost the race to identical values does not write at all.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Literal
+
+from sqlalchemy import ColumnElement, false, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User
+from app.services.identity_cache import user_cache
+
+UpsertOutcome = Literal["created", "updated", "unchanged"]
+
+_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def _fold(value: str | None, ignore_case: bool) -> str | None:
+    return value.casefold() if ignore_case and isinstance(value, str) else value
+
+
+def _differs(current: str | None, incoming: str | None, ignore_case: bool) -> bool:
+    return _fold(current, ignore_case) != _fold(incoming, ignore_case)
+
+
+def _changed(current: ColumnElement, incoming: ColumnElement, ignore_case: bool) -> ColumnElement[bool]:
+    if ignore_case:
+        # lower() в SQLite понимает только ASCII: смена регистра кириллицы там считается изменением
+        current, incoming = func.lower(current), func.lower(incoming)
+    return current.is_distinct_from(incoming)
+
+
+async def upsert_user(
+    session: AsyncSession,
+    telegram_user_id: int,
+    profile: Mapping[str, str | None],
+    *,
+    ignore_case: bool = False,
+) -> tuple[User, UpsertOutcome]:
+    """Create the user or bring the ``profile`` columns up to date, committing only when something was written.
+
+    Columns missing from ``profile`` are left as they are. With ``ignore_case``
+    a value that differs from the stored one only in case is not a change. A
+    written user is also invalidated in ``user_cache``.
+
+    Raises:
+        NotImplementedError: If the database is neither PostgreSQL nor SQLite.
+    """
+
+    result = await session.execute(select(User).where(User.telegram_user_id == telegram_user_id))
+    user = result.scalar_one_or_none()
+    if user is not None and not any(
+        _differs(getattr(user, column), value, ignore_case) for column, value in profile.items()
+    ):
+        return user, "unchanged"
+
+    dialect = session.get_bind().dialect.name
+    insert = _INSERTS.get(dialect)
+    if insert is None:
+        raise NotImplementedError(f"User upsert is not implemented for the {dialect} dialect")
+
+    now = datetime.now(tz=timezone.utc)
+    statement = insert(User).values(telegram_user_id=telegram_user_id, created_at=now, updated_at=now, **profile)
+    table = User.__table__
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.telegram_user_id],
+        set_={**{column: statement.excluded[column] for column in profile}, "updated_at": now},
+        where=or_(
+            false(), *(_changed(table.c[column], statement.excluded[column], ignore_case) for column in profile)
+        ),
+    ).returning(User)
+    written = (
+        await session.scalars(statement, execution_options={"populate_existing": True})
+    ).one_or_none()
+
+    if written is None:
+        # Конкурентный запрос уже записал те же значения; commit снимает блокировку строки от ON CONFLICT
+        await session.commit()
+        result = await session.execute(
+            select(User).where(User.telegram_user_id == telegram_user_id),
+            execution_options={"populate_existing": True},
+        )
+        return result.scalar_one(), "unchanged"
+
+    await session.commit()
+    await user_cache.invalidate(written.id)
+    return written, "created" if user is None else "updated"
@@ -0,0 +1,368 @@
+"""Write-behind queue for call history writes made by the signaling endpoint.
+
+Joins and leaves no longer wait on the database: participant records, their
+``left_at`` timestamps and friend-link ``updated_at`` bumps are buffered in
+memory, coalesced (one row per participant interval, one row per friend pair)
+and written in bulk when the buffer reaches ``WRITE_BEHIND_MAX_BATCH`` entries
+or every ``WRITE_BEHIND_FLUSH_INTERVAL_SECONDS``. ``close()`` flushes whatever
+is left on shutdown. A failed flush puts its rows back; after
+``WRITE_BEHIND_MAX_RETRIES`` failures in a row caused by the rows themselves
+(integrity or data errors) the batch is written in halves down to single rows
+instead, and rows that fail on their own are logged and dropped. Any other
+error (lost connection, schema mismatch) keeps the rows buffered.
+
+The buffer belongs to one worker, so nothing reads it back: friend links come
+from live room membership (shared through the backplane), and an open
+participant row is inserted only if no open row for the same user and call
+exists yet, so a reconnect through another worker does not duplicate it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import and_, bindparam, exists, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config.database import SessionLocal
+from app.config.settings import get_settings
+from app.models.friend_link import FriendLink
+from app.models.participant import Participant
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Ограничение числа строк в одном INSERT (лимит параметров у SQLite/asyncpg)
+_ROWS_PER_STATEMENT = 500
+
+# Ошибки, вызванные самими строками: только такие строки можно отбросить
+_ROW_ERRORS = (IntegrityError, DataError)
+
+ParticipantKey = tuple[int, int]  # (calls.id, users.id)
+# Строка буфера: ("leave", ключ, left_at), ("join", ключ, [joined_at, left_at]) или ("link", пара, at)
+BufferedRow = tuple[str, tuple[int, int], object]
+
+
+class WriteBehindQueue:
+    """Coalesce participant history and friend-link writes and flush them in bulk."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = SessionLocal) -> None:
+        self._session_factory = session_factory
+        # Ещё не записанные интервалы участия: [joined_at, left_at | None]
+        self._joins: dict[ParticipantKey, list[list[datetime | None]]] = {}
+        # left_at для записей, которые уже есть в БД
+        self._leaves: dict[ParticipantKey, datetime] = {}
+        self._friend_links: dict[tuple[int, int], datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._failures = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered rows."""
+
+        return self._count(self._joins, self._leaves, self._friend_links)
+
+    def register_join(self, call_id: int, user_id: int, at: datetime, *, open_in_db: bool) -> bool:
+        """Record that a user joined a call; return False when an open record is reused.
+
+        ``open_in_db`` tells whether the database already holds a participant row
+        without ``left_at`` for this user and call.
+        """
+
+        key = (call_id, user_id)
+        intervals = self._joins.get(key)
+        if intervals and intervals[-1][1] is None:
+            return False
+        if open_in_db and key not in self._leaves:
+            return False
+
+        self._joins.setdefault(key, []).append([at, None])
+        self._notify()
+        return True
+
+    def register_leave(self, call_id: int, user_id: int, at: datetime) -> None:
+        """Record that a user left a call."""
+
+        key = (call_id, user_id)
+        intervals = self._joins.get(key)
+        if intervals and intervals[-1][1] is None:
+            intervals[-1][1] = at
+        else:
+            self._leaves[key] = at
+            self._notify()
+
+    def link_friends(self, user_id: int, friend_ids: Iterable[int], at: datetime) -> None:
+        """Create or bump bidirectional friend links between a user and call peers."""
+
+        for friend_id in friend_ids:
+            if friend_id == user_id:
+                continue
+            for pair in ((user_id, friend_id), (friend_id, user_id)):
+                previous = self._friend_links.get(pair)
+                if previous is None or previous < at:
+                    self._friend_links[pair] = at
+        self._notify()
+
+    def _notify(self) -> None:
+        if self.pending >= get_settings().write_behind_max_batch:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the background flush task."""
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the flush task and write everything still buffered."""
+
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        interval = get_settings().write_behind_flush_interval_seconds
+        while True:
+            try:
+                async with asyncio.timeout(interval):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                with metrics.track(metrics.BACKGROUND_TASK_DURATION, "write_behind_flush"):
+                    await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed, will retry")
+
+    async def flush(self, session: AsyncSession | None = None) -> int:
+        """Write buffered rows in bulk; return the number of rows written.
+
+        On failure the batch is put back into the buffer and the error re-raised,
+        unless ``WRITE_BEHIND_MAX_RETRIES`` flushes in a row have failed on the
+        rows themselves: then the batch is written in parts and the rows that keep
+        failing are dropped. Other errors never drop rows.
+        """
+
+        async with self._flush_lock:
+            joins, leaves, friend_links = self._joins, self._leaves, self._friend_links
+            if not (joins or leaves or friend_links):
+                return 0
+            self._joins, self._leaves, self._friend_links = {}, {}, {}
+
+            try:
+                await self._write_batch(session, joins, leaves, friend_links)
+            except Exception as exc:
+                self._failures += 1
+                if self._failures < get_settings().write_behind_max_retries or not isinstance(exc, _ROW_ERRORS):
+                    self._restore(joins, leaves, friend_links)
+                    raise
+                logger.exception(
+                    "Write-behind flush failed %s times in a row, writing the batch in parts", self._failures
+                )
+                dropped = await self._write_in_parts(session, self._rows(joins, leaves, friend_links))
+                self._failures = 0
+                return self._count(joins, leaves, friend_links) - dropped
+            self._failures = 0
+
+        written = self._count(joins, leaves, friend_links)
+        logger.debug(
+            "Write-behind flushed %s row(s): %s participant interval(s), %s leave(s), %s friend link(s)",
+            written,
+            sum(len(intervals) for intervals in joins.values()),
+            len(leaves),
+            len(friend_links),
+        )
+        return written
+
+    async def _write_batch(
+        self,
+        session: AsyncSession | None,
+        joins: dict[ParticipantKey, list[list[datetime | None]]],
+        leaves: dict[ParticipantKey, datetime],
+        friend_links: dict[tuple[int, int], datetime],
+    ) -> None:
+        if session is None:
+            async with self._session_factory() as own_session:
+                await self._write(own_session, joins, leaves, friend_links)
+            return
+        try:
+            await self._write(session, joins, leaves, friend_links)
+        except Exception:
+            # Переданную сессию используют и дальше: снимаем оборванную транзакцию
+            await session.rollback()
+            raise
+
+    async def _write_in_parts(self, session: AsyncSession | None, rows: list[BufferedRow]) -> int:
+        """Write ``rows`` splitting failing parts in halves; return the number of rows dropped.
+
+        An error not caused by the rows puts everything not yet written back into
+        the buffer and is re-raised.
+        """
+
+        dropped = 0
+        parts = [rows]
+        while parts:
+            part = parts.pop()
+            try:
+                await self._write_batch(session, *self._batch(part))
+            except _ROW_ERRORS:
+                if len(part) == 1:
+                    logger.exception("Dropping write-behind row that cannot be written: %r", part[0])
+                    dropped += 1
+                    continue
+                middle = len(part) // 2
+                # Половины пишутся по порядку: закрытие старого интервала раньше вставки нового
+                parts += [part[middle:], part[:middle]]
+            except Exception:
+                self._restore(*self._batch([*part, *(row for rest in reversed(parts) for row in rest)]))
+                raise
+        return dropped
+
+    @staticmethod
+    def _rows(
+        joins: dict[ParticipantKey, list[list[datetime | None]]],
+        leaves: dict[ParticipantKey, datetime],
+        friend_links: dict[tuple[int, int], datetime],
+    ) -> list[BufferedRow]:
+        return [
+            *(("leave", key, left_at) for key, left_at in leaves.items()),
+            *(("join", key, interval) for key, intervals in joins.items() for interval in intervals),
+            *(("link", pair, at) for pair, at in friend_links.items()),
+        ]
+
+    @staticmethod
+    def _batch(
+        rows: list[BufferedRow],
+    ) -> tuple[
+        dict[ParticipantKey, list[list[datetime | None]]], dict[ParticipantKey, datetime], dict[tuple[int, int], datetime]
+    ]:
+        joins: dict[ParticipantKey, list[list[datetime | None]]] = {}
+        leaves: dict[ParticipantKey, datetime] = {}
+        friend_links: dict[tuple[int, int], datetime] = {}
+        for kind, key, value in rows:
+            if kind == "leave":
+                leaves[key] = value
+            elif kind == "join":
+                joins.setdefault(key, []).append(value)
+            else:
+                friend_links[key] = value
+        return joins, leaves, friend_links
+
+    @staticmethod
+    def _count(
+        joins: dict[ParticipantKey, list[list[datetime | None]]],
+        leaves: dict[ParticipantKey, datetime],
+        friend_links: dict[tuple[int, int], datetime],
+    ) -> int:
+        return sum(len(intervals) for intervals in joins.values()) + len(leaves) + len(friend_links)
+
+    @staticmethod
+    async def _write(
+        session: AsyncSession,
+        joins: dict[ParticipantKey, list[list[datetime | None]]],
+        leaves: dict[ParticipantKey, datetime],
+        friend_links: dict[tuple[int, int], datetime],
+    ) -> None:
+        # Сначала закрываем уже записанные интервалы, чтобы не задеть новые строки
+        if leaves:
+            # Core-таблица вместо ORM-сущности: один executemany, а не ORM bulk update по PK
+            participants = Participant.__table__
+            await session.execute(
+                update(participants)
+                .where(
+                    and_(
+                        participants.c.call_id == bindparam("b_call_id"),
+                        participants.c.user_id == bindparam("b_user_id"),
+                        participants.c.left_at.is_(None),
+                    )
+                )
+                .values(left_at=bindparam("b_left_at")),
+                [
+                    {"b_call_id": call_id, "b_user_id": user_id, "b_left_at": left_at}
+                    for (call_id, user_id), left_at in leaves.items()
+                ],
+            )
+
+        participant_rows = [
+            {"call_id": call_id, "user_id": user_id, "joined_at": joined_at, "left_at": left_at}
+            for (call_id, user_id), intervals in joins.items()
+            for joined_at, left_at in intervals
+            if left_at is not None
+        ]
+        for start in range(0, len(participant_rows), _ROWS_PER_STATEMENT):
+            await session.execute(insert(Participant).values(participant_rows[start : start + _ROWS_PER_STATEMENT]))
+
+        # Открытый интервал мог уже записать другой воркер: вставляем его, только если открытой записи нет
+        open_rows = [
+            {"b_call_id": call_id, "b_user_id": user_id, "b_joined_at": intervals[-1][0]}
+            for (call_id, user_id), intervals in joins.items()
+            if intervals[-1][1] is None
+        ]
+        if open_rows:
+            participants = Participant.__table__
+            await session.execute(
+                insert(participants).from_select(
+                    ["call_id", "user_id", "joined_at"],
+                    select(
+                        bindparam("b_call_id", type_=participants.c.call_id.type),
+                        bindparam("b_user_id", type_=participants.c.user_id.type),
+                        bindparam("b_joined_at", type_=participants.c.joined_at.type),
+                    ).where(
+                        ~exists().where(
+                            participants.c.call_id == bindparam("b_call_id"),
+                            participants.c.user_id == bindparam("b_user_id"),
+                            participants.c.left_at.is_(None),
+                        )
+                    ),
+                ),
+                open_rows,
+            )
+
+        link_rows = [
+            {"user_id": user_id, "friend_id": friend_id, "created_at": at, "updated_at": at}
+            for (user_id, friend_id), at in friend_links.items()
+        ]
+        for start in range(0, len(link_rows), _ROWS_PER_STATEMENT):
+            stmt = insert(FriendLink).values(link_rows[start : start + _ROWS_PER_STATEMENT])
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id", "friend_id"],
+                    set_={"updated_at": stmt.excluded.updated_at},
+                )
+            )
+
+        await session.commit()
+
+    def _restore(
+        self,
+        joins: dict[ParticipantKey, list[list[datetime | None]]],
+        leaves: dict[ParticipantKey, datetime],
+        friend_links: dict[tuple[int, int], datetime],
+    ) -> None:
+        for key, intervals in joins.items():
+            # Выход, пришедший во время неудачной записи, закрывает восстановленный интервал
+            if intervals[-1][1] is None and key in self._leaves:
+                intervals[-1][1] = self._leaves.pop(key)
+            # События, пришедшие во время неудачной записи, идут после старых
+            self._joins[key] = intervals + self._joins.get(key, [])
+        for key, left_at in leaves.items():
+            self._leaves.setdefault(key, left_at)
+        for pair, at in friend_links.items():
+            if pair not in self._friend_links or self._friend_links[pair] < at:
+                self._friend_links[pair] = at
+
+
+write_behind = WriteBehindQueue()
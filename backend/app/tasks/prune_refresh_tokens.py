@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config.database import session_scope
+from app.models import RefreshTokenFamily
+
+logger = logging.getLogger(__name__)
+
+
+async def prune_refresh_tokens() -> int:
+    """Delete refresh token families that are expired or revoked; their tokens are rejected either way."""
+
+    now = datetime.now(tz=timezone.utc)
+    async with session_scope() as session:
+        result = await session.execute(
+            delete(RefreshTokenFamily).where(
+                or_(RefreshTokenFamily.expires_at < now, RefreshTokenFamily.revoked_at.is_not(None))
+            )
+        )
+        try:
+            await session.commit()
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+    return result.rowcount
+
+
+async def prune_refresh_tokens_periodically(interval_seconds: float) -> None:
+    """Run ``prune_refresh_tokens`` every ``interval_seconds`` until cancelled."""
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            pruned_count = await prune_refresh_tokens()
+        except Exception:
+            logger.exception("Failed to prune refresh token families")
+            continue
+        logger.info("Pruned %s refresh token family(ies)", pruned_count)
+
+
+async def main() -> None:
+    pruned_count = await prune_refresh_tokens()
+    print(f"Pruned {pruned_count} refresh token family(ies)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
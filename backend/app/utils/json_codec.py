@@ -0,0 +1,63 @@
+"""JSON encoding helpers with an optional fast backend.
+
+Uses ``orjson`` when installed, then ``msgspec``, and falls back to the standard
+library. All backends produce compact JSON text.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:  # pragma: no cover - depends on installed extras
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:  # pragma: no cover - depends on installed extras
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+
+    def dumps(value: Any) -> str:
+        """Serialize a value to compact JSON text."""
+        return orjson.dumps(value).decode()
+
+    def loads(data: str | bytes) -> Any:
+        """Parse JSON text or bytes."""
+        return orjson.loads(data)
+
+    JSONDecodeError: type[Exception] = orjson.JSONDecodeError
+
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+
+    def dumps(value: Any) -> str:
+        """Serialize a value to compact JSON text."""
+        return _encoder.encode(value).decode()
+
+    def loads(data: str | bytes) -> Any:
+        """Parse JSON text or bytes."""
+        return _decoder.decode(data)
+
+    JSONDecodeError = msgspec.DecodeError
+
+else:
+    BACKEND = "json"
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(value: Any) -> str:
+        """Serialize a value to compact JSON text."""
+        return _json_encoder.encode(value)
+
+    def loads(data: str | bytes) -> Any:
+        """Parse JSON text or bytes."""
+        return json.loads(data)
+
+    JSONDecodeError = json.JSONDecodeError
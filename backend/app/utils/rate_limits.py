@@ -0,0 +1,37 @@
+"""Parsing of the ``type=rate/burst`` lists used for signaling rate limits.
+
+Kept out of ``app.services.rate_limit`` so that settings can validate
+``SIGNALING_RATE_LIMITS`` and ``SIGNALING_ROOM_RATE_LIMITS`` at startup
+without importing the service layer.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+RateLimits = dict[str, tuple[float, float]]  # тип сообщения -> (в секунду, burst)
+
+
+# Один и тот же список разбирается для каждого соединения и комнаты; результат только читается
+@lru_cache(maxsize=16)
+def parse_rate_limits(value: str) -> RateLimits:
+    """Parse ``"offer=10/60,*=5/20"`` into ``{"offer": (10.0, 60.0), "*": (5.0, 20.0)}``.
+
+    Raises:
+        ValueError: If an entry is not ``type=rate/burst`` with a positive rate and burst.
+    """
+
+    limits: RateLimits = {}
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            message_type, spec = entry.split("=", 1)
+            rate, burst = (float(part) for part in spec.split("/", 1))
+        except ValueError as exc:
+            raise ValueError(f"Invalid rate limit {entry!r}, expected type=rate/burst") from exc
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit {entry!r}: rate must be > 0 and burst >= 1")
+        limits[message_type.strip()] = (rate, burst)
+    return limits
@@ -0,0 +1,181 @@
+"""Requests per second of ``/auth/telegram`` and ``/auth/refresh``.
+
+Usage:
+    python -m benchmarks.auth_throughput [--requests 2000] [--users 100] [--concurrency 20]
+        [--database-url postgresql+asyncpg://...] [--no-init-data-cache]
+
+Drives the real ASGI app in-process (no network) against a temporary SQLite
+database (or ``--database-url``, which must point at a disposable database),
+with the REST rate limits lifted. ``--users`` users log in once to create their
+rows, then three scenarios run with ``--concurrency`` requests in flight:
+
+- ``telegram-fresh``: every request carries newly signed initData (the
+  verifier cache cannot help), for a user whose profile is unchanged;
+- ``telegram-repeat``: every user resubmits the same initData, as after a
+  reload, a retry or from a second tab;
+- ``refresh``: each user renews the session with its refresh token.
+
+It also times ``InitDataVerifier.verify`` alone, for a fresh payload and for a
+repeat. ``--no-init-data-cache`` turns the verifier cache off for the whole run.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+if "--database-url" in sys.argv:
+    os.environ["DATABASE_URL"] = sys.argv[sys.argv.index("--database-url") + 1]
+else:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='auth-throughput-')}/bench.db"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+os.environ.setdefault("BOT_USERNAME", "bench_bot")
+os.environ.setdefault("CORS_ALLOW_ORIGINS", "https://bench.local")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import hashlib  # noqa: E402
+import hmac  # noqa: E402
+import itertools  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from collections.abc import Awaitable, Callable  # noqa: E402
+from urllib.parse import urlencode  # noqa: E402
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.api import auth as auth_api  # noqa: E402
+from app.config.database import Base, engine  # noqa: E402
+from app.config.settings import get_settings  # noqa: E402
+from app.main import app, limiter  # noqa: E402
+from app.services.init_data import InitDataVerifier, init_data_verifier  # noqa: E402
+
+_query_ids = itertools.count()
+
+
+def _init_data(telegram_user_id: int) -> str:
+    # Как в Telegram: новый query_id у каждого открытия приложения
+    data = {
+        "auth_date": str(int(time.time())),
+        "query_id": f"AAE{next(_query_ids):020d}",
+        "user": json.dumps(
+            {"id": telegram_user_id, "first_name": "Bench", "username": f"bench_{telegram_user_id}"},
+            separators=(",", ":"),
+        ),
+    }
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(data.items()))
+    secret_key = hmac.new(b"WebAppData", get_settings().bot_token.encode(), hashlib.sha256).digest()
+    data["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(data)
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _run(
+    name: str, requests: int, concurrency: int, send: Callable[[int], Awaitable[int]]
+) -> None:
+    latencies: list[float] = []
+    failures = 0
+    counter = itertools.count()
+
+    async def worker() -> None:
+        nonlocal failures
+        while (index := next(counter)) < requests:
+            started = time.perf_counter()
+            status_code = await send(index)
+            latencies.append(time.perf_counter() - started)
+            if status_code != 200:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:<16} rps={requests / elapsed:9.1f} p50={statistics.median(latencies) * 1000:8.2f}ms "
+        f"p99={_percentile(latencies, 99) * 1000:8.2f}ms failures={failures}"
+    )
+
+
+def _time_verify(verifier: InitDataVerifier, payloads: list[str]) -> float:
+    bot_token = get_settings().bot_token
+    started = time.perf_counter()
+    for payload in payloads:
+        verifier.verify(payload, bot_token=bot_token)
+    return (time.perf_counter() - started) / len(payloads) * 1_000_000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="Disposable database to run against")
+    parser.add_argument("--no-init-data-cache", action="store_true", help="Verify every initData in full")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    limiter.enabled = False
+    auth_api.limiter.enabled = False
+    if args.no_init_data_cache:
+        init_data_verifier.max_size = 0
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(
+        f"requests={args.requests} users={args.users} concurrency={args.concurrency} db={engine.dialect.name} "
+        f"init_data_cache={init_data_verifier.enabled}"
+    )
+    telegram_ids = [300_000 + index for index in range(args.users)]
+    repeat_payloads = [_init_data(telegram_id) for telegram_id in telegram_ids]
+    refresh_tokens: list[str] = []
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="https://bench.local") as client:
+        for payload in repeat_payloads:
+            response = await client.post("/auth/telegram", json={"initData": payload})
+            response.raise_for_status()
+            refresh_tokens.append(response.json()["refresh_token"])
+
+        # Подписываем заранее: подпись initData — работа клиента, а не сервера
+        fresh_payloads = [_init_data(telegram_ids[index % args.users]) for index in range(args.requests)]
+
+        async def telegram_fresh(index: int) -> int:
+            response = await client.post("/auth/telegram", json={"initData": fresh_payloads[index]})
+            return response.status_code
+
+        async def telegram_repeat(index: int) -> int:
+            response = await client.post("/auth/telegram", json={"initData": repeat_payloads[index % args.users]})
+            return response.status_code
+
+        locks = [asyncio.Lock() for _ in range(args.users)]
+
+        async def refresh(index: int) -> int:
+            # У пользователя одна цепочка: запросы по одному пользователю не должны идти параллельно
+            slot = index % args.users
+            async with locks[slot]:
+                response = await client.post("/auth/refresh", json={"refresh_token": refresh_tokens[slot]})
+                if response.status_code == 200:
+                    refresh_tokens[slot] = response.json()["refresh_token"]
+                return response.status_code
+
+        await _run("telegram-fresh", args.requests, args.concurrency, telegram_fresh)
+        await _run("telegram-repeat", args.requests, args.concurrency, telegram_repeat)
+        await _run("refresh", args.requests, args.concurrency, refresh)
+
+    verifier = InitDataVerifier(max_size=0 if args.no_init_data_cache else 10_000, window_seconds=300)
+    payloads = [_init_data(telegram_ids[0]) for _ in range(2000)]
+    print(f"verify fresh     {_time_verify(verifier, payloads):8.2f}us per call")
+    print(f"verify repeat    {_time_verify(verifier, payloads):8.2f}us per call")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""Tail latency of CallRoom.broadcast in a 30-participant room with one throttled client.
+
+Usage:
+    python -m benchmarks.broadcast_fanout [--participants 30] [--rounds 50] [--slow-delay 0.2]
+
+Reports delivery latency percentiles for healthy recipients, comparing the
+room's concurrent fan-out with a sequential reference loop (the previous
+implementation).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.services.backplane import InMemoryBackplane
+from app.services.signaling import CallRoomManager
+
+
+class BenchWebSocket:
+    """WebSocket stand-in that records when each message was delivered."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.delivered_at: list[float] = []
+
+    async def send_text(self, data: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.delivered_at.append(time.perf_counter())
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        return None
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    millis = [value * 1000 for value in latencies]
+    print(
+        f"{name:<12} p50={statistics.median(millis):8.2f}ms "
+        f"p95={_percentile(millis, 95):8.2f}ms "
+        f"p99={_percentile(millis, 99):8.2f}ms "
+        f"max={max(millis):8.2f}ms"
+    )
+
+
+async def _run(participants: int, rounds: int, slow_delay: float, fast_delay: float, sequential: bool) -> list[float]:
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("bench")
+    sockets: dict[int, BenchWebSocket] = {}
+
+    # Медленный клиент идёт первым в словаре — худший случай для последовательной рассылки
+    for user_id in range(1, participants + 1):
+        websocket = BenchWebSocket(slow_delay if user_id == 1 else fast_delay)
+        sockets[user_id] = websocket
+        await room.add_participant(user_id, websocket, {"id": user_id})
+
+    latencies: list[float] = []
+    message = {"type": "user_joined", "user": {"id": 0}}
+    for _ in range(rounds):
+        started = time.perf_counter()
+        if sequential:
+            for connection in list(room._participants.values()):
+                await connection.websocket.send_text(json.dumps(message))
+        else:
+            await room.broadcast(message)
+            # Рассылка идёт через очереди: ждём, пока все быстрые клиенты получат сообщение
+            while any(not websocket.delivered_at for user_id, websocket in sockets.items() if user_id != 1):
+                await asyncio.sleep(0)
+
+        for user_id, websocket in sockets.items():
+            if user_id != 1 and websocket.delivered_at:
+                latencies.append(websocket.delivered_at.pop() - started)
+
+    await manager.shutdown()
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--slow-delay", type=float, default=0.2, help="Send delay of the throttled client (s)")
+    parser.add_argument("--fast-delay", type=float, default=0.001, help="Send delay of healthy clients (s)")
+    args = parser.parse_args()
+
+    print(
+        f"participants={args.participants} rounds={args.rounds} "
+        f"slow_delay={args.slow_delay}s fast_delay={args.fast_delay}s"
+    )
+    sequential = await _run(args.participants, args.rounds, args.slow_delay, args.fast_delay, sequential=True)
+    _report("sequential", sequential)
+    concurrent = await _run(args.participants, args.rounds, args.slow_delay, args.fast_delay, sequential=False)
+    _report("concurrent", concurrent)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
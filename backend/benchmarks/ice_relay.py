@@ -0,0 +1,82 @@
+"""Micro-benchmark for the ICE-candidate relay and broadcast encoding hot paths.
+
+Usage:
+    python -m benchmarks.ice_relay [--iterations 200000] [--recipients 30]
+
+Compares building a relayed ``ice_candidate`` frame the previous way (fresh
+``from_user`` dict + ``json.dumps`` per send) with ``SignalingFrame.relay`` and a
+pre-encoded ``from_user``, and per-recipient vs encode-once broadcasts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import timeit
+from types import SimpleNamespace
+
+from app.api.signaling import _serialize_user
+from app.services.signaling import SignalingFrame
+from app.utils import json_codec
+
+USER = SimpleNamespace(
+    id=42,
+    username="tester",
+    first_name="Test",
+    last_name="User",
+    photo_url="https://t.me/i/userpic/320/tester.jpg",
+)
+CANDIDATE = {
+    "candidate": "candidate:842163049 1 udp 1677729535 203.0.113.7 46154 typ srflx raddr 10.0.0.5 "
+    "rport 46154 generation 0 ufrag sWHr network-cost 999",
+    "sdpMid": "0",
+    "sdpMLineIndex": 0,
+    "usernameFragment": "sWHr",
+}
+
+
+def _legacy_relay() -> str:
+    return json.dumps({"type": "ice_candidate", "payload": CANDIDATE, "from_user": _serialize_user(USER)})
+
+
+USER_JSON = json_codec.dumps(_serialize_user(USER))
+
+
+def _frame_relay() -> str:
+    return SignalingFrame.relay("ice_candidate", CANDIDATE, USER_JSON).text
+
+
+def _report(name: str, seconds: float, iterations: int) -> None:
+    print(f"{name:<28} {seconds / iterations * 1e9:10.0f} ns/op")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--recipients", type=int, default=30)
+    args = parser.parse_args()
+
+    assert json.loads(_legacy_relay()) == json.loads(_frame_relay())
+    print(f"json backend: {json_codec.BACKEND}")
+
+    _report("relay: legacy", timeit.timeit(_legacy_relay, number=args.iterations), args.iterations)
+    _report("relay: frame", timeit.timeit(_frame_relay, number=args.iterations), args.iterations)
+
+    message = {"type": "user_joined", "user": _serialize_user(USER)}
+    broadcasts = max(1, args.iterations // args.recipients)
+
+    def per_recipient() -> None:
+        for _ in range(args.recipients):
+            json.dumps(message)
+
+    def encode_once() -> None:
+        frame = SignalingFrame(message)
+        for _ in range(args.recipients):
+            frame.text
+
+    _report(f"broadcast x{args.recipients}: legacy", timeit.timeit(per_recipient, number=broadcasts), broadcasts)
+    _report(f"broadcast x{args.recipients}: frame", timeit.timeit(encode_once, number=broadcasts), broadcasts)
+
+
+if __name__ == "__main__":
+    main()
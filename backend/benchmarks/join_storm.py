@@ -0,0 +1,145 @@
+"""Admission latency when many calls start at the same moment.
+
+Usage:
+    python -m benchmarks.join_storm [--calls 200] [--participants 4] [--backplane-latency 0.001]
+
+Every participant of every call joins at once: ``get_room`` followed by
+``add_participant`` and a burst of relayed messages that check
+``has_participant``. The backplane adds a fixed round-trip latency to each call
+(as a networked Redis would). The sharded registry is compared with a reference
+manager that serializes room creation and cleanup behind one lock (the previous
+implementation).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.backplane import InMemoryBackplane
+from app.services.signaling import CallRoom, CallRoomManager, SignalingFrame, room_channel
+
+
+class LatencyBackplane(InMemoryBackplane):
+    """In-memory backplane that sleeps for one network round trip per operation."""
+
+    def __init__(self, latency: float) -> None:
+        super().__init__()
+        self.latency = latency
+
+    async def subscribe(self, channel, handler) -> None:
+        await asyncio.sleep(self.latency)
+        await super().subscribe(channel, handler)
+
+    async def unsubscribe(self, channel) -> None:
+        await asyncio.sleep(self.latency)
+        await super().unsubscribe(channel)
+
+    async def get_members(self, call_id):
+        await asyncio.sleep(self.latency)
+        return await super().get_members(call_id)
+
+
+class GlobalLockManager(CallRoomManager):
+    """Reference registry: one lock around every room lookup, creation and cleanup."""
+
+    def __init__(self, backplane) -> None:
+        super().__init__(backplane)
+        self._lock = asyncio.Lock()
+
+    async def get_room(self, call_id: str) -> CallRoom:
+        async with self._lock:
+            room = self._rooms.get(call_id)
+            if room is None:
+                room = CallRoom(call_id, self.backplane)
+                self._rooms[call_id] = room
+                await self.backplane.subscribe(room_channel(call_id), room.handle_backplane_event)
+                await room.sync_members()
+            return room
+
+    async def get_existing_room(self, call_id: str) -> CallRoom | None:
+        async with self._lock:
+            return self._rooms.get(call_id)
+
+    async def cleanup_room(self, call_id: str) -> None:
+        async with self._lock:
+            room = self._rooms.get(call_id)
+            if room and room.is_empty:
+                self._rooms.pop(call_id, None)
+                await self.backplane.unsubscribe(room_channel(call_id))
+
+
+class NullWebSocket:
+    async def send_text(self, data: str) -> None:
+        return None
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        return None
+
+
+async def _participant(manager: CallRoomManager, call_id: str, user_id: int, peers: int, messages: int) -> float:
+    started = time.perf_counter()
+    room = await manager.get_room(call_id)
+    await room.add_participant(user_id, NullWebSocket(), {"id": user_id})
+    admitted = time.perf_counter() - started
+
+    frame = SignalingFrame({"type": "ice_candidate", "payload": {}})
+    for index in range(messages):
+        target = user_id - user_id % peers + index % peers
+        if target != user_id and await room.has_participant(target):
+            await room.broadcast(frame, sender_id=user_id, target_id=target)
+        await manager.get_existing_room(call_id)
+    return admitted
+
+
+async def _storm(manager: CallRoomManager, calls: int, participants: int, messages: int) -> tuple[list[float], float]:
+    started = time.perf_counter()
+    admissions = await asyncio.gather(
+        *(
+            _participant(manager, f"call-{call}", call * participants + seat, participants, messages)
+            for call in range(calls)
+            for seat in range(participants)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    await manager.shutdown()
+    return list(admissions), elapsed
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _report(name: str, admissions: list[float], elapsed: float) -> None:
+    millis = [value * 1000 for value in admissions]
+    print(
+        f"{name:<12} admission p50={statistics.median(millis):8.2f}ms "
+        f"p99={_percentile(millis, 99):8.2f}ms max={max(millis):8.2f}ms total={elapsed * 1000:8.1f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--participants", type=int, default=4, help="Participants per call")
+    parser.add_argument("--messages", type=int, default=20, help="Relayed messages per participant")
+    parser.add_argument("--backplane-latency", type=float, default=0.001, help="Backplane round trip (s)")
+    args = parser.parse_args()
+
+    print(
+        f"calls={args.calls} participants={args.participants} messages={args.messages} "
+        f"backplane_latency={args.backplane_latency}s"
+    )
+    for name, manager_cls in (("global_lock", GlobalLockManager), ("sharded", CallRoomManager)):
+        admissions, elapsed = await _storm(
+            manager_cls(LatencyBackplane(args.backplane_latency)), args.calls, args.participants, args.messages
+        )
+        _report(name, admissions, elapsed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
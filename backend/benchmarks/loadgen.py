@@ -0,0 +1,449 @@
+"""Signaling load generator: synthetic WebRTC clients against the in-process app.
+
+Usage:
+    python -m benchmarks.loadgen [--clients 200] [--rooms 20] [--candidates 8]
+        [--subprotocol ice-batch.v1] [--ice-interval 0] [--deadline 60]
+        [--baseline benchmarks/baseline.json] [--tolerance 0.5] [--update-baseline]
+
+Drives the real ASGI app in-process (no network) against a temporary SQLite
+database. ``--clients`` users are spread over ``--rooms`` calls, each gets a JWT
+from ``create_access_token`` and opens a signaling WebSocket; all of them join
+at once. Once everyone is in, every client runs the web client's script: for
+each peer it learned about from ``participants_snapshot``/``user_joined`` with a
+higher user id it sends an offer and trickles ``--candidates`` ICE candidates;
+on an offer it sends an answer and trickles its own candidates. Pings are
+answered with pongs.
+
+Reported metrics:
+
+- ``join_p50_ms``/``join_p99_ms``: ``websocket.connect`` to ``call_metadata``;
+- ``relay_p50_ms``/``relay_p99_ms``: a client handing an offer, answer or
+  candidate to the server to the target receiving it (batched candidates are
+  timed one by one);
+- ``messages_per_second``: relayed messages delivered (candidates counted one
+  by one) over the time from the first offer to the last delivery;
+- ``memory_per_connection_kib``: traced Python memory held per idle open
+  connection, measured in a separate join pass under ``tracemalloc``;
+- ``rejected_joins``, ``incomplete_pairs``, ``errors``: should stay at 0.
+
+The metrics are compared with the baseline file (recorded with the same options
+by ``--update-baseline``); the run exits with status 1 when a metric is worse
+than the baseline by more than ``--tolerance`` (a share of the baseline value).
+Timings depend on the machine: record the baseline on the machine that runs
+the comparison.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='loadgen-')}/bench.db"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+os.environ.setdefault("BOT_USERNAME", "bench_bot")
+os.environ.setdefault("CORS_ALLOW_ORIGINS", "https://bench.local")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import gc  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+from datetime import datetime, timedelta, timezone  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Any  # noqa: E402
+
+from app.config.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Call, User  # noqa: E402
+from app.services import signaling_protocol  # noqa: E402
+from app.services.auth import create_access_token  # noqa: E402
+from app.services.signaling import call_room_manager  # noqa: E402
+from app.services.traffic_recorder import traffic_recorder  # noqa: E402
+from app.services.write_behind import write_behind  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+# Метрика -> True, если большее значение лучше
+METRICS: dict[str, bool] = {
+    "join_p50_ms": False,
+    "join_p99_ms": False,
+    "relay_p50_ms": False,
+    "relay_p99_ms": False,
+    "messages_per_second": True,
+    "memory_per_connection_kib": False,
+    "rejected_joins": False,
+    "incomplete_pairs": False,
+    "errors": False,
+}
+
+
+class LoadRun:
+    """Shared counters of one negotiation phase."""
+
+    def __init__(self, expected_deliveries: int) -> None:
+        self.expected_deliveries = expected_deliveries
+        self.delivered = 0
+        self.errors = 0
+        self.relay_latencies: list[float] = []
+        self.last_delivery = 0.0
+        self.elapsed = 0.0
+        self.done = asyncio.Event()
+        self.tasks: set[asyncio.Task] = set()
+
+    def spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def delivered_one(self, sent_at: float) -> None:
+        now = time.perf_counter()
+        self.relay_latencies.append(now - sent_at)
+        self.last_delivery = now
+        self.delivered += 1
+        if self.delivered >= self.expected_deliveries:
+            self.done.set()
+
+
+class SyntheticClient:
+    """A browser stand-in speaking the signaling protocol over an in-process ASGI WebSocket."""
+
+    def __init__(self, call_id: str, user_id: int, token: str, subprotocol: str | None) -> None:
+        self.call_id = call_id
+        self.user_id = user_id
+        self.token = token
+        self.subprotocol = subprotocol
+        self.binary = signaling_protocol.is_binary(subprotocol)
+        self.run: LoadRun | None = None
+        self.candidates = 0
+        self.ice_interval = 0.0
+        self.peers: set[int] = set()
+        # peer_id -> [есть описание от собеседника, получено кандидатов]
+        self.progress: dict[int, list[Any]] = {}
+        self.join_latency: float | None = None
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._joined = asyncio.Event()
+        self._session: asyncio.Task | None = None
+
+    async def connect(self) -> float | None:
+        """Open the WebSocket; return seconds until ``call_metadata`` or None when rejected."""
+
+        self.peers.clear()
+        self._inbox = asyncio.Queue()
+        self._joined = asyncio.Event()
+        self.join_latency = None
+        protocols = ([self.subprotocol] if self.subprotocol else []) + [f"token.{self.token}"]
+        path = f"/ws/calls/{self.call_id}"
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"sec-websocket-protocol", ", ".join(protocols).encode())],
+            "client": ("127.0.0.1", 50000 + self.user_id % 10000),
+            "server": ("test", 80),
+            "subprotocols": protocols,
+        }
+        self._inbox.put_nowait({"type": "websocket.connect"})
+        started = time.perf_counter()
+        self._session = asyncio.create_task(app(scope, self._receive, self._on_asgi_send))
+        await self._joined.wait()
+        if self.join_latency is not None:
+            self.join_latency -= started
+        return self.join_latency
+
+    async def close(self) -> None:
+        if self._session is None:
+            return
+        self._inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await self._session
+        self._session = None
+
+    async def _receive(self) -> dict[str, Any]:
+        return await self._inbox.get()
+
+    def send(self, message: dict[str, Any]) -> None:
+        if self.binary:
+            self._inbox.put_nowait(
+                {"type": "websocket.receive", "bytes": signaling_protocol.encode(signaling_protocol.to_compact(message))}
+            )
+        else:
+            self._inbox.put_nowait({"type": "websocket.receive", "text": json.dumps(message)})
+
+    async def _on_asgi_send(self, event: dict[str, Any]) -> None:
+        if event["type"] == "websocket.close":
+            self._joined.set()
+            return
+        if event["type"] != "websocket.send":
+            return
+
+        if event.get("bytes") is not None:
+            compact = signaling_protocol.msgpack.unpackb(event["bytes"], raw=False, strict_map_key=False)
+            message = signaling_protocol.from_compact(compact)
+        else:
+            message = json.loads(event["text"])
+        self._handle(message)
+
+    def _handle(self, message: dict[str, Any]) -> None:
+        message_type = message.get("type")
+        if message_type == "call_metadata":
+            self.join_latency = time.perf_counter()
+            self._joined.set()
+        elif message_type == "participants_snapshot":
+            self.peers.update(participant["id"] for participant in message["participants"])
+        elif message_type == "user_joined":
+            self.peers.add(message["user"]["id"])
+        elif message_type == "ping":
+            self.send({"type": "pong", "id": message.get("id")})
+        elif message_type == "error":
+            if self.run is not None:
+                self.run.errors += 1
+        elif message_type in {"offer", "answer", "ice_candidate", "ice_candidates"}:
+            self._on_signal(message_type, _sender_id(message), message["payload"])
+
+    def _on_signal(self, message_type: str, peer_id: int, payload: Any) -> None:
+        run = self.run
+        if run is None:
+            return
+        progress = self.progress.setdefault(peer_id, [False, 0])
+        if message_type in {"offer", "answer"}:
+            run.delivered_one(payload["sent_at"])
+            progress[0] = True
+            if message_type == "offer":
+                self.send(self._signal("answer", peer_id, {"type": "answer", "sdp": "v=0"}))
+                run.spawn(self.trickle(peer_id))
+            return
+
+        for candidate in payload if message_type == "ice_candidates" else [payload]:
+            run.delivered_one(candidate["sent_at"])
+            progress[1] += 1
+
+    @staticmethod
+    def _signal(message_type: str, peer_id: int, payload: dict[str, Any]) -> dict[str, Any]:
+        payload["sent_at"] = time.perf_counter()
+        return {"type": message_type, "to_user_id": peer_id, "payload": payload}
+
+    async def trickle(self, peer_id: int) -> None:
+        for index in range(self.candidates):
+            # Браузер собирает кандидатов постепенно
+            await asyncio.sleep(self.ice_interval)
+            self.send(
+                self._signal(
+                    "ice_candidate",
+                    peer_id,
+                    {"candidate": f"candidate:{index} 1 udp 2122260223 10.0.0.{index} 5000{index} typ host", "sdpMid": "0"},
+                )
+            )
+
+    async def negotiate(self) -> None:
+        for peer_id in sorted(self.peers):
+            if peer_id > self.user_id:
+                self.send(self._signal("offer", peer_id, {"type": "offer", "sdp": "v=0"}))
+                self.run.spawn(self.trickle(peer_id))
+            await asyncio.sleep(0)
+
+    def incomplete_peers(self) -> set[int]:
+        return {
+            peer_id
+            for peer_id in self.peers
+            if not (progress := self.progress.get(peer_id)) or not progress[0] or progress[1] < self.candidates
+        }
+
+
+def _sender_id(message: dict[str, Any]) -> int:
+    sender = message.get("from_user", message.get("f"))
+    return sender["id"] if isinstance(sender, dict) else sender
+
+
+async def _seed(clients: int, rooms: int, subprotocol: str | None) -> list[SyntheticClient]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    synthetic: list[SyntheticClient] = []
+    async with SessionLocal() as session:
+        users = [User(telegram_user_id=100_000 + index, username=f"load_{index}") for index in range(clients)]
+        session.add_all(users)
+        await session.flush()
+        expires_at = datetime.now(tz=timezone.utc) + timedelta(hours=1)
+        calls = [
+            Call(call_id=f"load-{index}", creator_user_id=users[index].id, expires_at=expires_at)
+            for index in range(rooms)
+        ]
+        session.add_all(calls)
+        await session.commit()
+        for index, user in enumerate(users):
+            call_id = calls[index % rooms].call_id
+            synthetic.append(SyntheticClient(call_id, user.id, create_access_token(str(user.id)), subprotocol))
+    return synthetic
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _join_all(clients: list[SyntheticClient]) -> list[float | None]:
+    return list(await asyncio.gather(*(client.connect() for client in clients)))
+
+
+async def _negotiate(clients: list[SyntheticClient], candidates: int, ice_interval: float, deadline: float) -> LoadRun:
+    # Каждая пара: offer, answer и по ``candidates`` кандидатов с каждой стороны
+    pairs = sum(1 for client in clients for peer_id in client.peers if peer_id > client.user_id)
+    run = LoadRun(pairs * (2 + 2 * candidates))
+    for client in clients:
+        client.run = run
+        client.candidates = candidates
+        client.ice_interval = ice_interval
+        client.progress = {}
+
+    started = time.perf_counter()
+    for client in clients:
+        run.spawn(client.negotiate())
+    try:
+        async with asyncio.timeout(deadline):
+            await run.done.wait()
+    except TimeoutError:
+        pass
+    run.elapsed = (run.last_delivery or time.perf_counter()) - started
+    for task in list(run.tasks):
+        task.cancel()
+    return run
+
+
+async def _memory_per_connection(clients: list[SyntheticClient]) -> float:
+    """Traced bytes held per open connection, from a fresh join pass of every client."""
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    joined = sum(1 for latency in await _join_all(clients) if latency is not None)
+    # Даём допечатать participants_snapshot/user_joined
+    await asyncio.sleep(0.2)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await asyncio.gather(*(client.close() for client in clients))
+    return (after - before) / max(joined, 1)
+
+
+async def measure(args: argparse.Namespace) -> dict[str, float]:
+    clients = await _seed(args.clients, args.rooms, args.subprotocol or None)
+    # Как в lifespan приложения: история участников пишется в фоне
+    write_behind.start()
+    traffic_recorder.start()
+
+    joins = await _join_all(clients)
+    join_latencies = [latency for latency in joins if latency is not None]
+    run = await _negotiate(clients, args.candidates, args.ice_interval, args.deadline)
+    incomplete = {
+        (min(client.user_id, peer_id), max(client.user_id, peer_id))
+        for client in clients
+        for peer_id in client.incomplete_peers()
+    }
+    await asyncio.gather(*(client.close() for client in clients))
+
+    memory = await _memory_per_connection(clients)
+
+    await call_room_manager.shutdown()
+    await write_behind.close()
+    # Как при остановке приложения: с SIGNALING_RECORD_PATH прогон пишется в журнал трафика
+    await traffic_recorder.close()
+    await engine.dispose()
+    return {
+        "join_p50_ms": statistics.median(join_latencies) * 1000 if join_latencies else 0.0,
+        "join_p99_ms": _percentile(join_latencies, 99) * 1000,
+        "relay_p50_ms": statistics.median(run.relay_latencies) * 1000 if run.relay_latencies else 0.0,
+        "relay_p99_ms": _percentile(run.relay_latencies, 99) * 1000,
+        "messages_per_second": run.delivered / run.elapsed if run.elapsed > 0 else 0.0,
+        "memory_per_connection_kib": memory / 1024,
+        "rejected_joins": float(len(joins) - len(join_latencies)),
+        "incomplete_pairs": float(len(incomplete)),
+        "errors": float(run.errors),
+    }
+
+
+def compare(metrics: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Return a description of every metric worse than ``baseline`` by more than ``tolerance``."""
+
+    regressions = []
+    for name, higher_is_better in METRICS.items():
+        if name not in baseline:
+            continue
+        expected, actual = baseline[name], metrics[name]
+        if higher_is_better:
+            worse = actual < expected * (1 - tolerance)
+        else:
+            worse = actual > expected * (1 + tolerance)
+        if worse:
+            regressions.append(f"{name}: {actual:.2f} vs baseline {expected:.2f}")
+    return regressions
+
+
+def _config(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "clients": args.clients,
+        "rooms": args.rooms,
+        "candidates": args.candidates,
+        "subprotocol": args.subprotocol,
+        "ice_interval": args.ice_interval,
+    }
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=8, help="ICE candidates per side of each pair")
+    parser.add_argument(
+        "--subprotocol",
+        default=signaling_protocol.ICE_BATCH_SUBPROTOCOL,
+        choices=["", *signaling_protocol.supported_subprotocols()],
+        help="Subprotocol the clients offer ('' for plain JSON)",
+    )
+    parser.add_argument("--ice-interval", type=float, default=0.0, help="Pause before each trickled candidate (s)")
+    parser.add_argument("--deadline", type=float, default=60.0, help="Give up on the negotiation phase after (s)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed regression as a share of the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    config = _config(args)
+    print(" ".join(f"{key}={value}" for key, value in config.items()))
+    metrics = await measure(args)
+    for name, value in metrics.items():
+        print(f"{name:<27}{value:12.2f}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps({"config": config, "metrics": {name: round(value, 2) for name, value in metrics.items()}}, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; record one with --update-baseline")
+        return 0
+    stored = json.loads(args.baseline.read_text())
+    if stored["config"] != config:
+        print(f"baseline was recorded with {stored['config']}; rerun with the same options or --update-baseline")
+        return 2
+
+    regressions = compare(metrics, stored["metrics"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
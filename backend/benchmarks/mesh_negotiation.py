@@ -0,0 +1,189 @@
+"""Time until every peer connection of a full-mesh room is set up, with and without negotiation slots.
+
+Usage:
+    python -m benchmarks.mesh_negotiation [--sizes 10,20,30] [--slots 4] [--candidates 10]
+        [--offer-cost 0.02] [--answer-cost 0.008] [--ice-cost 0.001]
+
+All participants of a room join at once and, as the web client does, the one
+with the lower user id sends the offer to every peer with a higher id. Simulated
+clients handle inbound frames one at a time with a fixed CPU cost per frame
+type (applying an offer and creating an answer, applying an answer, adding a
+candidate), so a client flooded with offers backs up into its outbound queue
+just like a browser tab does. After an offer or answer each side trickles
+``candidates`` ICE candidates.
+
+A pair counts as connected when both sides have the remote description and at
+least one candidate from the other side. Each size is run with the coordinator
+disabled (``slots=0``, every offer relayed at once) and with ``--slots``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from app.config.settings import get_settings
+from app.services.backplane import InMemoryBackplane
+from app.services.signaling import CallRoomManager, SignalingFrame
+from app.services.signaling_protocol import ICE_BATCH_SUBPROTOCOL
+from app.utils import json_codec
+
+ICE_SPACING_SECONDS = 0.002
+DEADLINE_SECONDS = 60.0
+
+
+class SimulatedClient:
+    """Browser stand-in: processes inbound signaling sequentially and answers offers."""
+
+    def __init__(self, user_id: int, mesh: Mesh) -> None:
+        self.user_id = user_id
+        self.mesh = mesh
+        self.user_json = json_codec.dumps({"id": user_id})
+        self.closed_with: int | None = None
+
+    async def send_text(self, data: str) -> None:
+        message = json.loads(data)
+        message_type = message["type"]
+        if message_type not in {"offer", "answer", "ice_candidate", "ice_candidates"}:
+            return
+
+        peer_id = message["from_user"]["id"]
+        costs = self.mesh.costs
+        if message_type == "offer":
+            await asyncio.sleep(costs["offer"])
+            self.mesh.described(self.user_id, peer_id)
+            self.mesh.spawn(self.send("answer", peer_id, {"type": "answer", "sdp": "v=0"}))
+            self.mesh.spawn(self.trickle(peer_id))
+        elif message_type == "answer":
+            await asyncio.sleep(costs["answer"])
+            self.mesh.described(self.user_id, peer_id)
+        else:
+            count = len(message["payload"]) if message_type == "ice_candidates" else 1
+            await asyncio.sleep(costs["ice"] * count)
+            self.mesh.candidate(self.user_id, peer_id)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.closed_with = code
+
+    async def send(self, message_type: str, peer_id: int, payload: dict) -> None:
+        frame = SignalingFrame.relay(message_type, payload, self.user_json, sender_id=self.user_id)
+        await self.mesh.room.relay(message_type, frame, sender_id=self.user_id, target_id=peer_id)
+
+    async def trickle(self, peer_id: int) -> None:
+        for index in range(self.mesh.candidates):
+            await asyncio.sleep(ICE_SPACING_SECONDS)
+            await self.send("ice_candidate", peer_id, {"candidate": f"candidate:{index}", "sdpMid": "0"})
+
+    async def start(self, peers: list[int]) -> None:
+        for peer_id in peers:
+            if peer_id > self.user_id:
+                # Создание offer тоже стоит времени основного потока браузера
+                await asyncio.sleep(self.mesh.costs["answer"])
+                await self.send("offer", peer_id, {"type": "offer", "sdp": "v=0"})
+                self.mesh.spawn(self.trickle(peer_id))
+
+
+class Mesh:
+    def __init__(self, size: int, candidates: int, costs: dict[str, float]) -> None:
+        self.size = size
+        self.candidates = candidates
+        self.costs = costs
+        self.tasks: set[asyncio.Task] = set()
+        self.room = None
+        # Для каждой упорядоченной пары (кто, от кого): есть описание / есть кандидат
+        self._state: dict[tuple[int, int], set[str]] = {}
+        self._connected: set[tuple[int, int]] = set()
+        self.all_connected = asyncio.Event()
+
+    def spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def described(self, user_id: int, peer_id: int) -> None:
+        self._mark(user_id, peer_id, "description")
+
+    def candidate(self, user_id: int, peer_id: int) -> None:
+        self._mark(user_id, peer_id, "candidate")
+
+    def _mark(self, user_id: int, peer_id: int, what: str) -> None:
+        self._state.setdefault((user_id, peer_id), set()).add(what)
+        pair = (min(user_id, peer_id), max(user_id, peer_id))
+        ready = {"description", "candidate"}
+        if self._state.get(pair, set()) >= ready and self._state.get(pair[::-1], set()) >= ready:
+            self._connected.add(pair)
+            if len(self._connected) == self.size * (self.size - 1) // 2:
+                self.all_connected.set()
+
+    @property
+    def connected_pairs(self) -> int:
+        return len(self._connected)
+
+
+async def _run(size: int, slots: int, candidates: int, costs: dict[str, float]) -> dict[str, float]:
+    settings = get_settings()
+    settings.signaling_max_concurrent_negotiations = slots
+    manager = CallRoomManager(InMemoryBackplane())
+    mesh = Mesh(size, candidates, costs)
+    mesh.room = room = await manager.get_room(f"mesh-{size}-{slots}")
+    peers = list(range(1, size + 1))
+    clients = [SimulatedClient(user_id, mesh) for user_id in peers]
+    for client in clients:
+        await room.add_participant(client.user_id, client, {"id": client.user_id}, subprotocol=ICE_BATCH_SUBPROTOCOL)
+
+    started = time.perf_counter()
+    for client in clients:
+        mesh.spawn(client.start(peers))
+    try:
+        async with asyncio.timeout(DEADLINE_SECONDS):
+            await mesh.all_connected.wait()
+    except TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+
+    stats = manager.stats()
+    for task in list(mesh.tasks):
+        task.cancel()
+    await manager.shutdown()
+    return {
+        "elapsed": elapsed,
+        "connected": mesh.connected_pairs,
+        "pairs": size * (size - 1) // 2,
+        "evicted": sum(1 for client in clients if client.closed_with is not None),
+        "dropped": stats["dropped_frames"],
+        "peak_queue": stats["peak_queue_depth"],
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,20,30", help="Comma-separated room sizes")
+    parser.add_argument("--slots", type=int, default=get_settings().signaling_max_concurrent_negotiations)
+    parser.add_argument("--candidates", type=int, default=10, help="ICE candidates per side of each pair")
+    parser.add_argument("--offer-cost", type=float, default=0.02, help="Client time to apply an offer (s)")
+    parser.add_argument("--answer-cost", type=float, default=0.008, help="Client time to apply an answer (s)")
+    parser.add_argument("--ice-cost", type=float, default=0.001, help="Client time per ICE candidate (s)")
+    args = parser.parse_args()
+    # Сброс ICE при переполнении очереди логируется на каждый кадр: оставляем только итоговую таблицу
+    logging.disable(logging.WARNING)
+    costs = {"offer": args.offer_cost, "answer": args.answer_cost, "ice": args.ice_cost}
+
+    print(
+        f"candidates={args.candidates} offer={args.offer_cost * 1000:.0f}ms answer={args.answer_cost * 1000:.0f}ms "
+        f"ice={args.ice_cost * 1000:.1f}ms deadline={DEADLINE_SECONDS:.0f}s"
+    )
+    for size in (int(value) for value in args.sizes.split(",")):
+        for slots in (0, args.slots):
+            result = await _run(size, slots, args.candidates, costs)
+            print(
+                f"size={size:3d} slots={slots or 'off':>3} all_connected={result['elapsed'] * 1000:9.1f}ms "
+                f"pairs={result['connected']:4d}/{result['pairs']:<4d} evicted={result['evicted']:3d} "
+                f"dropped_ice={result['dropped']:5d} peak_queue={result['peak_queue']:4d}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
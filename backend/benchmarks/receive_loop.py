@@ -0,0 +1,117 @@
+"""Connection soak benchmark for the signaling receive loop.
+
+Usage:
+    python -m benchmarks.receive_loop [--connections 1000] [--messages 10]
+
+Feeds ``connections x messages`` ICE candidates through the previous receive
+pattern (``create_task`` + ``asyncio.wait`` against a max-duration sleep task)
+and the current one (direct awaits; call deadlines live in the room scheduler),
+reporting CPU time, tasks created and peak traced memory per 10k messages.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from fastapi import WebSocketDisconnect
+
+from app.api.signaling import _receive_message
+
+MAX_DURATION_SECONDS = 12 * 3600
+MESSAGE = json.dumps(
+    {
+        "type": "ice_candidate",
+        "to_user_id": 2,
+        "payload": {"candidate": "candidate:1 1 udp 2122260223 10.0.0.5 52000 typ host", "sdpMid": "0"},
+    }
+)
+
+
+class SoakWebSocket:
+    def __init__(self, messages: int) -> None:
+        self.remaining = messages
+
+    async def receive_text(self) -> str:
+        await asyncio.sleep(0)
+        if not self.remaining:
+            raise WebSocketDisconnect(code=1000)
+        self.remaining -= 1
+        return MESSAGE
+
+
+async def legacy_loop(websocket: SoakWebSocket) -> None:
+    call_timeout_task = asyncio.create_task(asyncio.sleep(MAX_DURATION_SECONDS))
+    try:
+        while True:
+            receive_task = asyncio.create_task(_receive_message(websocket))
+            done, _ = await asyncio.wait([receive_task, call_timeout_task], return_when=asyncio.FIRST_COMPLETED)
+            if call_timeout_task in done:
+                break
+            await receive_task
+    except WebSocketDisconnect:
+        pass
+    finally:
+        call_timeout_task.cancel()
+
+
+async def direct_loop(websocket: SoakWebSocket) -> None:
+    try:
+        while True:
+            await _receive_message(websocket)
+    except WebSocketDisconnect:
+        pass
+
+
+async def _soak(loop_impl, connections: int, messages: int) -> int:
+    created = 0
+    loop = asyncio.get_running_loop()
+
+    def counting_factory(event_loop, coro, **kwargs):
+        nonlocal created
+        created += 1
+        return asyncio.Task(coro, loop=event_loop, **kwargs)
+
+    loop.set_task_factory(counting_factory)
+    try:
+        await asyncio.gather(*(loop_impl(SoakWebSocket(messages)) for _ in range(connections)))
+    finally:
+        loop.set_task_factory(None)
+    return created
+
+
+def _measure(loop_impl, connections: int, messages: int) -> None:
+    total = connections * messages
+    scale = 10_000 / total
+
+    started = time.process_time()
+    tasks = asyncio.run(_soak(loop_impl, connections, messages))
+    cpu = time.process_time() - started
+
+    tracemalloc.start()
+    asyncio.run(_soak(loop_impl, connections, messages))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{loop_impl.__name__:<12} cpu={cpu * scale * 1000:8.1f}ms/10k "
+        f"tasks={tasks * scale:8.0f}/10k peak_mem={peak / 1024:8.0f}KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=10, help="Messages per connection")
+    args = parser.parse_args()
+
+    print(f"connections={args.connections} messages_per_connection={args.messages}")
+    _measure(legacy_loop, args.connections, args.messages)
+    _measure(direct_loop, args.connections, args.messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Replay a recorded signaling traffic log against the in-process app.
+
+Usage:
+    python -m benchmarks.replay LOG [--speed 1.0] [--subprotocol ice-batch.v1]
+        [--drain 5] [--keep-rate-limits]
+
+``LOG`` is written by the server with ``SIGNALING_RECORD_PATH`` set (see
+``app.services.traffic_recorder``). Every recorded room becomes a call and
+every recorded participant a user of a temporary SQLite database, as in
+``benchmarks.loadgen``. Joins, leaves and client frames are then replayed on
+the recorded schedule, divided by ``--speed``: offers, answers and ICE
+candidates go to the recorded target with a payload padded to the recorded
+frame size, rejected frames are replayed as invalid JSON of the same size.
+Participants that were already in a room when the recording started join at
+the start of its segment. Pongs are not replayed: the synthetic clients answer
+server pings themselves.
+
+The replay is deterministic: the same log and options send the same frames in
+the same order. Per-connection and per-room rate limits are lifted unless
+``--keep-rate-limits`` is given, since an accelerated replay would trip them.
+
+Reported metrics:
+
+- ``relay_p50_ms``/``relay_p99_ms``: a client handing a frame to the server to
+  the target receiving it;
+- ``messages_per_second``: relayed messages delivered over the replay time;
+- ``schedule_lag_p99_ms``: how late frames were sent relative to the
+  schedule (the replayer itself falling behind);
+- ``delivered``/``expected``: relayed messages that reached their target; the
+  gap is mostly ICE candidates shed from outbound queues above the high-water
+  mark, which bursts of unbatched candidates reach at higher speeds;
+- ``errors``: ``error`` frames other than answers to replayed invalid frames.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+# loadgen направляет приложение во временную БД: импортируется раньше app
+from benchmarks import loadgen
+from app.config.database import Base, SessionLocal, engine
+from app.config.settings import get_settings
+from app.models import Call, User
+from app.services import signaling_protocol
+from app.services.auth import create_access_token
+from app.services.signaling import call_room_manager
+from app.services.traffic_recorder import FRAME_KINDS, INVALID, JOIN, LEAVE, TrafficRecord, read_records
+from app.services.write_behind import write_behind
+
+ParticipantKey = tuple[int, int, int]  # (сегмент, комната, участник)
+
+_KIND_TYPES = {kind: message_type for message_type, kind in FRAME_KINDS.items()}
+_RELAYED_KINDS = frozenset(FRAME_KINDS[message_type] for message_type in ("offer", "answer", "ice_candidate"))
+_PONG = FRAME_KINDS["pong"]
+_UNLIMITED = "*=1000000/1000000"
+# Сколько выход ждёт ещё не доставленные клиенту сообщения (сброшенные ICE не дойдут никогда)
+LEAVE_GRACE_SECONDS = 1.0
+
+
+class ReplayClient(loadgen.SyntheticClient):
+    """A synthetic client that only sends what the log says and times what it receives."""
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        # Сколько пересланных сообщений адресовано клиенту и сколько дошло
+        self.addressed = 0
+        self.received = 0
+        self.caught_up = asyncio.Event()
+
+    def expect(self) -> None:
+        self.addressed += 1
+        self.caught_up.clear()
+
+    def _on_signal(self, message_type: str, peer_id: int, payload: Any) -> None:
+        for item in payload if message_type == "ice_candidates" else [payload]:
+            self.run.delivered_one(item["sent_at"])
+            self.received += 1
+        if self.received >= self.addressed:
+            self.caught_up.set()
+
+    async def leave(self) -> None:
+        """Close once everything addressed to the client so far has arrived (or after ``LEAVE_GRACE_SECONDS``).
+
+        In the recording the leave came after the server had taken in these
+        frames; a replay running behind must not cut them off.
+        """
+
+        if self.received < self.addressed:
+            try:
+                async with asyncio.timeout(LEAVE_GRACE_SECONDS):
+                    await self.caught_up.wait()
+            except TimeoutError:
+                pass
+        await self.close()
+
+    def send_invalid(self, size: int) -> None:
+        self._inbox.put_nowait({"type": "websocket.receive", "text": "{" * max(size, 1)})
+
+
+def _payload(message_type: str, padding: str) -> dict[str, Any]:
+    if message_type == "ice_candidate":
+        return {"candidate": padding, "sdpMid": "0", "sdpMLineIndex": 0}
+    if message_type in {"offer", "answer"}:
+        return {"type": message_type, "sdp": padding}
+    return {}
+
+
+def _padding(message_type: str, size: int) -> str:
+    message = {"type": message_type, "to_user_id": 1, "payload": _payload(message_type, "")}
+    # sent_at добавляется при отправке: ещё ~30 байт
+    return "a" * max(0, size - len(json.dumps(message)) - 30)
+
+
+def _schedule(records: list[TrafficRecord]) -> list[tuple[float, TrafficRecord]]:
+    """Put the segments of the log one after another on a single timeline."""
+
+    schedule = []
+    base = 0.0
+    segment = None
+    last = 0.0
+    for record in records:
+        if record.segment != segment:
+            segment = record.segment
+            base += last
+        last = record.offset
+        schedule.append((base + record.offset, record))
+    return schedule
+
+
+async def _seed(
+    keys: set[ParticipantKey], subprotocol: str | None
+) -> dict[ParticipantKey, ReplayClient]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    ordered = sorted(keys)
+    rooms = sorted({key[:2] for key in ordered})
+    async with SessionLocal() as session:
+        users = [User(telegram_user_id=200_000 + index, username=f"replay_{index}") for index in range(len(ordered))]
+        session.add_all(users)
+        await session.flush()
+        expires_at = datetime.now(tz=timezone.utc) + timedelta(hours=12)
+        call_ids = {room: f"replay-{room[0]}-{room[1]}" for room in rooms}
+        session.add_all(
+            Call(call_id=call_id, creator_user_id=users[0].id, expires_at=expires_at) for call_id in call_ids.values()
+        )
+        await session.commit()
+        return {
+            key: ReplayClient(call_ids[key[:2]], user.id, create_access_token(str(user.id)), subprotocol)
+            for key, user in zip(ordered, users)
+        }
+
+
+async def replay(records: list[TrafficRecord], speed: float, subprotocol: str | None, drain: float) -> dict[str, float]:
+    first_kinds: dict[ParticipantKey, int] = {}
+    keys: set[ParticipantKey] = set()
+    for record in records:
+        sender = (record.segment, record.room, record.sender)
+        first_kinds.setdefault(sender, record.kind)
+        keys.add(sender)
+        if record.target:
+            keys.add((record.segment, record.room, record.target))
+    # Участник, чья первая запись не вход, был в комнате до начала записи
+    present_at_start = {key for key in keys if first_kinds.get(key) != JOIN}
+
+    clients = await _seed(keys, subprotocol)
+    write_behind.start()
+    run = loadgen.LoadRun(sum(1 for record in records if record.kind in _RELAYED_KINDS))
+    for client in clients.values():
+        client.run = run
+    paddings: dict[tuple[int, int], str] = {}
+    lags: list[float] = []
+    invalid = 0
+    joined_segments: set[int] = set()
+    # Незавершённые входы и выходы: следующее событие участника ждёт их, как клиент ждёт call_metadata
+    pending: dict[ParticipantKey, asyncio.Task] = {}
+
+    async def settle(key: ParticipantKey) -> None:
+        task = pending.pop(key, None)
+        if task is not None:
+            await task
+
+    schedule = _schedule(records)
+    started = time.perf_counter()
+    for at, record in schedule:
+        delay = started + at / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            lags.append(-delay)
+
+        if record.segment not in joined_segments:
+            joined_segments.add(record.segment)
+            for key in sorted(present_at_start):
+                if key[0] == record.segment:
+                    pending[key] = asyncio.create_task(clients[key].connect())
+
+        sender = (record.segment, record.room, record.sender)
+        await settle(sender)
+        if record.target:
+            await settle((record.segment, record.room, record.target))
+        client = clients[sender]
+        if record.kind == JOIN:
+            pending[sender] = asyncio.create_task(client.connect())
+        elif record.kind == LEAVE:
+            pending[sender] = asyncio.create_task(client.leave())
+        elif record.kind == INVALID:
+            invalid += 1
+            client.send_invalid(record.size)
+        elif record.kind != _PONG:
+            message_type = _KIND_TYPES[record.kind]
+            padding = paddings.get((record.kind, record.size))
+            if padding is None:
+                padding = paddings[(record.kind, record.size)] = _padding(message_type, record.size)
+            payload = _payload(message_type, padding)
+            if record.kind in _RELAYED_KINDS:
+                target = clients[(record.segment, record.room, record.target)]
+                target.expect()
+                payload["sent_at"] = time.perf_counter()
+                client.send({"type": message_type, "to_user_id": target.user_id, "payload": payload})
+            else:
+                client.send({"type": message_type})
+
+    await asyncio.gather(*pending.values())
+    try:
+        async with asyncio.timeout(drain):
+            await run.done.wait()
+    except TimeoutError:
+        pass
+    elapsed = (run.last_delivery or time.perf_counter()) - started
+
+    for task in list(run.tasks):
+        task.cancel()
+    await asyncio.gather(*(client.close() for client in clients.values()), return_exceptions=True)
+    await call_room_manager.shutdown()
+    await write_behind.close()
+    await engine.dispose()
+    return {
+        "recorded_seconds": schedule[-1][0] if schedule else 0.0,
+        "replay_seconds": elapsed,
+        "relay_p50_ms": statistics.median(run.relay_latencies) * 1000 if run.relay_latencies else 0.0,
+        "relay_p99_ms": loadgen._percentile(run.relay_latencies, 99) * 1000,
+        "messages_per_second": run.delivered / elapsed if elapsed > 0 else 0.0,
+        "schedule_lag_p99_ms": loadgen._percentile(lags, 99) * 1000,
+        "delivered": float(run.delivered),
+        "expected": float(run.expected_deliveries),
+        "errors": float(max(run.errors - invalid, 0)),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="Traffic log written with SIGNALING_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (2 replays twice as fast)")
+    parser.add_argument(
+        "--subprotocol",
+        default=signaling_protocol.ICE_BATCH_SUBPROTOCOL,
+        choices=["", *signaling_protocol.supported_subprotocols()],
+        help="Subprotocol the clients offer ('' for plain JSON)",
+    )
+    parser.add_argument("--drain", type=float, default=5.0, help="Wait for outstanding deliveries after the log ends (s)")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Keep the configured signaling rate limits")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if not args.keep_rate_limits:
+        settings = get_settings()
+        settings.signaling_rate_limits = _UNLIMITED
+        settings.signaling_room_rate_limits = _UNLIMITED
+
+    records = list(read_records(args.log))
+    rooms = len({(record.segment, record.room) for record in records})
+    print(f"log={args.log} records={len(records)} rooms={rooms} speed={args.speed} subprotocol={args.subprotocol}")
+    metrics = await replay(records, args.speed, args.subprotocol or None, args.drain)
+    for name, value in metrics.items():
+        print(f"{name:<27}{value:12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""Bytes on the wire and server parse cost: JSON vs ``msgpack.v1`` signaling frames.
+
+Usage:
+    python -m benchmarks.wire_format [--iterations 20000]
+
+Sizes are reported raw and after permessage-deflate (raw DEFLATE per message,
+without context takeover, i.e. the worst case of uvicorn's
+``--ws-per-message-deflate``). Parse cost is measured for client-to-server frames.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import zlib
+
+from app.services import signaling_protocol
+from app.services.signaling import SignalingFrame
+from app.utils import json_codec
+
+USER = {"id": 123456789, "username": "ivan_petrov", "first_name": "Иван", "last_name": "Петров",
+        "photo_url": "https://t.me/i/userpic/320/ivan_petrov.jpg"}
+SDP = "\r\n".join(
+    ["v=0", "o=- 4611731400430051336 2 IN IP4 127.0.0.1", "s=-", "t=0 0", "a=group:BUNDLE 0"]
+    + [f"a=rtpmap:{pt} opus/48000/2" for pt in range(96, 127)]
+    + [f"a=candidate:{index} 1 udp 2122260223 192.168.1.{index} 5{index:04d} typ host" for index in range(8)]
+)
+CANDIDATE = {"candidate": "candidate:842163049 1 udp 1677729535 93.184.216.34 52000 typ srflx raddr 0.0.0.0 "
+             "rport 0 generation 0 ufrag EsAw network-cost 999", "sdpMid": "0", "sdpMLineIndex": 0}
+
+
+def _frames() -> dict[str, SignalingFrame]:
+    user_json = json_codec.dumps(USER)
+    candidates = [SignalingFrame.relay("ice_candidate", CANDIDATE, user_json, sender_id=USER["id"]) for _ in range(6)]
+    return {
+        "offer": SignalingFrame.relay("offer", {"type": "offer", "sdp": SDP}, user_json, sender_id=USER["id"]),
+        "ice_candidate": candidates[0],
+        "ice_candidates(6)": SignalingFrame.ice_batch(candidates),
+        "user_joined": SignalingFrame({"type": "user_joined", "user": USER}),
+    }
+
+
+def _deflated_sizes(payloads: list[bytes]) -> list[int]:
+    sizes = []
+    for payload in payloads:
+        compressor = zlib.compressobj(wbits=-15)
+        chunk = compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        sizes.append(len(chunk) - 4)  # permessage-deflate отбрасывает хвост 00 00 ff ff
+    return sizes
+
+
+def _parse_cost(data, parse, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse(data)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    frames = _frames()
+    texts = [frame.text.encode() for frame in frames.values()]
+    binaries = [frame.binary for frame in frames.values()]
+    text_deflated = _deflated_sizes(texts)
+    binary_deflated = _deflated_sizes(binaries)
+
+    print(f"{'frame':<18} {'json':>6} {'msgpack':>8} {'json+deflate':>13} {'msgpack+deflate':>16}")
+    for index, name in enumerate(frames):
+        print(
+            f"{name:<18} {len(texts[index]):6d} {len(binaries[index]):8d} "
+            f"{text_deflated[index]:13d} {binary_deflated[index]:16d}"
+        )
+
+    incoming = {"type": "ice_candidate", "payload": CANDIDATE, "to_user_id": USER["id"]}
+    json_text = json_codec.dumps(incoming)
+    packed = signaling_protocol.encode(signaling_protocol.to_compact(incoming))
+    print(
+        f"parse ice_candidate from client: json(stdlib)={_parse_cost(json_text, json.loads, args.iterations):.2f}us "
+        f"json({json_codec.BACKEND})={_parse_cost(json_text, json_codec.loads, args.iterations):.2f}us "
+        f"msgpack={_parse_cost(packed, signaling_protocol.decode, args.iterations):.2f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
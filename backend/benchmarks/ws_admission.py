@@ -0,0 +1,176 @@
+"""Handshake-to-``call_metadata`` latency of the signaling WebSocket under concurrent joins.
+
+Usage:
+    python -m benchmarks.ws_admission [--calls 10] [--participants 4] [--rounds 3] [--concurrency 0]
+        [--database-url postgresql+asyncpg://...] [--resume]
+
+Drives the real ASGI app in-process (no network) against a temporary SQLite
+database (or ``--database-url``, which must point at a disposable database):
+participants connect at once (or ``--concurrency`` at a time), and the time from
+``websocket.connect`` to the first ``call_metadata`` frame is recorded. Each
+round reconnects everyone, so later rounds also exercise participant history
+and friend-link upserts. Joins the server rejected (e.g. SQLite lock timeouts)
+are counted separately. With ``--resume`` sockets drop without a close frame
+(1006) and later rounds reconnect with the ``resume_token`` from
+``call_metadata`` instead of joining from scratch.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+if "--database-url" in sys.argv:
+    os.environ["DATABASE_URL"] = sys.argv[sys.argv.index("--database-url") + 1]
+else:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='ws-admission-')}/bench.db"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+os.environ.setdefault("BOT_USERNAME", "bench_bot")
+os.environ.setdefault("CORS_ALLOW_ORIGINS", "https://bench.local")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import json  # noqa: E402
+import logging  # noqa: E402
+import statistics  # noqa: E402
+import time  # noqa: E402
+from datetime import datetime, timedelta, timezone  # noqa: E402
+
+from app.config.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Call, User  # noqa: E402
+from app.services.auth import create_access_token  # noqa: E402
+from app.services.signaling import call_room_manager  # noqa: E402
+from app.services.write_behind import write_behind  # noqa: E402
+
+
+async def _seed(calls: int, participants: int) -> list[tuple[str, str]]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    joins: list[tuple[str, str]] = []
+    async with SessionLocal() as session:
+        for call_index in range(calls):
+            users = [
+                User(telegram_user_id=call_index * 1000 + seat, username=f"u{call_index}_{seat}")
+                for seat in range(participants)
+            ]
+            session.add_all(users)
+            await session.flush()
+            call = Call(
+                call_id=f"bench-{call_index}",
+                creator_user_id=users[0].id,
+                expires_at=datetime.now(tz=timezone.utc) + timedelta(hours=1),
+            )
+            session.add(call)
+            joins.extend((call.call_id, create_access_token(str(user.id))) for user in users)
+        await session.commit()
+    return joins
+
+
+Joined = tuple[float | None, str | None]  # (секунды до call_metadata, resume_token)
+
+
+async def _join(
+    call_id: str, token: str, limiter: asyncio.Semaphore | None, resume_token: str | None, drop: bool
+) -> Joined:
+    if limiter is None:
+        return await _connect(call_id, token, resume_token, drop)
+    async with limiter:
+        return await _connect(call_id, token, resume_token, drop)
+
+
+async def _connect(call_id: str, token: str, resume_token: str | None, drop: bool) -> Joined:
+    inbox: asyncio.Queue = asyncio.Queue()
+    metadata_received = asyncio.Event()
+    await inbox.put({"type": "websocket.connect"})
+    started = time.perf_counter()
+    elapsed: float | None = None
+    next_resume_token: str | None = None
+
+    async def receive():
+        return await inbox.get()
+
+    async def send(message):
+        nonlocal elapsed, next_resume_token
+        payload = message.get("text") or message.get("bytes") or ""
+        if message["type"] == "websocket.send" and elapsed is None and "call_metadata" in str(payload):
+            elapsed = time.perf_counter() - started
+            next_resume_token = json.loads(payload).get("resume_token")
+            metadata_received.set()
+        elif message["type"] == "websocket.close":
+            metadata_received.set()
+
+    protocols = ([f"resume.{resume_token}"] if resume_token else []) + [f"token.{token}"]
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "scheme": "ws",
+        "path": f"/ws/calls/{call_id}",
+        "raw_path": f"/ws/calls/{call_id}".encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"sec-websocket-protocol", ", ".join(protocols).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("test", 80),
+        "subprotocols": protocols,
+    }
+    session = asyncio.create_task(app(scope, receive, send))
+    await metadata_received.wait()
+    await inbox.put({"type": "websocket.disconnect", "code": 1006 if drop else 1000})
+    await session
+    return elapsed, next_resume_token
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--participants", type=int, default=4, help="Participants per call")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=0, help="Simultaneous joins (0 = all at once)")
+    parser.add_argument("--database-url", default=None, help="Disposable database to run against")
+    parser.add_argument("--resume", action="store_true", help="Drop sockets and reconnect with resume tokens")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    joins = await _seed(args.calls, args.participants)
+    print(
+        f"calls={args.calls} participants={args.participants} rounds={args.rounds} "
+        f"concurrency={args.concurrency or 'all'} db={engine.dialect.name} resume={args.resume}"
+    )
+    resume_tokens: list[str | None] = [None] * len(joins)
+    limiter = asyncio.Semaphore(args.concurrency) if args.concurrency else None
+    # Как в lifespan приложения: история участников пишется в фоне
+    write_behind.start()
+    for round_index in range(args.rounds):
+        results = await asyncio.gather(
+            *(
+                _join(call_id, token, limiter, resume_tokens[index], args.resume)
+                for index, (call_id, token) in enumerate(joins)
+            )
+        )
+        resume_tokens = [resume_token for _, resume_token in results]
+        latencies = [value * 1000 for value, _ in results if value is not None]
+        if not latencies:
+            print(f"round {round_index + 1}: every join was rejected")
+            continue
+        print(
+            f"round {round_index + 1}: joins={len(latencies)} rejected={len(results) - len(latencies)} "
+            f"p50={statistics.median(latencies):8.2f}ms p99={_percentile(latencies, 99):8.2f}ms "
+            f"max={max(latencies):8.2f}ms"
+        )
+    await call_room_manager.shutdown()
+    await write_behind.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -14,6 +14,7 @@ os.environ.setdefault("CORS_ALLOW_ORIGINS", "*")  # Allow all origins in tests
 
 from app.main import app
 from app.config.database import Base, get_session
+from app.services.identity_cache import user_cache
 
 # Use in-memory SQLite for testing
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -43,6 +44,8 @@ async def test_db(test_engine):
 
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    # Идентификаторы пользователей повторяются между тестами
+    user_cache.clear()
 
 
 @pytest_asyncio.fixture
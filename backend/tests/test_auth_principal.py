@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import event
+
+from app.services.auth import Principal, create_access_token, get_current_principal
+
+
+class _Request:
+    def __init__(self, token):
+        self.cookies = {"access_token": token}
+
+
+@pytest.mark.asyncio
+async def test_principal_comes_from_token_claims():
+    token = create_access_token("42", username="alice_42", first_name="Alice")
+
+    assert await get_current_principal(_Request(token), None) == Principal(42, "alice_42", "Alice")
+    # Токены без профиля в claims по-прежнему принимаются
+    assert await get_current_principal(_Request(create_access_token("7")), None) == Principal(7)
+
+
+@pytest.mark.asyncio
+async def test_id_only_endpoints_do_not_query_users(client, test_engine):
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", _record)
+    try:
+        response = await client.get(
+            "/api/call-stats/", headers={"Authorization": f"Bearer {create_access_token('42')}"}
+        )
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", _record)
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert statements and not any("FROM users" in statement for statement in statements)
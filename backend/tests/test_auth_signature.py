@@ -8,6 +8,7 @@ import pytest
 from fastapi import HTTPException, status
 
 from app.services.auth import validate_init_data
+from app.services.init_data import build_init_data_fingerprint
 
 
 def build_init_data(bot_token: str, user_payload: dict[str, str], auth_date: int | None = None) -> str:
@@ -46,3 +47,42 @@ def test_validate_init_data_rejects_tampered_payload():
         validate_init_data(tampered_init_data, bot_token=bot_token)
 
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_repeat_submission_is_served_from_cache():
+    from app.services.init_data import InitDataVerifier
+
+    bot_token = "123456:TEST-TOKEN"
+    init_data = build_init_data(bot_token, {"id": 42, "first_name": "Test"})
+    verifier = InitDataVerifier(max_size=10, window_seconds=300)
+
+    first = verifier.verify(init_data, bot_token=bot_token)
+    assert verifier.verify(init_data, bot_token=bot_token) is first
+    assert verifier.stats() == {"size": 1, "hits": 1, "misses": 1}
+    assert first.fingerprint == build_init_data_fingerprint(init_data)
+
+    # Закэшированная строка не проходит с другим токеном бота
+    with pytest.raises(HTTPException) as excinfo:
+        verifier.verify(init_data, bot_token="654321:OTHER-TOKEN")
+    assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_cache_hit_checks_age_against_each_caller():
+    from app.services.init_data import InitDataVerifier
+
+    bot_token = "123456:TEST-TOKEN"
+    now = [1_700_000_000.0]
+    verifier = InitDataVerifier(max_size=10, window_seconds=300, clock=lambda: now[0])
+    init_data = build_init_data(bot_token, {"id": 42}, auth_date=int(now[0]) - 100)
+
+    verifier.verify(init_data, bot_token=bot_token, max_age_seconds=3600)
+    # Закэшированная проверка с большим допустимым возрастом не пропускает более строгого вызывающего
+    with pytest.raises(HTTPException) as excinfo:
+        verifier.verify(init_data, bot_token=bot_token, max_age_seconds=50)
+    assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
+    assert verifier.verify(init_data, bot_token=bot_token, max_age_seconds=101).auth_date is not None
+
+    now[0] += 2
+    with pytest.raises(HTTPException):
+        verifier.verify(init_data, bot_token=bot_token, max_age_seconds=101)
+    assert verifier.stats()["misses"] == 1
@@ -57,3 +57,27 @@ async def test_invalid_username_does_not_override_existing(test_db, caplog):
     assert updated_user.first_name == "Alicia"
     assert updated_user.username == "validname"
     assert any("invalid Telegram username" in record.message for record in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_profile_is_not_written(test_db, test_engine):
+    from sqlalchemy import event
+
+    payload = {"id": 303, "username": "steady_user", "first_name": "Steady"}
+    user = await get_or_create_user(test_db, payload)
+
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", _record)
+    try:
+        # Отличие только в регистре изменением не считается
+        same_user = await get_or_create_user(test_db, {**payload, "username": "Steady_User"})
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", _record)
+
+    assert same_user.id == user.id
+    assert same_user.username == "steady_user"
+    assert [statement.split()[0] for statement in statements] == ["SELECT"]
@@ -1,5 +1,7 @@
 import pytest
 
+from app.config.settings import get_settings
+
 
 @pytest.mark.asyncio
 async def test_health_endpoint(client):
@@ -14,3 +16,22 @@ async def test_root_endpoint(client):
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
     assert "backend" in response.json()["message"].lower()
+
+
+@pytest.mark.asyncio
+async def test_signaling_health_reports_queue_gauges(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "monitoring_token", "scrape-secret")
+    response = await client.get("/health/signaling", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert {"rooms", "connections", "queued_frames", "max_queue_depth", "dropped_frames"} <= set(response.json())
+
+
+@pytest.mark.asyncio
+async def test_stats_endpoints_require_monitoring_token(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "monitoring_token", None)
+    assert (await client.get("/health/signaling")).status_code == 404
+
+    monkeypatch.setattr(get_settings(), "monitoring_token", "scrape-secret")
+    assert (await client.get("/health/identity-cache")).status_code == 401
+    wrong = await client.get("/health/init-data-cache", headers={"Authorization": "Bearer guess"})
+    assert wrong.status_code == 401
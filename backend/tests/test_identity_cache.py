@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.auth import create_access_token, get_or_create_user, get_user_from_token
+from app.services.backplane import InMemoryBackplane, InMemoryHub
+from app.services.identity_cache import UserCache, user_cache
+
+
+@pytest.mark.asyncio
+async def test_token_lookups_are_served_from_cache_until_the_user_changes(test_db):
+    user = await get_or_create_user(test_db, {"id": 501, "username": "cached_user", "first_name": "Old"})
+    token = create_access_token(str(user.id))
+    hits = user_cache.hits
+
+    await get_user_from_token(token, test_db)
+    test_db.expunge_all()
+    cached = await get_user_from_token(token, test_db)
+
+    assert user_cache.hits == hits + 1
+    assert (cached.id, cached.username, cached.first_name) == (user.id, "cached_user", "Old")
+    assert cached in test_db
+
+    await get_or_create_user(test_db, {"id": 501, "username": "cached_user", "first_name": "New"})
+    test_db.expunge_all()
+    assert (await get_user_from_token(token, test_db)).first_name == "New"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_workers_sharing_a_backplane(test_db):
+    hub = InMemoryHub()
+    first, second = UserCache(2, 60), UserCache(2, 60)
+    await first.attach(InMemoryBackplane(hub))
+    await second.attach(InMemoryBackplane(hub))
+    users = [await get_or_create_user(test_db, {"id": 600 + index, "username": f"worker_{index}"}) for index in range(3)]
+    for user in users[:2]:
+        second.put(user)
+
+    await first.invalidate(users[0].id)
+    assert second.get(users[0].id) is None
+    assert second.get(users[1].id) is not None
+
+    # Промах, начатый до инвалидации, не кладёт в кэш устаревшую строку
+    epoch = second.epoch
+    await first.invalidate(users[2].id)
+    second.put(users[2], epoch=epoch)
+    assert second.get(users[2].id) is None
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.config.settings import get_settings
+from app.services.backplane import InMemoryBackplane
+from app.services.signaling import CallRoomManager, SignalingFrame
+
+
+class SilentWebSocket:
+    async def send_text(self, data):
+        return None
+
+    async def close(self, code=1000, reason=None):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exports_route_latency_relay_latency_and_signaling_gauges(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "monitoring_token", "scrape-secret")
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-metrics")
+    for user_id in (1, 2):
+        await room.add_participant(user_id, SilentWebSocket(), {"id": user_id})
+    frame = SignalingFrame.relay("answer", {"sdp": "v=0"}, '{"id":1}', sender_id=1)
+    await room.relay("answer", frame, sender_id=1, target_id=2)
+    await asyncio.sleep(0.01)
+
+    await client.get("/health")
+    await client.get("/no-such-route")
+    response = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    await manager.shutdown()
+
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'signaling_relay_latency_seconds_count{type="answer"} 1.0' in body
+    assert "signaling_broadcast_fanout_seconds_count" in body
+    assert "signaling_rooms " in body
+    assert "signaling_connections " in body
@@ -0,0 +1,66 @@
+import pytest
+
+from app.models import User
+from app.services.init_data import VerifiedInitData
+
+
+async def _login(client, test_db, monkeypatch):
+    user = User(telegram_user_id=555, username="refresh_user", first_name="Refresh")
+    test_db.add(user)
+    await test_db.commit()
+    monkeypatch.setattr(
+        "app.api.auth.authenticate_user_from_init_data", lambda init_data: VerifiedInitData({"id": 555}, None, "stub")
+    )
+
+    response = await client.post("/auth/telegram", json={"initData": "stub"})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_token(client, test_db, monkeypatch):
+    login = await _login(client, test_db, monkeypatch)
+    assert login["refresh_expires_in"] > 0
+
+    response = await client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"]["username"] == "refresh_user"
+    assert body["refresh_token"] != login["refresh_token"]
+    assert response.cookies.get("refresh_token") == body["refresh_token"]
+    # Новый токен тоже обменивается, подделанный — нет
+    assert (await client.post("/auth/refresh", json={"refresh_token": body["refresh_token"]})).status_code == 200
+    forged = body["refresh_token"].rsplit(".", 1)[0] + ".AAAA"
+    assert (await client.post("/auth/refresh", json={"refresh_token": forged})).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_reused_refresh_token_revokes_family(client, test_db, monkeypatch):
+    from app.config.settings import get_settings
+
+    login = await _login(client, test_db, monkeypatch)
+    first = (await client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})).json()
+
+    # В пределах окна предыдущий токен отдаёт текущий (параллельное обновление)
+    repeated = await client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})
+    assert repeated.status_code == 200
+    assert repeated.json()["refresh_token"] == first["refresh_token"]
+
+    monkeypatch.setattr(get_settings(), "refresh_token_reuse_grace_seconds", 0)
+    client.cookies.clear()
+    assert (await client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})).status_code == 401
+    # Повторное использование отзывает всю семью, включая текущий токен
+    assert (await client.post("/auth/refresh", json={"refresh_token": first["refresh_token"]})).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_refresh_token(client, test_db, monkeypatch):
+    login = await _login(client, test_db, monkeypatch)
+
+    response = await client.post("/auth/logout", json={"refresh_token": login["refresh_token"]})
+    assert response.status_code == 204
+    assert 'refresh_token=""' in response.headers.get_list("set-cookie")[-1]
+    assert (await client.post("/auth/refresh", json={"refresh_token": login["refresh_token"]})).status_code == 401
+    # Повторный выход и выход без токена не считаются ошибкой
+    assert (await client.post("/auth/logout")).status_code == 204
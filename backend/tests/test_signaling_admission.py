@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.api.signaling import AdmissionRejected, _admit_participant
+from app.config.settings import get_settings
+from app.models import Call, CallStatus, User
+from app.models.friend_link import FriendLink
+from app.models.participant import Participant
+from app.services.auth import create_access_token
+from app.services.write_behind import WriteBehindQueue, write_behind
+
+
+async def _seed(session, *, status=CallStatus.ACTIVE, expires_in=timedelta(hours=1)):
+    alice = User(telegram_user_id=1001, username="alice")
+    bob = User(telegram_user_id=1002, username="bob")
+    session.add_all([alice, bob])
+    await session.flush()
+    call = Call(
+        call_id="admission-call",
+        creator_user_id=alice.id,
+        status=status,
+        expires_at=datetime.now(tz=timezone.utc) + expires_in,
+    )
+    session.add(call)
+    await session.flush()
+    session.add(Participant(call_id=call.id, user_id=alice.id))
+    await session.commit()
+    return alice, bob, call
+
+
+@pytest.mark.asyncio
+async def test_admission_registers_participant_and_friend_links(test_db):
+    alice, bob, call = await _seed(test_db)
+    token = create_access_token(str(bob.id))
+
+    admission = await _admit_participant(test_db, token, call.call_id)
+
+    assert admission.user.id == bob.id
+    assert admission.call.id == call.id
+    assert not admission.reused_participant
+    assert admission.other_user_ids == [alice.id]
+    await write_behind.flush(test_db)
+    links = (await test_db.execute(select(FriendLink.user_id, FriendLink.friend_id))).all()
+    assert sorted(links) == sorted([(alice.id, bob.id), (bob.id, alice.id)])
+
+    again = await _admit_participant(test_db, token, call.call_id)
+    assert again.reused_participant
+    assert await write_behind.flush(test_db) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("token_subject", "call_id", "close_code"),
+    [("bob", "admission-call", 4404), ("missing-user", "admission-call", 4401), ("bob", "unknown", 4404)],
+)
+async def test_admission_rejects_before_accept(test_db, token_subject, call_id, close_code):
+    _, bob, _ = await _seed(test_db, expires_in=timedelta(hours=-1))
+    token = create_access_token(str(bob.id) if token_subject == "bob" else "999999")
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await _admit_participant(test_db, token, call_id)
+
+    assert exc_info.value.close_code == close_code
+    assert (await test_db.execute(select(Participant).where(Participant.user_id == bob.id))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_admission_rejects_invalid_token(test_db):
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await _admit_participant(test_db, "not-a-jwt", "admission-call")
+
+    assert exc_info.value.close_code == 4401
+
+
+@pytest.mark.asyncio
+async def test_write_behind_coalesces_and_flushes_in_bulk(test_db):
+    alice, bob, call = await _seed(test_db)
+    queue = WriteBehindQueue()
+    first = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    # Алиса уже в БД с открытой записью; Боб заходит, выходит и заходит снова до записи
+    assert not queue.register_join(call.id, alice.id, first, open_in_db=True)
+    assert queue.register_join(call.id, bob.id, first, open_in_db=False)
+    queue.register_leave(call.id, bob.id, first + timedelta(minutes=1))
+    assert queue.register_join(call.id, bob.id, first + timedelta(minutes=2), open_in_db=False)
+    queue.register_leave(call.id, alice.id, first + timedelta(minutes=3))
+    for minute in range(3):
+        queue.link_friends(bob.id, [alice.id], first + timedelta(minutes=minute))
+
+    assert await queue.flush(test_db) == 5
+    assert queue.pending == 0
+
+    rows = (
+        await test_db.execute(
+            select(Participant.user_id, Participant.left_at).order_by(Participant.user_id, Participant.joined_at)
+        )
+    ).all()
+    assert [(user_id, left_at is not None) for user_id, left_at in rows] == [
+        (alice.id, True),
+        (bob.id, True),
+        (bob.id, False),
+    ]
+    links = (await test_db.execute(select(FriendLink.user_id, FriendLink.updated_at))).all()
+    assert len(links) == 2
+    assert all(updated_at.replace(tzinfo=timezone.utc) == first + timedelta(minutes=2) for _, updated_at in links)
+
+
+@pytest.mark.asyncio
+async def test_open_participant_rows_from_two_workers_are_deduplicated(test_db):
+    _, bob, call = await _seed(test_db)
+    joined_at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    # Боб переподключился через другой воркер раньше, чем первый сбросил свою очередь
+    for queue in (WriteBehindQueue(), WriteBehindQueue()):
+        assert queue.register_join(call.id, bob.id, joined_at, open_in_db=False)
+        await queue.flush(test_db)
+
+    rows = (
+        await test_db.execute(
+            select(Participant.id).where(Participant.user_id == bob.id, Participant.left_at.is_(None))
+        )
+    ).all()
+    assert len(rows) == 1
+
+
+class PoisonedQueue(WriteBehindQueue):
+    """Fails every write that contains the participant interval of ``poisoned_user_id``."""
+
+    poisoned_user_id: int
+
+    async def _write(self, session, joins, leaves, friend_links):
+        if any(user_id == self.poisoned_user_id for _, user_id in joins):
+            raise IntegrityError("INSERT INTO participants", {}, Exception("row rejected by the database"))
+        await WriteBehindQueue._write(session, joins, leaves, friend_links)
+
+
+@pytest.mark.asyncio
+async def test_write_behind_drops_rows_that_keep_failing(test_db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "write_behind_max_retries", 2)
+    alice, bob, call = await _seed(test_db)
+    queue = PoisonedQueue()
+    queue.poisoned_user_id = bob.id
+    at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    queue.register_join(call.id, bob.id, at, open_in_db=False)
+    queue.register_leave(call.id, alice.id, at)
+    queue.link_friends(bob.id, [alice.id], at)
+
+    with pytest.raises(IntegrityError):
+        await queue.flush(test_db)
+    assert queue.pending == 4
+
+    # Вторая неудача подряд: пачка пишется по частям, отравленная строка отбрасывается
+    assert await queue.flush(test_db) == 3
+    assert queue.pending == 0
+    assert (await test_db.execute(select(Participant).where(Participant.user_id == bob.id))).first() is None
+    assert len((await test_db.execute(select(FriendLink))).all()) == 2
+    left_at = (await test_db.execute(select(Participant.left_at).where(Participant.user_id == alice.id))).scalar_one()
+    assert left_at is not None
+
+
+class OutdatedSchemaQueue(WriteBehindQueue):
+    """Fails every write the way a database without the expected schema does."""
+
+    async def _write(self, session, joins, leaves, friend_links):
+        raise OperationalError("INSERT INTO participants", {}, Exception("no such column: participants.left_at"))
+
+
+@pytest.mark.asyncio
+async def test_write_behind_keeps_rows_on_errors_not_caused_by_rows(test_db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "write_behind_max_retries", 1)
+    _, bob, call = await _seed(test_db)
+    queue = OutdatedSchemaQueue()
+    queue.register_join(call.id, bob.id, datetime(2030, 1, 1, tzinfo=timezone.utc), open_in_db=False)
+
+    # Ошибка схемы не отбрасывает строки, сколько бы раз подряд она ни повторилась
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            await queue.flush(test_db)
+        assert queue.pending == 1
@@ -0,0 +1,223 @@
+import asyncio
+import json
+from collections import defaultdict
+
+import pytest
+
+from app.services import backplane as backplane_module
+from app.services.backplane import (
+    InMemoryBackplane,
+    InMemoryHub,
+    RedisBackplane,
+    encode_command,
+    read_reply,
+)
+from app.services.signaling import CallRoomManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "username": f"user{user_id}", "first_name": None, "last_name": None, "photo_url": None}
+
+
+async def _join_two_nodes(backplane_a, backplane_b):
+    node_a = CallRoomManager(backplane_a)
+    node_b = CallRoomManager(backplane_b)
+    alice_ws, bob_ws = FakeWebSocket(), FakeWebSocket()
+
+    room_a = await node_a.get_room("call-1")
+    await room_a.add_participant(1, alice_ws, _user(1))
+    room_b = await node_b.get_room("call-1")
+    await room_b.add_participant(2, bob_ws, _user(2))
+    return room_a, room_b, alice_ws, bob_ws
+
+
+@pytest.mark.asyncio
+async def test_rooms_on_different_nodes_share_membership_and_messages():
+    hub = InMemoryHub()
+    room_a, room_b, alice_ws, bob_ws = await _join_two_nodes(InMemoryBackplane(hub), InMemoryBackplane(hub))
+
+    assert await room_a.has_participant(2)
+    assert await room_b.has_participant(1)
+    assert [user["id"] for user in await room_b.list_participants(exclude_user_id=2)] == [1]
+
+    await room_a.broadcast({"type": "offer", "payload": {"sdp": "x"}}, sender_id=1, target_id=2)
+    await asyncio.sleep(0)
+    assert bob_ws.sent == [{"type": "offer", "payload": {"sdp": "x"}}]
+    assert alice_ws.sent == []
+
+    await room_b.remove_participant(2)
+    assert not await room_a.has_participant(2)
+
+
+@pytest.mark.asyncio
+async def test_single_node_broadcast_skips_sender():
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-2")
+    first, second = FakeWebSocket(), FakeWebSocket()
+    await room.add_participant(1, first, _user(1))
+    await room.add_participant(2, second, _user(2))
+
+    await room.broadcast({"type": "user_joined", "user": _user(2)}, sender_id=2)
+    await asyncio.sleep(0)
+
+    assert first.sent == [{"type": "user_joined", "user": _user(2)}]
+    assert second.sent == []
+
+
+class FailingMembershipBackplane(InMemoryBackplane):
+    async def add_member(self, call_id, user_id, user):
+        raise ConnectionError("backplane is down")
+
+    async def remove_member(self, call_id, user_id):
+        raise ConnectionError("backplane is down")
+
+
+@pytest.mark.asyncio
+async def test_backplane_membership_failure_does_not_break_local_room():
+    manager = CallRoomManager(FailingMembershipBackplane())
+    room = await manager.get_room("call-3")
+    first, second = FakeWebSocket(), FakeWebSocket()
+    await room.add_participant(1, first, _user(1))
+    await room.add_participant(2, second, _user(2))
+
+    await room.broadcast({"type": "offer", "payload": {}}, sender_id=2, target_id=1)
+    await asyncio.sleep(0)
+    assert first.sent == [{"type": "offer", "payload": {}}]
+
+    await room.remove_participant(1)
+    assert not await room.has_participant(1)
+    await manager.shutdown()
+
+
+class RespStandIn:
+    """Tiny Redis-protocol server supporting the commands used by the backplane."""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.channels = defaultdict(set)
+        self.clients = set()
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_clients(self):
+        """Close every client connection, as a restarting Redis would."""
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+        self.channels.clear()
+
+    async def _handle(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                command = await read_reply(reader)
+                name, args = command[0].decode().upper(), command[1:]
+                if name == "PUBLISH":
+                    for subscriber in list(self.channels[args[0]]):
+                        subscriber.write(encode_command("message", args[0], args[1]))
+                    writer.write(b":1\r\n")
+                elif name == "SUBSCRIBE":
+                    self.channels[args[0]].add(writer)
+                    writer.write(encode_command("subscribe", args[0], 1))
+                elif name == "UNSUBSCRIBE":
+                    self.channels[args[0]].discard(writer)
+                elif name == "HSET":
+                    self.hashes[args[0]][args[1]] = args[2]
+                    writer.write(b":1\r\n")
+                elif name == "HDEL":
+                    self.hashes[args[0]].pop(args[1], None)
+                    writer.write(b":1\r\n")
+                elif name == "HGETALL":
+                    items = [value for pair in self.hashes[args[0]].items() for value in pair]
+                    writer.write(encode_command(*items))
+                else:
+                    writer.write(b"+OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_redis_backplane_relays_between_nodes():
+    stand_in = RespStandIn()
+    port = await stand_in.start()
+    backplane_a = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+    backplane_b = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+
+    try:
+        room_a, room_b, alice_ws, bob_ws = await _join_two_nodes(backplane_a, backplane_b)
+        await asyncio.sleep(0.05)
+
+        assert await room_a.has_participant(2)
+        assert await room_b.has_participant(1)
+
+        await room_b.broadcast({"type": "answer", "payload": {}}, sender_id=2, target_id=1)
+        await asyncio.sleep(0.05)
+        assert alice_ws.sent == [{"type": "answer", "payload": {}}]
+        assert bob_ws.sent == []
+    finally:
+        await backplane_a.close()
+        await backplane_b.close()
+        await stand_in.stop()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_command_replaces_redis_connection():
+    stand_in = RespStandIn()
+    port = await stand_in.start()
+    backplane = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+
+    try:
+        await backplane.start()
+        first = backplane._commands
+        # Отмена между отправкой и чтением ответа оставила бы ответ в потоке
+        task = asyncio.create_task(backplane.add_member("call-9", 1, _user(1)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert first.closed
+
+        await backplane.add_member("call-9", 2, _user(2))
+        assert backplane._commands is not first
+        assert 2 in await backplane.get_members("call-9")
+    finally:
+        await backplane.close()
+        await stand_in.stop()
+
+
+@pytest.mark.asyncio
+async def test_redis_backplane_resubscribes_after_connection_loss(monkeypatch):
+    monkeypatch.setattr(backplane_module, "RECONNECT_MIN_SECONDS", 0.01)
+    stand_in = RespStandIn()
+    port = await stand_in.start()
+    backplane_a = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+    backplane_b = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+
+    try:
+        room_a, room_b, alice_ws, bob_ws = await _join_two_nodes(backplane_a, backplane_b)
+        stand_in.drop_clients()
+        await asyncio.sleep(0.1)
+
+        await room_b.broadcast({"type": "answer", "payload": {}}, sender_id=2, target_id=1)
+        await asyncio.sleep(0.05)
+        assert alice_ws.sent == [{"type": "answer", "payload": {}}]
+    finally:
+        await backplane_a.close()
+        await backplane_b.close()
+        await stand_in.stop()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from app.config.settings import get_settings
+from app.services.backplane import InMemoryBackplane
+from app.services.negotiation import NegotiationCoordinator
+from app.services.signaling import CallRoomManager, SignalingFrame
+
+
+def test_offers_beyond_the_cap_wait_with_their_ice_candidates():
+    coordinator = NegotiationCoordinator(2)
+
+    relayed = [coordinator.submit("offer", f"offer-{peer}", 1, peer) for peer in (2, 3, 4)]
+    assert relayed == [[("offer-2", 1, 2)], [("offer-3", 1, 3)], []]
+    assert coordinator.submit("ice_candidate", "ice-4", 1, 4) == []
+    assert coordinator.submit("ice_candidate", "ice-2", 1, 2) == [("ice-2", 1, 2)]
+    assert (coordinator.active, coordinator.queued) == (2, 1)
+
+    released = coordinator.submit("answer", "answer-3", 3, 1)
+    assert released == [("answer-3", 3, 1), ("offer-4", 1, 4), ("ice-4", 1, 4)]
+    assert (coordinator.active, coordinator.queued) == (2, 0)
+
+
+def test_offer_collision_keeps_the_impolite_offer():
+    coordinator = NegotiationCoordinator(4)
+
+    assert coordinator.submit("offer", "from-1", 1, 2) == [("from-1", 1, 2)]
+    # У пары (1, 2) вежлив участник 2: его встречный offer отбрасывается
+    assert coordinator.submit("offer", "from-2", 2, 1) == []
+
+    coordinator = NegotiationCoordinator(4, rejection=lambda sender_id, peer_id: f"rejected-{sender_id}")
+    assert coordinator.submit("offer", "from-1", 1, 2) == [("from-1", 1, 2)]
+    # С построителем отказа вежливая сторона узнаёт, что её offer отброшен
+    assert coordinator.submit("offer", "from-2", 2, 1) == [("rejected-2", 1, 2)]
+
+    coordinator = NegotiationCoordinator(1, rejection=lambda sender_id, peer_id: f"rejected-{sender_id}")
+    coordinator.submit("offer", "from-1", 1, 3)
+    assert coordinator.submit("offer", "from-2", 2, 1) == []
+    # Отложенный offer вежливой стороны вытесняется встречным offer невежливой
+    assert coordinator.submit("offer", "from-1", 1, 2) == [("rejected-2", 1, 2)]
+    assert coordinator.submit("answer", "answer-3", 3, 1) == [("answer-3", 3, 1), ("from-1", 1, 2)]
+
+    coordinator = NegotiationCoordinator(4)
+    assert coordinator.submit("offer", "from-2", 2, 1) == [("from-2", 2, 1)]
+    assert coordinator.submit("offer", "from-1", 1, 2) == [("from-1", 1, 2)]
+    # Обмен теперь ведёт участник 1: ответ участника 2 закрывает его
+    coordinator.submit("answer", "answer", 2, 1)
+    assert coordinator.active == 0
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data)["type"])
+
+    async def close(self, code=1000, reason=None):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_room_releases_queued_offer_on_timeout_and_leave(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_max_concurrent_negotiations", 1)
+    monkeypatch.setattr(get_settings(), "signaling_negotiation_timeout_seconds", 0.05)
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-negotiation")
+    sockets = {user_id: RecordingWebSocket() for user_id in (1, 2, 3, 4)}
+    for user_id, websocket in sockets.items():
+        await room.add_participant(user_id, websocket, {"id": user_id})
+
+    for target_id in (2, 3, 4):
+        await room.relay("offer", SignalingFrame({"type": "offer"}), sender_id=1, target_id=target_id)
+    await asyncio.sleep(0.01)
+    assert [sockets[user_id].sent for user_id in (2, 3, 4)] == [["offer"], [], []]
+
+    # Участник 2 не ответил: по таймауту слот переходит к следующему offer
+    await asyncio.sleep(0.06)
+    assert sockets[3].sent == ["offer"]
+
+    await room.remove_participant(3)
+    await asyncio.sleep(0.01)
+    assert sockets[4].sent == ["offer"]
+    assert manager.stats()["queued_negotiations"] == 0
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_polite_sender_of_colliding_offer_gets_offer_rejected(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_max_concurrent_negotiations", 4)
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-glare")
+    sockets = {user_id: RecordingWebSocket() for user_id in (1, 2)}
+    for user_id, websocket in sockets.items():
+        await room.add_participant(user_id, websocket, {"id": user_id})
+
+    await room.relay("offer", SignalingFrame({"type": "offer"}), sender_id=1, target_id=2)
+    await room.relay("offer", SignalingFrame({"type": "offer"}), sender_id=2, target_id=1)
+    await asyncio.sleep(0.01)
+
+    assert sockets[1].sent == []
+    assert sockets[2].sent == ["offer", "offer_rejected"]
+    await manager.shutdown()
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.api.signaling import _relay_session
+from app.config.settings import get_settings
+from app.services.backplane import InMemoryBackplane
+from app.services.rate_limit import MessageRateLimiter
+from app.services.signaling import RATE_LIMIT_CLOSE_CODE, CallRoomManager, call_room_manager
+from app.utils.rate_limits import parse_rate_limits
+
+
+def test_limiter_buckets_per_type_and_shares_the_default_bucket():
+    limiter = MessageRateLimiter(parse_rate_limits("offer=0.001/2, *=0.001/1"))
+
+    assert [limiter.allow("offer") for _ in range(3)] == [True, True, False]
+    # Типы без своего лимита делят один bucket "*"
+    assert [limiter.allow("junk-1"), limiter.allow("junk-2"), limiter.allow(None)] == [True, False, False]
+
+    with pytest.raises(ValueError):
+        parse_rate_limits("offer=10")
+
+
+class ScriptedWebSocket:
+    def __init__(self, incoming=()):
+        self.incoming = list(incoming)
+        self.sent = []
+        self.close_code = None
+
+    async def receive_text(self):
+        if not self.incoming or self.close_code is not None:
+            raise WebSocketDisconnect(1000)
+        return self.incoming.pop(0)
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=1000, reason=None):
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_flooding_client_gets_error_frames_then_is_disconnected(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_rate_limits", "ice_candidate=0.001/2,*=0.001/1")
+    monkeypatch.setattr(get_settings(), "signaling_rate_limit_max_violations", 3)
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-flood")
+    candidate = json.dumps({"type": "ice_candidate", "to_user_id": 2, "payload": {"candidate": "c"}})
+    flooder = ScriptedWebSocket([candidate] * 10)
+    peer = ScriptedWebSocket()
+    connection = await room.add_participant(1, flooder, {"id": 1})
+    await room.add_participant(2, peer, {"id": 2})
+    finished = []
+    disconnects = call_room_manager.rate_limit_disconnects
+
+    async def finish():
+        finished.append(True)
+
+    await _relay_session(flooder, "call-flood", room, connection, finish)
+    await asyncio.sleep(0.01)
+
+    assert [message["type"] for message in peer.sent] == ["ice_candidate", "ice_candidate"]
+    assert [message["detail"] for message in flooder.sent] == ["Rate limit exceeded"] * 2
+    assert flooder.close_code == RATE_LIMIT_CLOSE_CODE
+    assert len(flooder.incoming) == 5
+    assert finished == [True]
+    assert call_room_manager.stats()["rate_limit_disconnects"] == disconnects + 1
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pong_flood_is_charged_to_the_ping_bucket(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_rate_limits", "ping=0.001/2,*=100/100")
+    monkeypatch.setattr(get_settings(), "signaling_rate_limit_max_violations", 3)
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-pong-flood")
+    flooder = ScriptedWebSocket([json.dumps({"type": "pong", "id": 1})] * 10)
+    connection = await room.add_participant(1, flooder, {"id": 1})
+
+    async def finish():
+        return None
+
+    await _relay_session(flooder, "call-pong-flood", room, connection, finish)
+    await asyncio.sleep(0.01)
+
+    assert [message["detail"] for message in flooder.sent] == ["Rate limit exceeded"] * 2
+    assert flooder.close_code == RATE_LIMIT_CLOSE_CODE
+    assert len(flooder.incoming) == 5
+    await manager.shutdown()
@@ -0,0 +1,383 @@
+import asyncio
+import json
+
+import msgpack
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import get_settings
+from app.services.backplane import InMemoryBackplane
+from app.services.signaling import (
+    CALL_ENDED_CLOSE_CODE,
+    HEARTBEAT_TIMEOUT_CLOSE_CODE,
+    SLOW_CONSUMER_CLOSE_CODE,
+    CallRoomManager,
+    DeadlineScheduler,
+    SignalingFrame,
+)
+from app.services import signaling_protocol
+from app.services.signaling_protocol import ICE_BATCH_SUBPROTOCOL, MSGPACK_SUBPROTOCOL
+from app.utils import json_codec
+
+
+class RecordingWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.sent_bytes = []
+        self.closed_with = None
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(data))
+
+    async def send_bytes(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent_bytes.append(data)
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_broadcast_evicts_recipient_that_misses_deadline(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_send_timeout_seconds", 0.05)
+    room = await CallRoomManager(InMemoryBackplane()).get_room("call-timeout")
+    slow, fast = RecordingWebSocket(delay=1.0), RecordingWebSocket()
+    await room.add_participant(1, slow, {"id": 1})
+    await room.add_participant(2, fast, {"id": 2})
+
+    await room.broadcast({"type": "call_ended", "reason": "test"})
+    await asyncio.sleep(0.02)
+    assert fast.sent == [{"type": "call_ended", "reason": "test"}]
+
+    await asyncio.sleep(0.1)
+    assert not await room.has_participant(1)
+    assert await room.has_participant(2)
+    assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+
+
+@pytest.mark.asyncio
+async def test_overflowing_queue_drops_ice_candidates_then_disconnects(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_outbound_queue_high_water", 3)
+    monkeypatch.setattr(get_settings(), "signaling_outbound_queue_limit", 4)
+    room = await CallRoomManager(InMemoryBackplane()).get_room("call-overflow")
+    stalled = RecordingWebSocket(delay=60)
+    connection = await room.add_participant(1, stalled, {"id": 1})
+    await asyncio.sleep(0)
+
+    # Первый кадр уже отправляется (завис), остальные копятся в очереди
+    await room.broadcast(SignalingFrame({"type": "user_joined"}))
+    await asyncio.sleep(0)
+    for index in range(3):
+        await room.broadcast(SignalingFrame({"type": "ice_candidate", "index": index}))
+    await room.broadcast(SignalingFrame({"type": "user_left"}))
+
+    assert [frame.type for frame in connection.outbox] == ["user_left"]
+    assert connection.dropped_frames == 3
+
+    for _ in range(4):
+        await room.broadcast(SignalingFrame({"type": "user_joined"}))
+    await asyncio.sleep(0)
+
+    assert not await room.has_participant(1)
+    assert stalled.closed_with == SLOW_CONSUMER_CLOSE_CODE
+
+
+def test_relay_frame_matches_plain_json_encoding():
+    user = {"id": 7, "username": "ivan", "first_name": "Иван", "last_name": None, "photo_url": None}
+    payload = {"candidate": "candidate:1 1 udp 1 10.0.0.1 5000 typ host", "sdpMid": "0", "sdpMLineIndex": 0}
+
+    frame = SignalingFrame.relay("ice_candidate", payload, json_codec.dumps(user))
+
+    assert json.loads(frame.text) == {"type": "ice_candidate", "payload": payload, "from_user": user}
+    assert frame.type == "ice_candidate"
+
+
+@pytest.mark.asyncio
+async def test_deadline_scheduler_fires_in_order_and_replaces_by_key():
+    scheduler = DeadlineScheduler()
+    fired = []
+
+    async def record(name):
+        fired.append(name)
+
+    scheduler.schedule("late", 0.03, lambda: record("late"))
+    scheduler.schedule("early", 0.01, lambda: record("early"))
+    scheduler.schedule("replaced", 0.0, lambda: record("stale"))
+    scheduler.schedule("replaced", 0.02, lambda: record("replaced"))
+    scheduler.schedule("cancelled", 0.0, lambda: record("cancelled"))
+    scheduler.cancel("cancelled")
+
+    await asyncio.sleep(0.06)
+    await scheduler.stop()
+
+    assert fired == ["early", "replaced", "late"]
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_end_room_sends_call_ended_once_and_closes_participants():
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-end")
+    first, second = RecordingWebSocket(), RecordingWebSocket()
+    await room.add_participant(1, first, {"id": 1})
+    await room.add_participant(2, second, {"id": 2})
+    assert ("call-end", "max_duration") in manager.scheduler
+
+    await manager.end_room("call-end", reason="Call has expired")
+    await asyncio.sleep(0.01)
+
+    for websocket in (first, second):
+        assert websocket.sent == [{"type": "call_ended", "reason": "Call has expired"}]
+        assert websocket.closed_with == CALL_ENDED_CLOSE_CODE
+
+    await room.remove_participant(1)
+    await room.remove_participant(2)
+
+    assert ("call-end", "empty") in manager.scheduler
+    await manager.cleanup_room("call-end")
+    assert len(manager.scheduler) == 0
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_max_duration_is_rearmed_when_an_ended_room_is_joined_again():
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-rejoin")
+    await room.add_participant(1, RecordingWebSocket(), {"id": 1})
+
+    # Дедлайн сработал: планировщик снимает запись до вызова end_room
+    manager.scheduler.cancel(("call-rejoin", "max_duration"))
+    await manager.end_room("call-rejoin", reason="Maximum call duration (1 hours) exceeded")
+    await room.remove_participant(1)
+
+    # Пустая комната ещё не выселена, и новый вход снова получает ограничение длительности
+    assert await manager.get_room("call-rejoin") is room
+    assert ("call-rejoin", "max_duration") in manager.scheduler
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_room_creates_one_room_per_call():
+    backplane = InMemoryBackplane()
+    subscribe = backplane.subscribe
+    subscriptions = []
+
+    async def slow_subscribe(channel, handler):
+        subscriptions.append(channel)
+        await asyncio.sleep(0.01)
+        await subscribe(channel, handler)
+
+    backplane.subscribe = slow_subscribe
+    manager = CallRoomManager(backplane)
+
+    rooms = await asyncio.gather(*(manager.get_room(f"call-{index % 3}") for index in range(12)))
+
+    assert len({id(room) for room in rooms}) == 3
+    assert sorted(subscriptions) == ["signaling:room:call-0", "signaling:room:call-1", "signaling:room:call-2"]
+    assert await manager.get_existing_room("call-1") is rooms[1]
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_ice_candidates_are_batched_for_coalescing_clients(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_ice_coalesce_window_ms", 10)
+    room = await CallRoomManager(InMemoryBackplane()).get_room("call-ice")
+    batching, plain = RecordingWebSocket(), RecordingWebSocket()
+    await room.add_participant(1, RecordingWebSocket(), {"id": 1})
+    await room.add_participant(2, batching, {"id": 2}, subprotocol=ICE_BATCH_SUBPROTOCOL)
+    await room.add_participant(3, plain, {"id": 3})
+
+    from_user_json = json_codec.dumps({"id": 1})
+    for index in range(3):
+        for target in (2, 3):
+            frame = SignalingFrame.relay("ice_candidate", {"candidate": index}, from_user_json)
+            await room.broadcast(frame, sender_id=1, target_id=target)
+    # Пауза сборщика мусора может задержать писателей дольше окна: ждём, пока очереди уйдут
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if batching.sent and len(plain.sent) == 3:
+            break
+
+    assert batching.sent == [
+        {
+            "type": "ice_candidates",
+            "payload": [{"candidate": 0}, {"candidate": 1}, {"candidate": 2}],
+            "from_user": {"id": 1},
+        }
+    ]
+    assert [message["type"] for message in plain.sent] == ["ice_candidate"] * 3
+
+
+@pytest.mark.asyncio
+async def test_msgpack_clients_receive_compact_binary_frames():
+    room = await CallRoomManager(InMemoryBackplane()).get_room("call-msgpack")
+    binary, text = RecordingWebSocket(), RecordingWebSocket()
+    await room.add_participant(2, binary, {"id": 2}, subprotocol=MSGPACK_SUBPROTOCOL)
+    await room.add_participant(3, text, {"id": 3})
+
+    frame = SignalingFrame.relay("offer", {"sdp": "v=0"}, json_codec.dumps({"id": 1, "username": "a"}), sender_id=1)
+    await room.broadcast(frame, sender_id=1)
+    await room.broadcast({"type": "user_left", "user": {"id": 1}}, sender_id=1)
+    await asyncio.sleep(0.01)
+
+    assert [msgpack.unpackb(data) for data in binary.sent_bytes] == [
+        {"t": 1, "p": {"sdp": "v=0"}, "f": 1},
+        {"t": 6, "user": {"id": 1}},
+    ]
+    assert text.sent[0]["from_user"] == {"id": 1, "username": "a"}
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_measures_rtt_and_evicts_silent_peers():
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-heartbeat")
+    responsive, legacy, observer = RecordingWebSocket(), RecordingWebSocket(), RecordingWebSocket()
+    connection = await room.add_participant(1, responsive, {"id": 1})
+    await room.add_participant(2, legacy, {"id": 2})
+    await room.add_participant(3, observer, {"id": 3})
+    assert ("call-heartbeat", "heartbeat") in manager.scheduler
+
+    assert await room.heartbeat(timeout_seconds=30) == 0
+    await asyncio.sleep(0.01)
+    ping = responsive.sent[-1]
+    assert ping["type"] == "ping" and legacy.sent[-1] == ping
+
+    connection.record_pong(ping["id"] + 1)
+    assert connection.rtt_ms is None
+    connection.record_pong(ping["id"])
+    assert connection.rtt_ms is not None
+    snapshot = {user["id"]: user for user in await room.list_participants()}
+    assert "rtt_ms" in snapshot[1] and "rtt_ms" not in snapshot[2]
+    assert manager.stats()["measured_rtt_connections"] == 1
+
+    # Клиент, ни разу не ответивший на ping, по тишине не выселяется
+    await asyncio.sleep(0.02)
+    assert await room.heartbeat(timeout_seconds=0.01) == 1
+    await asyncio.sleep(0.01)
+
+    assert not await room.has_participant(1)
+    assert await room.has_participant(2)
+    assert responsive.closed_with == HEARTBEAT_TIMEOUT_CLOSE_CODE
+    assert connection.left_announced
+    assert {"type": "user_left", "user": {"id": 1}} in observer.sent
+    await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_suspended_connection_resumes_and_replays_queued_frames(monkeypatch):
+    monkeypatch.setattr(get_settings(), "signaling_resume_grace_seconds", 0.05)
+    manager = CallRoomManager(InMemoryBackplane())
+    room = await manager.get_room("call-resume")
+    dropped, peer = RecordingWebSocket(), RecordingWebSocket()
+    connection = await room.add_participant(1, dropped, {"id": 1})
+    await room.add_participant(2, peer, {"id": 2})
+    finished = []
+
+    async def finish():
+        finished.append(connection.user_id)
+
+    token = manager.issue_resume_token(connection)
+    assert manager.suspend("call-resume", room, connection, finish)
+    await room.broadcast({"type": "offer", "payload": {}}, sender_id=2, target_id=1)
+    await asyncio.sleep(0.01)
+    assert dropped.sent == [] and await room.has_participant(1)
+    assert peer.sent == []
+
+    assert await manager.resume("other-call", token) is None
+    ticket = await manager.resume("call-resume", token)
+    fresh = RecordingWebSocket()
+    assert ticket.room.reattach(ticket.connection, fresh)
+    await asyncio.sleep(0.01)
+    assert fresh.sent == [{"type": "offer", "payload": {}}]
+    assert await manager.resume("call-resume", token) is None
+
+    # Без возобновления сессия завершается по истечении окна
+    manager.issue_resume_token(connection)
+    assert manager.suspend("call-resume", room, connection, finish)
+    await asyncio.sleep(0.1)
+    assert finished == [1]
+    assert manager.stats()["suspended_connections"] == 0
+
+    # Остановка сервера завершает приостановленные сессии, а не выбрасывает их
+    monkeypatch.setattr(get_settings(), "signaling_resume_grace_seconds", 60)
+    other = await room.add_participant(3, RecordingWebSocket(), {"id": 3})
+
+    async def finish_other():
+        finished.append(other.user_id)
+
+    manager.issue_resume_token(other)
+    assert manager.suspend("call-resume", room, other, finish_other)
+    await manager.shutdown()
+    assert finished == [1, 3]
+    assert manager.stats()["suspended_connections"] == 0
+
+
+class SlowBackplane(InMemoryBackplane):
+    async def remove_member(self, call_id, user_id):
+        await asyncio.sleep(0.02)
+        await super().remove_member(call_id, user_id)
+
+
+@pytest.mark.asyncio
+async def test_actor_room_applies_operations_in_submission_order(monkeypatch):
+    monkeypatch.setattr(get_settings(), "max_participants_per_call", 2)
+    manager = CallRoomManager(SlowBackplane(), engine="actor")
+    room = await manager.get_room("call-actor")
+    leaving, staying = RecordingWebSocket(), RecordingWebSocket()
+    await room.add_participant(1, leaving, {"id": 1})
+    await room.add_participant(2, staying, {"id": 2})
+    with pytest.raises(HTTPException):
+        await room.add_participant(3, RecordingWebSocket(), {"id": 3})
+
+    removal = asyncio.create_task(room.remove_participant(1))
+    await asyncio.sleep(0)
+    # Сообщение отправлено после выхода участника 1: он не должен его получить
+    await room.broadcast({"type": "user_left", "user": {"id": 1}}, sender_id=1)
+    await removal
+    await asyncio.sleep(0.01)
+
+    assert leaving.sent == []
+    assert staying.sent == [{"type": "user_left", "user": {"id": 1}}]
+    assert manager.stats()["pending_room_commands"] == 0
+    await manager.cleanup_room("call-actor")
+    await manager.shutdown()
+
+
+def test_msgpack_client_frames_decode_to_json_shape():
+    packed = msgpack.packb({"t": 3, "p": {"candidate": "c"}, "to": 5})
+
+    assert signaling_protocol.decode(packed) == {
+        "type": "ice_candidate",
+        "payload": {"candidate": "c"},
+        "to_user_id": 5,
+    }
+    assert signaling_protocol.negotiate_subprotocol(["token.x", MSGPACK_SUBPROTOCOL]) == MSGPACK_SUBPROTOCOL
+    with pytest.raises(ValueError):
+        signaling_protocol.decode(b"\xc1")
+
+
+def test_client_messages_are_validated_against_their_schema():
+    message = signaling_protocol.parse_json_message(
+        '{"type": "ice_candidate", "to_user_id": 2, "payload": {"candidate": "c", "sdpMLineIndex": 0}}'
+    )
+    assert message == signaling_protocol.RelayMessage("ice_candidate", 2, {"candidate": "c", "sdpMLineIndex": 0})
+    assert signaling_protocol.parse_json_message('{"type": "pong", "id": 7}').id == 7
+
+    invalid = {
+        "{": None,
+        '{"type": "hello"}': None,
+        '{"type": "offer", "to_user_id": "2", "payload": {"type": "offer", "sdp": "v=0"}}': "offer",
+        '{"type": "answer", "to_user_id": 2, "payload": {"sdp": "v=0"}}': "answer",
+        '{"type": "ice_candidate", "to_user_id": 2, "payload": {"candidate": 1}}': "ice_candidate",
+    }
+    for data, message_type in invalid.items():
+        with pytest.raises(signaling_protocol.InvalidMessage) as excinfo:
+            signaling_protocol.parse_json_message(data)
+        assert excinfo.value.message_type == message_type
+
+
+def test_utf8_size_check_matches_encoded_length():
+    for text in ("a" * 100, "я" * 50, "я" * 51, "🙂" * 25, "🙂" * 26, "a" * 101):
+        assert signaling_protocol.utf8_length_exceeds(text, 100) == (len(text.encode()) > 100)
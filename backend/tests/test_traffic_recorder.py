@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.services import traffic_recorder as traffic_recorder_module
+from app.services.signaling_protocol import HeartbeatMessage, RelayMessage
+from app.services.traffic_recorder import TrafficRecorder, read_records
+
+
+@pytest.mark.asyncio
+async def test_recorder_writes_anonymized_segments(tmp_path):
+    path = tmp_path / "traffic.rec"
+
+    recorder = TrafficRecorder(str(path))
+    recorder.record_join("secret-call", 101)
+    recorder.record_join("secret-call", 202)
+    recorder.record_frame("secret-call", 101, 180, RelayMessage("ice_candidate", 202, {"candidate": "c"}))
+    recorder.record_frame("secret-call", 202, 20, HeartbeatMessage("ping"))
+    recorder.record_frame("secret-call", 202, 3, None)
+    recorder.record_leave("secret-call", 101)
+    await recorder.close()
+
+    # Второй процесс дописывает новый сегмент: комнаты нумеруются заново
+    recorder = TrafficRecorder(str(path))
+    recorder.record_join("other-call", 303)
+    await recorder.close()
+
+    records = list(read_records(str(path)))
+    assert [(record.segment, record.room, record.sender, record.target, record.kind_name, record.size) for record in records] == [
+        (1, 1, 1, 0, "join", 0),
+        (1, 1, 2, 0, "join", 0),
+        (1, 1, 1, 2, "ice_candidate", 180),
+        (1, 1, 2, 0, "ping", 20),
+        (1, 1, 2, 0, "invalid", 3),
+        (1, 1, 1, 0, "leave", 0),
+        (2, 1, 1, 0, "join", 0),
+    ]
+    assert all(later.offset >= earlier.offset for earlier, later in zip(records, records[1:6]))
+    assert b"secret-call" not in path.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_recorder_flushes_in_background_and_forgets_empty_rooms(tmp_path, monkeypatch):
+    monkeypatch.setattr(traffic_recorder_module, "_FLUSH_INTERVAL_SECONDS", 0.01)
+    path = tmp_path / "traffic.rec"
+    recorder = TrafficRecorder(str(path))
+    recorder.start()
+
+    recorder.record_join("call", 101)
+    recorder.record_frame("call", 101, 40, RelayMessage("offer", 202, {"sdp": "v=0"}))
+    recorder.record_leave("call", 101)
+    assert recorder._rooms == {}
+    recorder.record_join("call", 101)
+
+    # Запись уходит в файл без close(): её пишет фоновая задача
+    await asyncio.sleep(0.05)
+    records = list(read_records(str(path)))
+    assert [(record.room, record.sender, record.target, record.kind_name) for record in records] == [
+        (1, 1, 0, "join"),
+        (1, 1, 2, "offer"),
+        (1, 1, 0, "leave"),
+        (2, 1, 0, "join"),
+    ]
+    await recorder.close()
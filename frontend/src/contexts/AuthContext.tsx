@@ -7,10 +7,10 @@ import React, {
   useMemo,
   useState,
 } from "react";
-import { authorizeTelegram } from "../services/auth";
+import { authorizeTelegram, refreshSession, revokeSession } from "../services/auth";
 import { getTelegramWebApp } from "../services/telegram";
 import { setUnauthorizedHandler } from "../services/apiClient";
-import type { AuthUser } from "../types/auth";
+import type { AuthResponse, AuthUser } from "../types/auth";
 
 export const AUTH_STORAGE_KEY = "telegram-auth-v2";
 
@@ -22,6 +22,7 @@ export interface AuthContextValue {
   hasTriedAuth: boolean;
   loginWithTelegram: () => Promise<void>;
   clearAuth: () => void;
+  logout: () => Promise<void>;
 }
 
 const AuthContext = createContext<AuthContextValue | undefined>(undefined);
@@ -52,6 +53,21 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     }
   }, []);
 
+  const storeAuth = useCallback((response: AuthResponse) => {
+    setUser(response.user);
+    setToken(response.access_token);
+
+    // Store in localStorage for Telegram Mini Apps where cookies may not work
+    localStorage.setItem(
+      AUTH_STORAGE_KEY,
+      JSON.stringify({
+        token: response.access_token,
+        refreshToken: response.refresh_token,
+        user: response.user,
+      }),
+    );
+  }, []);
+
   const clearAuth = useCallback(() => {
     setUser(null);
     setToken(null);
@@ -60,6 +76,21 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     localStorage.removeItem(AUTH_STORAGE_KEY);
   }, []);
 
+  const logout = useCallback(async () => {
+    const stored = localStorage.getItem(AUTH_STORAGE_KEY);
+    const refreshToken = stored
+      ? (JSON.parse(stored) as { refreshToken?: string }).refreshToken
+      : undefined;
+    clearAuth();
+
+    try {
+      await revokeSession(refreshToken);
+    } catch (error) {
+      // eslint-disable-next-line no-console
+      console.warn("[Auth] failed to revoke session", error);
+    }
+  }, [clearAuth]);
+
   const loginWithTelegram = useCallback(async () => {
     if (isAuthorizing) {
       return;
@@ -74,17 +105,7 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
 
     try {
       const response = await authorizeTelegram();
-      setUser(response.user);
-      setToken(response.access_token);
-
-      // Store in localStorage for Telegram Mini Apps where cookies may not work
-      localStorage.setItem(
-        AUTH_STORAGE_KEY,
-        JSON.stringify({
-          token: response.access_token,
-          user: response.user,
-        }),
-      );
+      storeAuth(response);
 
       // eslint-disable-next-line no-console
       console.log("[Auth] success - token stored", response.user);
@@ -96,17 +117,35 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
     } finally {
       setIsAuthorizing(false);
     }
-  }, [isAuthorizing]);
+  }, [isAuthorizing, storeAuth]);
 
   // Register handler for automatic reauth on 401 errors
   useEffect(() => {
     setUnauthorizedHandler(async () => {
+      const stored = localStorage.getItem(AUTH_STORAGE_KEY);
+      const refreshToken = stored
+        ? (JSON.parse(stored) as { refreshToken?: string }).refreshToken
+        : undefined;
+
+      // The refresh token is cheaper than initData and not limited to 3 requests per minute
+      if (refreshToken) {
+        try {
+          storeAuth(await refreshSession(refreshToken));
+          // eslint-disable-next-line no-console
+          console.log("[Auth] Token expired, refreshed");
+          return;
+        } catch (error) {
+          // eslint-disable-next-line no-console
+          console.warn("[Auth] failed to refresh session", error);
+        }
+      }
+
       // eslint-disable-next-line no-console
       console.log("[Auth] Token expired, clearing and re-authorizing");
       clearAuth();
       await loginWithTelegram();
     });
-  }, [clearAuth, loginWithTelegram]);
+  }, [clearAuth, loginWithTelegram, storeAuth]);
 
   const value = useMemo<AuthContextValue>(
     () => ({
@@ -117,8 +156,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }) => {
       hasTriedAuth,
       loginWithTelegram,
       clearAuth,
+      logout,
     }),
-    [authError, clearAuth, hasTriedAuth, isAuthorizing, loginWithTelegram, token, user],
+    [authError, clearAuth, hasTriedAuth, isAuthorizing, loginWithTelegram, logout, token, user],
   );
 
   return <AuthContext.Provider value={value}>{children}</AuthContext.Provider>;
@@ -3,6 +3,7 @@ import { useLocation, useNavigate, useParams } from "react-router-dom";
 import { useAuth } from "../contexts/AuthContext";
 import { useWebSocketToken } from "../hooks/useWebSocketToken";
 import { fetchIceServers, getWebSocketBaseUrl } from "../services/webrtc";
+import { MSGPACK_SUBPROTOCOL, decodeSignalingMessage, encodeSignalingMessage } from "../services/signalingCodec";
 import { Mic, MicOff, Video, VideoOff, Link2, Phone } from "lucide-react";
 import defaultAvatar from "../assets/default-avatar.svg";
 
@@ -12,23 +13,30 @@ interface SignalingUser {
   first_name: string | null;
   last_name: string | null;
   photo_url: string | null;
+  // Сглаженный RTT участника до сервера сигналинга (есть, если сервер его уже измерил)
+  rtt_ms?: number;
 }
 
 type SignalingMessage =
-  | { type: "call_metadata"; room_start_time: string }
+  | { type: "call_metadata"; room_start_time: string; resume_token?: string | null; resumed?: boolean }
   | { type: "participants_snapshot"; participants: SignalingUser[] }
   | { type: "user_joined"; user: SignalingUser }
   | { type: "user_left"; user: SignalingUser }
   | { type: "call_ended"; reason: string }
   | { type: "error"; detail: string }
+  | { type: "ping"; id: number }
   | { type: "offer"; payload: RTCSessionDescriptionInit; from_user: SignalingUser }
   | { type: "answer"; payload: RTCSessionDescriptionInit; from_user: SignalingUser }
-  | { type: "ice_candidate"; payload: RTCIceCandidateInit; from_user: SignalingUser };
+  | { type: "ice_candidate"; payload: RTCIceCandidateInit; from_user: SignalingUser }
+  | { type: "ice_candidates"; payload: RTCIceCandidateInit[]; from_user: SignalingUser }
+  // Наш offer проиграл встречному offer собеседника (мы вежливая сторона пары)
+  | { type: "offer_rejected"; from_user: Pick<SignalingUser, "id"> };
 
 type OutgoingSignalingMessage =
   | { type: "offer"; payload: RTCSessionDescriptionInit; to_user_id: number }
   | { type: "answer"; payload: RTCSessionDescriptionInit; to_user_id: number }
-  | { type: "ice_candidate"; payload: RTCIceCandidateInit; to_user_id: number };
+  | { type: "ice_candidate"; payload: RTCIceCandidateInit; to_user_id: number }
+  | { type: "pong"; id: number };
 
 interface LocationState {
   join_url?: string;
@@ -48,6 +56,11 @@ interface Participant {
   stream?: MediaStream;
 }
 
+// Подпротокол signaling-сервера: ICE-кандидаты приходят пачками (ice_candidates)
+const ICE_BATCH_SUBPROTOCOL = "ice-batch.v1";
+// Код закрытия сокета сервером за превышение лимита сигнальных сообщений (RATE_LIMIT_CLOSE_CODE)
+const RATE_LIMIT_CLOSE_CODE = 4010;
+
 const PARTICIPANT_COLORS = [
   "linear-gradient(135deg, #1d4ed8, #60a5fa)",
   "linear-gradient(135deg, #0ea5e9, #38bdf8)",
@@ -96,11 +109,17 @@ const CallPage: React.FC = () => {
   const toggleSoundContextRef = useRef<AudioContext | null>(null);
   const micChangeByUserRef = useRef(false);
   const reconnectionTimersRef = useRef<Map<string, number>>(new Map());
+  // Участники, которым нужно повторить offer после ответа на их встречный offer
+  const pendingOffersRef = useRef<Set<string>>(new Set());
+  // Профили участников из participants_snapshot/user_joined: в кадрах msgpack.v1 отправитель приходит только id
+  const signalingUsersRef = useRef<Map<number, SignalingUser>>(new Map());
   const handleSignalingMessageRef = useRef<(message: SignalingMessage) => Promise<void>>();
   const handleConnectionErrorRef = useRef<
     ((message: string, navigateHome?: boolean, preserveExistingMessage?: boolean) => void) | undefined
   >();
   const clearConnectionsRef = useRef<(() => void) | undefined>();
+  // Одноразовый токен из call_metadata: после обрыва сокета возвращает в ту же сессию сигналинга
+  const resumeTokenRef = useRef<string | null>(null);
   const localStreamRef = useRef<MediaStream | null>(null);
   const remoteAudioElementsRef = useRef<Map<string, HTMLAudioElement>>(new Map());
   const audioContextsRef = useRef<Map<string, { context: AudioContext; analyser: AnalyserNode; dataArray: Uint8Array }>>(new Map());
@@ -836,6 +855,8 @@ const CallPage: React.FC = () => {
         reconnectionTimersRef.current.delete(participantId);
       }
 
+      pendingOffersRef.current.delete(participantId);
+
       const peer = peersRef.current.get(participantId);
       const remoteStream = remoteStreamsRef.current.get(participantId);
 
@@ -877,7 +898,7 @@ const CallPage: React.FC = () => {
         type: message.type,
         to_user_id: "to_user_id" in message ? message.to_user_id : undefined,
       });
-      socket.send(JSON.stringify(message));
+      socket.send(socket.protocol === MSGPACK_SUBPROTOCOL ? encodeSignalingMessage(message) : JSON.stringify(message));
       return;
     }
 
@@ -1069,6 +1090,18 @@ const CallPage: React.FC = () => {
 
       if (!Number.isNaN(targetUserId)) {
         sendSignalingMessage({ type: "answer", payload: answer, to_user_id: targetUserId });
+
+        // Сервер отбросил наш offer в пользу этого: повторяем его, когда обмен собеседника завершён
+        if (pendingOffersRef.current.delete(participantId)) {
+          try {
+            const offer = await peer.createOffer();
+            await peer.setLocalDescription(offer);
+            sendSignalingMessage({ type: "offer", payload: offer, to_user_id: targetUserId });
+          } catch (error) {
+            // eslint-disable-next-line no-console
+            console.error("[RTC] failed to resend rejected offer", { participantId, error });
+          }
+        }
       }
 
       // eslint-disable-next-line no-console
@@ -1216,12 +1249,52 @@ const CallPage: React.FC = () => {
     [ensureParticipant, shouldInitiateOffer, startOfferFlow],
   );
 
+  const handleOfferRejected = useCallback(async (peerUserId: number) => {
+    const participantId = String(peerUserId);
+    const peer = peersRef.current.get(participantId);
+
+    if (!peer) {
+      return;
+    }
+
+    // eslint-disable-next-line no-console
+    console.log("[RTC] offer rejected in a collision", { participantId, signalingState: peer.signalingState });
+
+    try {
+      if (peer.signalingState === "have-local-offer") {
+        // Откатываемся и ждём offer собеседника; свой offer повторит handleOffer после ответа
+        pendingOffersRef.current.add(participantId);
+        await peer.setLocalDescription({ type: "rollback" });
+        return;
+      }
+
+      // Offer собеседника уже принят и отвечен (браузер откатил наш неявно): повторяем свой сразу
+      const offer = await peer.createOffer();
+      await peer.setLocalDescription(offer);
+      sendSignalingMessage({ type: "offer", payload: offer, to_user_id: peerUserId });
+    } catch (error) {
+      // eslint-disable-next-line no-console
+      console.error("[RTC] failed to recover from rejected offer", { participantId, error });
+    }
+  }, [sendSignalingMessage]);
+
   const handleSignalingMessage = useCallback(
     async (message: SignalingMessage) => {
+      // Heartbeat сервера: отвечаем сразу, без логирования
+      if (message.type === "ping") {
+        sendSignalingMessage({ type: "pong", id: message.id });
+        return;
+      }
+
       // eslint-disable-next-line no-console
       console.log("[Signaling] received", message.type, message);
 
       if (message.type === "call_metadata") {
+        resumeTokenRef.current = message.resume_token ?? null;
+        if (message.resumed) {
+          // Сессия возобновлена: собеседники не видели выхода, peer-соединения остаются прежними
+          return;
+        }
         const roomStartTime = new Date(message.room_start_time).getTime();
         // eslint-disable-next-line no-console
         console.log("[CallTimer] Received call_metadata", {
@@ -1233,16 +1306,19 @@ const CallPage: React.FC = () => {
       }
 
       if (message.type === "participants_snapshot") {
+        message.participants.forEach((participant) => signalingUsersRef.current.set(participant.id, participant));
         await Promise.all(message.participants.map((participant) => connectToParticipantIfNeeded(participant)));
         return;
       }
 
       if (message.type === "user_joined") {
+        signalingUsersRef.current.set(message.user.id, message.user);
         await connectToParticipantIfNeeded(message.user);
         return;
       }
 
       if (message.type === "user_left") {
+        signalingUsersRef.current.delete(message.user.id);
         cleanupPeer(String(message.user.id));
         return;
       }
@@ -1268,6 +1344,11 @@ const CallPage: React.FC = () => {
         return;
       }
 
+      if (message.type === "offer_rejected") {
+        await handleOfferRejected(message.from_user.id);
+        return;
+      }
+
       const sender = "from_user" in message ? message.from_user : null;
 
       if (!sender) {
@@ -1280,9 +1361,22 @@ const CallPage: React.FC = () => {
         await handleAnswer(sender, message.payload);
       } else if (message.type === "ice_candidate") {
         await handleIceCandidate(sender, message.payload);
+      } else if (message.type === "ice_candidates") {
+        for (const candidate of message.payload) {
+          await handleIceCandidate(sender, candidate);
+        }
       }
     },
-    [cleanupPeer, connectToParticipantIfNeeded, handleAnswer, handleConnectionError, handleIceCandidate, handleOffer],
+    [
+      cleanupPeer,
+      connectToParticipantIfNeeded,
+      handleAnswer,
+      handleConnectionError,
+      handleIceCandidate,
+      handleOffer,
+      handleOfferRejected,
+      sendSignalingMessage,
+    ],
   );
 
   useEffect(() => {
@@ -1391,6 +1485,10 @@ const CallPage: React.FC = () => {
     }
 
     let socket: WebSocket | null = null;
+    let disposed = false;
+
+    const resolveSignalingUser = (id: number): SignalingUser =>
+      signalingUsersRef.current.get(id) ?? { id, username: null, first_name: null, last_name: null, photo_url: null };
 
     const connectWebSocket = async () => {
       try {
@@ -1409,7 +1507,13 @@ const CallPage: React.FC = () => {
         }
 
         const url = `${baseUrl}/ws/calls/${callId}`;
-        const protocols = token ? [`token.${token}`] : undefined;
+        // Токен возобновления одноразовый: новый придёт в call_metadata
+        const resumeToken = resumeTokenRef.current;
+        resumeTokenRef.current = null;
+        // Сервер выбирает первый поддерживаемый подпротокол: бинарный msgpack.v1, иначе JSON с пачками ICE-кандидатов
+        const protocols = token
+          ? [MSGPACK_SUBPROTOCOL, ICE_BATCH_SUBPROTOCOL, ...(resumeToken ? [`resume.${resumeToken}`] : []), `token.${token}`]
+          : undefined;
 
         // eslint-disable-next-line no-console
         console.log("[Call] connecting to signaling", { url, hasToken: Boolean(token) });
@@ -1417,6 +1521,8 @@ const CallPage: React.FC = () => {
         socket = protocols ? new WebSocket(url, protocols) : new WebSocket(url);
 
     websocketRef.current = socket;
+    // Кадры msgpack.v1 приходят бинарными
+    socket.binaryType = "arraybuffer";
 
     socket.onopen = () => {
       // eslint-disable-next-line no-console
@@ -1426,7 +1532,11 @@ const CallPage: React.FC = () => {
 
     socket.onmessage = (event) => {
       try {
-        const message = JSON.parse(event.data) as SignalingMessage;
+        const message = (
+          event.data instanceof ArrayBuffer
+            ? decodeSignalingMessage(event.data, resolveSignalingUser)
+            : JSON.parse(event.data)
+        ) as SignalingMessage;
         // eslint-disable-next-line no-console
         console.log("[WS] received signaling message", message);
         void handleSignalingMessageRef.current?.(message);
@@ -1437,6 +1547,10 @@ const CallPage: React.FC = () => {
     };
 
     socket.onerror = () => {
+      // Обрыв с токеном возобновления обрабатывается в onclose переподключением
+      if (resumeTokenRef.current) {
+        return;
+      }
       socket.close();
       handleConnectionErrorRef.current?.("Ошибка соединения с сервером", true);
     };
@@ -1452,6 +1566,19 @@ const CallPage: React.FC = () => {
       websocketRef.current = null;
       setCallConnected(false);
 
+      if (!event.wasClean && !disposed && resumeTokenRef.current) {
+        // Смена сети или сворачивание webview: возвращаемся в ту же сессию,
+        // собеседники не увидят user_left/user_joined и не будут пересогласовывать соединения
+        void connectWebSocket();
+        return;
+      }
+
+      if (event.code === RATE_LIMIT_CLOSE_CODE) {
+        // Звонок продолжается, отключили только этого клиента: не показываем «Звонок завершён»
+        handleConnectionErrorRef.current?.("Слишком много сообщений, соединение разорвано", true);
+        return;
+      }
+
       // Проверяем, является ли причина закрытия ошибкой "звонок не найден"
       const reason = event.reason?.toLowerCase() || "";
       const isCallNotFound =
@@ -1487,6 +1614,8 @@ const CallPage: React.FC = () => {
 
     return () => {
       // ТЗ 2: При переходе в другой звонок по новой ссылке - выходим из текущего
+      disposed = true;
+      resumeTokenRef.current = null;
       if (socket) {
         socket.close();
       }
@@ -1523,6 +1652,7 @@ const CallPage: React.FC = () => {
   };
 
   const leaveCall = () => {
+    resumeTokenRef.current = null;
     websocketRef.current?.close();
     clearConnections();
     stopLocalMedia();
@@ -2,6 +2,8 @@ import { AUTH_STORAGE_KEY } from "../contexts/AuthContext";
 
 export interface ApiRequestOptions {
   headers?: Record<string, string>;
+  // Do not call the 401 handler (for the auth endpoints the handler itself uses)
+  skipUnauthorizedHandler?: boolean;
 }
 
 // Handler for 401 errors - will be set by AuthContext
@@ -110,7 +112,7 @@ export const apiClient = {
 
       if (!response.ok) {
         // Handle 401 Unauthorized - token expired
-        if (response.status === 401 && unauthorizedHandler) {
+        if (response.status === 401 && unauthorizedHandler && !options.skipUnauthorizedHandler) {
           // eslint-disable-next-line no-console
           console.log("[apiClient.get] Token expired, attempting reauth");
           await unauthorizedHandler();
@@ -159,7 +161,7 @@ export const apiClient = {
 
       if (!response.ok) {
         // Handle 401 Unauthorized - token expired
-        if (response.status === 401 && unauthorizedHandler) {
+        if (response.status === 401 && unauthorizedHandler && !options.skipUnauthorizedHandler) {
           // eslint-disable-next-line no-console
           console.log("[apiClient.post] Token expired, attempting reauth");
           await unauthorizedHandler();
@@ -169,6 +171,9 @@ export const apiClient = {
         return logResponseError("post", path, response);
       }
 
+      if (response.status === 204) {
+        return undefined as T;
+      }
       return (await response.json()) as T;
     } catch (error) {
       // Network error, CORS error, or other fetch failures
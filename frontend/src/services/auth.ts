@@ -33,3 +33,15 @@ export const authorizeTelegram = async (): Promise<AuthResponse> => {
     initData,
   });
 };
+
+export const refreshSession = async (refreshToken: string): Promise<AuthResponse> =>
+  apiClient.post<AuthResponse>(
+    "/auth/refresh",
+    { refresh_token: refreshToken },
+    { skipUnauthorizedHandler: true },
+  );
+
+// Отзывает цепочку refresh-токенов на сервере и удаляет auth-cookie
+export const revokeSession = async (refreshToken?: string): Promise<void> => {
+  await apiClient.post<void>("/auth/logout", { refresh_token: refreshToken }, { skipUnauthorizedHandler: true });
+};
@@ -0,0 +1,67 @@
+import { describe, it, expect } from "vitest";
+import {
+  decodeSignalingMessage,
+  encodeSignalingMessage,
+  packMessagePack,
+  unpackMessagePack,
+} from "./signalingCodec";
+
+const fromHex = (hex: string) => Uint8Array.from(hex.match(/../g) ?? [], (byte) => Number.parseInt(byte, 16));
+
+describe("MessagePack", () => {
+  it("should round-trip values of every size class", () => {
+    const value = {
+      small: 5,
+      negative: -7,
+      wide: 70000,
+      large: 2 ** 40,
+      wideNegative: -100000,
+      float: 12.5,
+      flags: [true, false, null],
+      short: "кандидат",
+      long: "x".repeat(300),
+      list: Array.from({ length: 20 }, (_, index) => index),
+    };
+
+    expect(unpackMessagePack(packMessagePack(value))).toEqual(value);
+  });
+
+  it("should match the encoding of the Python msgpack package", () => {
+    // msgpack.packb({"t": 3, "p": {"candidate": "c"}, "to": 5})
+    expect(packMessagePack({ t: 3, p: { candidate: "c" }, to: 5 })).toEqual(
+      fromHex("83a17403a17081a963616e646964617465a163a2746f05"),
+    );
+  });
+
+  it("should reject truncated frames", () => {
+    expect(() => unpackMessagePack(fromHex("83a174"))).toThrow(RangeError);
+  });
+});
+
+describe("signaling messages", () => {
+  it("should encode client messages with type codes and short keys", () => {
+    const encoded = encodeSignalingMessage({ type: "ice_candidate", payload: { candidate: "c" }, to_user_id: 5 });
+
+    expect(unpackMessagePack(encoded)).toEqual({ t: 3, p: { candidate: "c" }, to: 5 });
+  });
+
+  it("should resolve the sender id to a known participant", () => {
+    const alice = { id: 7, username: "alice" };
+    const frame = packMessagePack({ t: 4, p: [{ candidate: "c" }], f: 7 });
+
+    expect(decodeSignalingMessage(frame, (id) => (id === alice.id ? alice : { id, username: null }))).toEqual({
+      type: "ice_candidates",
+      payload: [{ candidate: "c" }],
+      from_user: alice,
+    });
+  });
+
+  it("should keep server frames without a sender as they are", () => {
+    const frame = packMessagePack({ t: 5, user: { id: 7, username: "alice" } });
+
+    expect(decodeSignalingMessage(frame, (id) => ({ id }))).toEqual({
+      type: "user_joined",
+      user: { id: 7, username: "alice" },
+    });
+  });
+});
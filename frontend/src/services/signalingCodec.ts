@@ -0,0 +1,340 @@
+// Подпротокол msgpack.v1 signaling-сервера (app/services/signaling_protocol.py):
+// бинарные кадры MessagePack с числовыми кодами типов и короткими ключами
+// (t — тип, p — payload, f — id отправителя, to — id получателя)
+export const MSGPACK_SUBPROTOCOL = "msgpack.v1";
+
+const MESSAGE_TYPE_CODES: Record<string, number> = {
+  offer: 1,
+  answer: 2,
+  ice_candidate: 3,
+  ice_candidates: 4,
+  user_joined: 5,
+  user_left: 6,
+  participants_snapshot: 7,
+  call_metadata: 8,
+  call_ended: 9,
+  error: 10,
+  ping: 11,
+  pong: 12,
+  offer_rejected: 13,
+};
+
+const MESSAGE_TYPES: Record<number, string> = Object.fromEntries(
+  Object.entries(MESSAGE_TYPE_CODES).map(([type, code]) => [code, type]),
+);
+
+const SHORT_KEYS: Record<string, string> = { type: "t", payload: "p", to_user_id: "to" };
+const LONG_KEYS: Record<string, string> = { t: "type", p: "payload", to: "to_user_id" };
+
+type MessagePackValue =
+  | null
+  | boolean
+  | number
+  | string
+  | Uint8Array
+  | MessagePackValue[]
+  | { [key: string]: MessagePackValue };
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+class Writer {
+  private buffer = new Uint8Array(256);
+  private view = new DataView(this.buffer.buffer);
+  private length = 0;
+
+  private reserve(size: number) {
+    if (this.length + size <= this.buffer.length) {
+      return;
+    }
+    const grown = new Uint8Array(Math.max(this.buffer.length * 2, this.length + size));
+    grown.set(this.buffer.subarray(0, this.length));
+    this.buffer = grown;
+    this.view = new DataView(grown.buffer);
+  }
+
+  byte(value: number) {
+    this.reserve(1);
+    this.buffer[this.length++] = value;
+  }
+
+  uint16(value: number) {
+    this.reserve(2);
+    this.view.setUint16(this.length, value);
+    this.length += 2;
+  }
+
+  uint32(value: number) {
+    this.reserve(4);
+    this.view.setUint32(this.length, value);
+    this.length += 4;
+  }
+
+  int32(value: number) {
+    this.reserve(4);
+    this.view.setInt32(this.length, value);
+    this.length += 4;
+  }
+
+  uint64(value: number) {
+    this.reserve(8);
+    this.view.setBigUint64(this.length, BigInt(value));
+    this.length += 8;
+  }
+
+  int64(value: number) {
+    this.reserve(8);
+    this.view.setBigInt64(this.length, BigInt(value));
+    this.length += 8;
+  }
+
+  float64(value: number) {
+    this.reserve(8);
+    this.view.setFloat64(this.length, value);
+    this.length += 8;
+  }
+
+  bytes(value: Uint8Array) {
+    this.reserve(value.length);
+    this.buffer.set(value, this.length);
+    this.length += value.length;
+  }
+
+  result(): Uint8Array {
+    return this.buffer.slice(0, this.length);
+  }
+}
+
+// Префиксы длины: fix-форма (маска и предел) и формы с 8-, 16- и 32-битной длиной
+interface LengthPrefixes {
+  fix: number;
+  fixLimit: number;
+  length8: number | null;
+  length16: number;
+  length32: number;
+}
+
+const STR_PREFIXES: LengthPrefixes = { fix: 0xa0, fixLimit: 32, length8: 0xd9, length16: 0xda, length32: 0xdb };
+const BIN_PREFIXES: LengthPrefixes = { fix: 0, fixLimit: 0, length8: 0xc4, length16: 0xc5, length32: 0xc6 };
+const ARRAY_PREFIXES: LengthPrefixes = { fix: 0x90, fixLimit: 16, length8: null, length16: 0xdc, length32: 0xdd };
+const MAP_PREFIXES: LengthPrefixes = { fix: 0x80, fixLimit: 16, length8: null, length16: 0xde, length32: 0xdf };
+
+const writeLength = (writer: Writer, length: number, prefixes: LengthPrefixes) => {
+  if (length < prefixes.fixLimit) {
+    writer.byte(prefixes.fix | length);
+  } else if (prefixes.length8 !== null && length < 0x100) {
+    writer.byte(prefixes.length8);
+    writer.byte(length);
+  } else if (length < 0x10000) {
+    writer.byte(prefixes.length16);
+    writer.uint16(length);
+  } else {
+    writer.byte(prefixes.length32);
+    writer.uint32(length);
+  }
+};
+
+const writeNumber = (writer: Writer, value: number) => {
+  if (!Number.isSafeInteger(value)) {
+    writer.byte(0xcb);
+    writer.float64(value);
+  } else if (value >= 0 && value < 0x80) {
+    writer.byte(value);
+  } else if (value < 0 && value >= -32) {
+    writer.byte(value & 0xff);
+  } else if (value >= 0 && value <= 0xffffffff) {
+    writer.byte(0xce);
+    writer.uint32(value);
+  } else if (value >= 0) {
+    writer.byte(0xcf);
+    writer.uint64(value);
+  } else if (value >= -0x80000000) {
+    writer.byte(0xd2);
+    writer.int32(value);
+  } else {
+    writer.byte(0xd3);
+    writer.int64(value);
+  }
+};
+
+const writeValue = (writer: Writer, value: unknown) => {
+  if (value === null || value === undefined) {
+    writer.byte(0xc0);
+  } else if (typeof value === "boolean") {
+    writer.byte(value ? 0xc3 : 0xc2);
+  } else if (typeof value === "number") {
+    writeNumber(writer, value);
+  } else if (typeof value === "string") {
+    const encoded = textEncoder.encode(value);
+    writeLength(writer, encoded.length, STR_PREFIXES);
+    writer.bytes(encoded);
+  } else if (value instanceof Uint8Array) {
+    writeLength(writer, value.length, BIN_PREFIXES);
+    writer.bytes(value);
+  } else if (Array.isArray(value)) {
+    writeLength(writer, value.length, ARRAY_PREFIXES);
+    value.forEach((item) => writeValue(writer, item));
+  } else if (typeof value === "object") {
+    // Как JSON.stringify: поля со значением undefined не передаются
+    const entries = Object.entries(value as Record<string, unknown>).filter(([, item]) => item !== undefined);
+    writeLength(writer, entries.length, MAP_PREFIXES);
+    entries.forEach(([key, item]) => {
+      writeValue(writer, key);
+      writeValue(writer, item);
+    });
+  } else {
+    throw new TypeError(`Cannot encode ${typeof value} as MessagePack`);
+  }
+};
+
+class Reader {
+  private offset = 0;
+  private readonly view: DataView;
+
+  constructor(private readonly data: Uint8Array) {
+    this.view = new DataView(data.buffer, data.byteOffset, data.byteLength);
+  }
+
+  private take(size: number): number {
+    const start = this.offset;
+    if (start + size > this.data.length) {
+      throw new RangeError("Truncated MessagePack frame");
+    }
+    this.offset += size;
+    return start;
+  }
+
+  private str(length: number): string {
+    const start = this.take(length);
+    return textDecoder.decode(this.data.subarray(start, start + length));
+  }
+
+  private bin(length: number): Uint8Array {
+    const start = this.take(length);
+    return this.data.slice(start, start + length);
+  }
+
+  private array(length: number): MessagePackValue[] {
+    return Array.from({ length }, () => this.value());
+  }
+
+  private map(length: number): { [key: string]: MessagePackValue } {
+    const result: { [key: string]: MessagePackValue } = {};
+    for (let index = 0; index < length; index += 1) {
+      const key = this.value();
+      result[String(key)] = this.value();
+    }
+    return result;
+  }
+
+  private u8 = () => this.view.getUint8(this.take(1));
+  private u16 = () => this.view.getUint16(this.take(2));
+  private u32 = () => this.view.getUint32(this.take(4));
+
+  value(): MessagePackValue {
+    const prefix = this.u8();
+    if (prefix < 0x80) return prefix;
+    if (prefix < 0x90) return this.map(prefix & 0x0f);
+    if (prefix < 0xa0) return this.array(prefix & 0x0f);
+    if (prefix < 0xc0) return this.str(prefix & 0x1f);
+    if (prefix >= 0xe0) return prefix - 0x100;
+
+    switch (prefix) {
+      case 0xc0:
+        return null;
+      case 0xc2:
+        return false;
+      case 0xc3:
+        return true;
+      case 0xc4:
+        return this.bin(this.u8());
+      case 0xc5:
+        return this.bin(this.u16());
+      case 0xc6:
+        return this.bin(this.u32());
+      case 0xca:
+        return this.view.getFloat32(this.take(4));
+      case 0xcb:
+        return this.view.getFloat64(this.take(8));
+      case 0xcc:
+        return this.u8();
+      case 0xcd:
+        return this.u16();
+      case 0xce:
+        return this.u32();
+      case 0xcf:
+        return Number(this.view.getBigUint64(this.take(8)));
+      case 0xd0:
+        return this.view.getInt8(this.take(1));
+      case 0xd1:
+        return this.view.getInt16(this.take(2));
+      case 0xd2:
+        return this.view.getInt32(this.take(4));
+      case 0xd3:
+        return Number(this.view.getBigInt64(this.take(8)));
+      case 0xd9:
+        return this.str(this.u8());
+      case 0xda:
+        return this.str(this.u16());
+      case 0xdb:
+        return this.str(this.u32());
+      case 0xdc:
+        return this.array(this.u16());
+      case 0xdd:
+        return this.array(this.u32());
+      case 0xde:
+        return this.map(this.u16());
+      case 0xdf:
+        return this.map(this.u32());
+      default:
+        throw new TypeError(`Unsupported MessagePack prefix 0x${prefix.toString(16)}`);
+    }
+  }
+}
+
+export const packMessagePack = (value: unknown): Uint8Array => {
+  const writer = new Writer();
+  writeValue(writer, value);
+  return writer.result();
+};
+
+export const unpackMessagePack = (data: ArrayBuffer | Uint8Array): MessagePackValue => {
+  return new Reader(data instanceof Uint8Array ? data : new Uint8Array(data)).value();
+};
+
+// Клиентское сообщение в форме msgpack.v1: тип кодом, короткие ключи
+export const encodeSignalingMessage = (message: { type: string } & Record<string, unknown>): Uint8Array => {
+  const compact: Record<string, unknown> = {};
+  for (const [key, value] of Object.entries(message)) {
+    if (key === "type") {
+      compact.t = MESSAGE_TYPE_CODES[message.type] ?? message.type;
+    } else {
+      compact[SHORT_KEYS[key] ?? key] = value;
+    }
+  }
+  return packMessagePack(compact);
+};
+
+// Кадр сервера в JSON-форму сообщения; отправитель (f) приходит только id, профиль
+// подставляет resolveSender из уже известных участников (participants_snapshot/user_joined)
+export const decodeSignalingMessage = <TUser extends { id: number }>(
+  data: ArrayBuffer | Uint8Array,
+  resolveSender: (id: number) => TUser,
+): Record<string, unknown> => {
+  const compact = unpackMessagePack(data);
+  if (!compact || typeof compact !== "object" || Array.isArray(compact) || compact instanceof Uint8Array) {
+    throw new TypeError("Signaling frame is not a MessagePack map");
+  }
+
+  const message: Record<string, unknown> = {};
+  for (const [key, value] of Object.entries(compact)) {
+    if (key === "t") {
+      message.type = typeof value === "number" ? (MESSAGE_TYPES[value] ?? value) : value;
+    } else if (key === "f") {
+      message.from_user = typeof value === "number" ? resolveSender(value) : value;
+    } else {
+      message[LONG_KEYS[key] ?? key] = value;
+    }
+  }
+  return message;
+};
@@ -10,5 +10,7 @@ export interface AuthResponse {
   expires_in: number;
   user: AuthUser;
   access_token: string;
+  refresh_token: string;
+  refresh_expires_in: number;
   token_type: string;
 }